@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+IntentOps validator benchmarks on synthetic repositories.
+
+Builds throwaway git repositories of increasing size under a temp directory,
+runs validate.py against them and checks that the number of git processes a
+stage spawns does not grow with the repository: a regression here usually
+means a refactor added a per-file or per-commit git call.
+
+Usage:
+  python .intent-ops/framework/tools/bench.py
+  python .intent-ops/framework/tools/bench.py --files 10,500 --commits 5,100 --keep
+
+Checks:
+  coding        git spawns independent of the number of changed files
+  verification  git spawns independent of the number of dirty files
+  ci            git spawns independent of the number of replayed commits (--git-batch)
+  import        `import validate` (from source and from the build_pyz.py
+                zipapp) loads none of the modules validate.py defers; the
+                -X importtime median of 5 is shown for reference
+  hook          `python validate.pyz --stage verification` in a clean synthetic
+                repository, end to end as a pre-commit hook runs it, stays
+                within --hook-budget-ms (median of 5 runs)
+
+For each git check the larger repositories run with --git-budget set to the
+spawn count of the smallest one, so validate.py itself reports GIT_BUDGET_EXCEEDED.
+
+Exit codes:
+  0 all checks within budget
+  1 a check exceeded its budget or a run failed to produce a report
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+TOOLS_DIR = Path(__file__).resolve().parent
+VALIDATE = TOOLS_DIR / "validate.py"
+FRAMEWORK_CONFIG = TOOLS_DIR.parent / "config"
+
+# Imported lazily by validate.py; loading one at import time is a regression.
+DEFERRED_MODULES = ("argparse", "asyncio", "concurrent.futures", "dataclasses", "datetime", "hashlib", "tempfile", "typing")
+IMPORT_SAMPLES = 5
+HOOK_SAMPLES = 5
+
+PACK_REL = ".intent-ops/intents/packs/intent-bench"
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.invalid",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.invalid",
+    "GIT_CONFIG_NOSYSTEM": "1",
+}
+
+
+# ----------------------------
+# Synthetic repositories
+# ----------------------------
+
+def git(repo: Path, *args: str) -> str:
+    env = dict(os.environ, **GIT_ENV)
+    p = subprocess.run(["git", *args], cwd=str(repo), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
+    if p.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed in {repo}: {p.stderr.strip()}")
+    return p.stdout
+
+
+def write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def build_repo(root: Path, files: int, commits: int) -> Path:
+    """
+    A governed repository: the framework config of this checkout, one open
+    intent pack allowing src/**, `files` files under src/ committed on main, and
+    a feature branch with `commits` commits touching src/ (checked out). Every
+    other feature commit also adds a note under the pack's evidence/, so replay
+    runs the governed-root rules (symlink ban, closed packs) too.
+    """
+    repo = root / f"repo-f{files}-c{commits}"
+    repo.mkdir(parents=True)
+    git(repo, "init", "-q")
+    git(repo, "symbolic-ref", "HEAD", "refs/heads/main")
+
+    config_dir = repo / ".intent-ops" / "framework" / "config"
+    config_dir.mkdir(parents=True)
+    for name in ("framework.yml", "zones.yml"):
+        shutil.copyfile(FRAMEWORK_CONFIG / name, config_dir / name)
+    write(
+        repo / ".intent-ops" / "intents" / "current-intent.json",
+        json.dumps({"schema_version": "1.0", "active_intent_id": "intent-bench", "active_pack_path": "packs/intent-bench"}) + "\n",
+    )
+    write(
+        repo / PACK_REL / "intent.json",
+        json.dumps(
+            {
+                "schema_version": "1.0",
+                "intent_id": "intent-bench",
+                "status": "open",
+                "goal": "benchmark",
+                "scope": {"allowed_paths": ["src/**", f"{PACK_REL}/**"], "forbidden_paths": []},
+                "operations": {},
+                "acceptance_criteria": [],
+            },
+            indent=2,
+        )
+        + "\n",
+    )
+    for i in range(files):
+        write(repo / "src" / f"d{i % 16}" / f"f{i}.txt", f"{i}\n")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "base")
+
+    git(repo, "checkout", "-q", "-b", "feature")
+    for n in range(commits):
+        i = n % max(1, files)
+        write(repo / "src" / f"d{i % 16}" / f"f{i}.txt", f"{i} change {n}\n")
+        if n % 2:
+            write(repo / PACK_REL / "evidence" / "notes" / f"change-{n}.md", f"change {n}\n")
+        git(repo, "add", "-A")
+        git(repo, "commit", "-q", "-m", f"change {n}")
+    return repo
+
+
+def dirty(repo: Path, files: int) -> None:
+    """Modify every tracked src/ file in the working tree."""
+    for i in range(files):
+        write(repo / "src" / f"d{i % 16}" / f"f{i}.txt", f"{i} dirty\n")
+
+
+# ----------------------------
+# Runs
+# ----------------------------
+
+def run_stage(repo: Path, stage: str, extra: List[str], script: Path = VALIDATE) -> Tuple[Optional[Dict[str, Any]], float]:
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, str(script), "--stage", stage, *extra],
+        cwd=str(repo),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=dict(os.environ, **GIT_ENV),
+    )
+    elapsed = time.perf_counter() - started
+    report = repo / PACK_REL / "evidence" / "logs" / f"validator-report.{stage}.json"
+    try:
+        return json.loads(report.read_text(encoding="utf-8")), elapsed
+    except (OSError, ValueError):
+        return None, elapsed
+
+
+def check_constant_spawns(
+    name: str, stage: str, repos: List[Tuple[str, Path]], extra: List[str]
+) -> Tuple[bool, List[str]]:
+    """Run `stage` on each repo; every repo after the first is budgeted at the first one's spawn count."""
+    lines: List[str] = []
+    ok = True
+    budget: Optional[int] = None
+    for label, repo in repos:
+        args = list(extra)
+        if budget is not None:
+            args += ["--git-budget", str(budget)]
+        report, elapsed = run_stage(repo, stage, args)
+        if report is None or not report.get("git_spawns"):
+            lines.append(f"{name:<13} {label:<12} no report")
+            ok = False
+            continue
+        spawns = report["git_spawns"]
+        exceeded = any(f.get("code") == "GIT_BUDGET_EXCEEDED" for f in report.get("findings") or [])
+        if budget is None:
+            budget = spawns["total"]
+        ok = ok and not exceeded
+        verdict = "OVER BUDGET" if exceeded else "ok"
+        lines.append(f"{name:<13} {label:<12} {spawns['total']:>5} git  {elapsed * 1000:>8.1f} ms  {verdict}")
+        if exceeded:
+            lines.append(f"{'':<13} {'':<12} {json.dumps(spawns['by_subcommand'], sort_keys=True)}")
+    return ok, lines
+
+
+# ----------------------------
+# Import time
+# ----------------------------
+
+def import_profile(path_entry: str) -> Tuple[float, List[str]]:
+    """(cumulative ms for `import validate`, deferred modules it loaded) in a fresh interpreter."""
+    code = (
+        "import sys\n"
+        f"sys.path.insert(0, {path_entry!r})\n"
+        "before = set(sys.modules)\n"
+        "import validate\n"
+        f"print(' '.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules and m not in before))\n"
+    )
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if p.returncode != 0:
+        raise RuntimeError(f"import validate failed: {p.stderr.strip()[-500:]}")
+    cumulative_us = None
+    for line in p.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == "validate":
+            cumulative_us = int(parts[1])
+    if cumulative_us is None:
+        raise RuntimeError("no -X importtime entry for validate")
+    return cumulative_us / 1000.0, p.stdout.split()
+
+
+def check_startup(root: Path, repo: Path, budget_ms: float) -> Tuple[bool, List[str]]:
+    """Deferred imports stay deferred, and the zipapp verification hook stays within budget_ms."""
+    sys.path.insert(0, str(TOOLS_DIR))
+    try:
+        import build_pyz
+    finally:
+        sys.path.pop(0)
+    pyz = build_pyz.build(root / "validate.pyz", "/usr/bin/env python3")
+
+    lines: List[str] = []
+    ok = True
+    for label, entry in (("source", str(TOOLS_DIR)), ("zipapp", str(pyz))):
+        samples = []
+        loaded: List[str] = []
+        for _ in range(IMPORT_SAMPLES):
+            ms, loaded = import_profile(entry)
+            samples.append(ms)
+        median = sorted(samples)[len(samples) // 2]
+        verdict = "ok"
+        if loaded:
+            verdict = "LOADS " + ",".join(loaded)
+            ok = False
+        lines.append(f"{'import':<13} {label:<12} {median:>8.1f} ms import  {verdict}")
+
+    samples = []
+    report: Optional[Dict[str, Any]] = None
+    for _ in range(HOOK_SAMPLES):
+        report, elapsed = run_stage(repo, "verification", [], script=pyz)
+        samples.append(elapsed * 1000)
+    median = sorted(samples)[len(samples) // 2]
+    verdict = "ok"
+    if report is None:
+        verdict = "no report"
+        ok = False
+    elif median > budget_ms:
+        verdict = f"OVER BUDGET ({budget_ms:g} ms)"
+        ok = False
+    lines.append(f"{'hook':<13} {'zipapp':<12} {median:>8.1f} ms total   {verdict}")
+    return ok, lines
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+
+def parse_sizes(value: str) -> List[int]:
+    try:
+        sizes = sorted({int(x) for x in value.split(",") if x.strip()})
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated integers, got {value!r}")
+    if len(sizes) < 2 or sizes[0] < 1:
+        raise argparse.ArgumentTypeError("need at least two sizes >= 1")
+    return sizes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark validate.py git spawn counts and startup time.")
+    parser.add_argument("--files", type=parse_sizes, default=[10, 400], help="File counts for coding/verification (default: 10,400).")
+    parser.add_argument("--commits", type=parse_sizes, default=[3, 60], help="Commit counts for ci (default: 3,60).")
+    parser.add_argument(
+        "--hook-budget-ms",
+        type=float,
+        default=100.0,
+        help="Max median wall time of `python validate.pyz --stage verification` (default: 100).",
+    )
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic repositories and print their location.")
+    args = parser.parse_args(argv)
+
+    root = Path(tempfile.mkdtemp(prefix="intentops-bench-"))
+    results: List[Tuple[bool, List[str]]] = []
+    try:
+        by_files: List[Tuple[str, Path]] = []
+        for n in args.files:
+            repo = build_repo(root, n, 1)
+            dirty(repo, n)
+            by_files.append((f"{n} files", repo))
+        results.append(check_constant_spawns("coding", "coding", by_files, []))
+        results.append(check_constant_spawns("verification", "verification", by_files, []))
+
+        by_commits = [(f"{n} commits", build_repo(root, 8, n)) for n in args.commits]
+        results.append(check_constant_spawns("ci", "ci", by_commits, ["--git-batch"]))
+
+        # The smallest ci repository is clean, as the pre-commit hook expects.
+        results.append(check_startup(root, by_commits[0][1], args.hook_budget_ms))
+    finally:
+        if args.keep:
+            print(f"repositories kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    for _ok, lines in results:
+        for line in lines:
+            print(line)
+    return 0 if all(ok for ok, _lines in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
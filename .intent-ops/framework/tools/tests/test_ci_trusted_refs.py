@@ -0,0 +1,130 @@
+"""
+CI replay must not let the PR's own framework.yml choose trusted refs.
+
+Run: python -m unittest discover -s .intent-ops/framework/tools/tests
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parents[1]
+VALIDATE = TOOLS_DIR / "validate.py"
+FRAMEWORK_CONFIG = TOOLS_DIR.parent / "config"
+FRAMEWORK_YML = ".intent-ops/framework/config/framework.yml"
+PACK_REL = ".intent-ops/intents/packs/intent-test"
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "test",
+    "GIT_AUTHOR_EMAIL": "test@example.invalid",
+    "GIT_COMMITTER_NAME": "test",
+    "GIT_COMMITTER_EMAIL": "test@example.invalid",
+    "GIT_CONFIG_NOSYSTEM": "1",
+    "GIT_CONFIG_GLOBAL": os.devnull,
+}
+
+TRUST_EVIL = 'governance:\n  ci:\n    trusted_ref_globs:\n      - "evil*"\n'
+
+
+class TrustedRefsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.repo = Path(tempfile.mkdtemp(prefix="intentops-trusted-"))
+        self.addCleanup(shutil.rmtree, self.repo, True)
+        self.git("init", "-q")
+        self.git("symbolic-ref", "HEAD", "refs/heads/main")
+        for name in ("framework.yml", "zones.yml"):
+            self.write(f".intent-ops/framework/config/{name}", (FRAMEWORK_CONFIG / name).read_text(encoding="utf-8"))
+        self.write(
+            ".intent-ops/intents/current-intent.json",
+            json.dumps({"schema_version": "1.0", "active_intent_id": "intent-test", "active_pack_path": "packs/intent-test"}) + "\n",
+        )
+        intent = {
+            "schema_version": "1.0",
+            "intent_id": "intent-test",
+            "status": "open",
+            "goal": "trusted refs",
+            "scope": {"allowed_paths": ["src/**", f"{PACK_REL}/**"], "forbidden_paths": []},
+            "operations": {},
+            "acceptance_criteria": [],
+        }
+        self.write(f"{PACK_REL}/intent.json", json.dumps(intent, indent=2) + "\n")
+        self.write("src/a.txt", "a\n")
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", "base")
+        self.git("checkout", "-q", "-b", "feature")
+
+    def git(self, *args: str) -> str:
+        p = subprocess.run(
+            ["git", *args], cwd=str(self.repo), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=dict(os.environ, **GIT_ENV)
+        )
+        self.assertEqual(p.returncode, 0, p.stderr)
+        return p.stdout
+
+    def write(self, rel: str, text: str) -> None:
+        path = self.repo / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+    def trust_evil(self) -> None:
+        """Add governance.ci.trusted_ref_globs: ["evil*"] to framework.yml in the worktree."""
+        path = self.repo / FRAMEWORK_YML
+        text = path.read_text(encoding="utf-8")
+        self.assertIn("\ngovernance:\n", text)
+        path.write_text(text.replace("\ngovernance:\n", "\n" + TRUST_EVIL, 1), encoding="utf-8")
+
+    def run_ci(self) -> tuple:
+        p = subprocess.run(
+            [sys.executable, str(VALIDATE), "--stage", "ci"],
+            cwd=str(self.repo),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=dict(os.environ, **GIT_ENV),
+        )
+        report = json.loads((self.repo / PACK_REL / "evidence" / "logs" / "validator-report.ci.json").read_text(encoding="utf-8"))
+        return p.returncode, report
+
+    def test_pr_cannot_trust_its_own_commits(self) -> None:
+        # C1 trusts "evil*" through the PR's framework.yml and sneaks in an out-of-scope file.
+        self.trust_evil()
+        self.write("other/bad.txt", "bad\n")
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", "c1")
+        self.git("branch", "evil")
+        self.write("src/a.txt", "a2\n")
+        self.git("commit", "-q", "-a", "-m", "c2")
+
+        rc, report = self.run_ci()
+        codes = [f["code"] for f in report["findings"]]
+        self.assertNotEqual(rc, 0)
+        self.assertIn("CI_COMMIT_REPLAY_FAILED", codes)
+        self.assertIsNone(report["ci_trusted_refs"])
+        self.assertEqual(report["ci_commit_count"], 2)
+
+    def test_merge_base_framework_globs_apply(self) -> None:
+        self.git("checkout", "-q", "main")
+        self.trust_evil()
+        self.git("commit", "-q", "-a", "-m", "trust evil")
+        self.git("checkout", "-q", "feature")
+        self.git("rebase", "-q", "main")
+        self.write("src/a.txt", "a2\n")
+        self.git("commit", "-q", "-a", "-m", "c1")
+        self.git("branch", "evil")
+        self.write("src/a.txt", "a3\n")
+        self.git("commit", "-q", "-a", "-m", "c2")
+
+        rc, report = self.run_ci()
+        self.assertEqual(rc, 0, report["findings"])
+        self.assertEqual(report["ci_trusted_refs"], ["refs/heads/evil"])
+        self.assertEqual(report["ci_commit_count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
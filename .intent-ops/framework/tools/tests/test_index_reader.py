@@ -0,0 +1,120 @@
+"""
+staged_changes_from_index() against `git diff --cached --name-status --no-renames`.
+
+Run: python -m unittest discover -s .intent-ops/framework/tools/tests
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import validate  # noqa: E402
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "test",
+    "GIT_AUTHOR_EMAIL": "test@example.invalid",
+    "GIT_COMMITTER_NAME": "test",
+    "GIT_COMMITTER_EMAIL": "test@example.invalid",
+    "GIT_CONFIG_NOSYSTEM": "1",
+    "GIT_CONFIG_GLOBAL": os.devnull,
+}
+
+
+class IndexReaderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.repo = Path(tempfile.mkdtemp(prefix="intentops-index-"))
+        self.addCleanup(shutil.rmtree, self.repo, True)
+        # The reader's cat-file process, like every git call of the validator, runs in the cwd.
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.repo)
+        self.git("init", "-q")
+        for rel in ("d/f1.txt", "d/f2.txt", "d/sub/f3.txt", "e/f4.txt", "top.txt", "exec.sh", "link-target.txt"):
+            self.write(rel, f"{rel}\n")
+        os.symlink("link-target.txt", self.repo / "link")
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", "base")
+
+    def git(self, *args: str) -> str:
+        p = subprocess.run(
+            ["git", *args], cwd=str(self.repo), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=dict(os.environ, **GIT_ENV)
+        )
+        self.assertEqual(p.returncode, 0, p.stderr)
+        return p.stdout
+
+    def write(self, rel: str, text: str) -> None:
+        path = self.repo / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+    def stage_changes(self) -> None:
+        self.git("mv", "d/f1.txt", "d/renamed.txt")
+        self.write("d/f2.txt", "modified\n")
+        self.write("new/dir/f5.txt", "added\n")
+        os.chmod(self.repo / "exec.sh", 0o755)
+        (self.repo / "link").unlink()
+        self.write("link", "now a file\n")
+        self.git("rm", "-q", "e/f4.txt")
+        self.git("add", "-A")
+
+    def expected(self) -> list:
+        out = self.git("diff", "--cached", "--name-status", "--no-renames")
+        return sorted(tuple(line.split("\t", 1)[::-1]) for line in out.splitlines() if line)
+
+    def actual(self) -> list:
+        return sorted((c.path, c.status) for c in validate.staged_changes_from_index(self.repo))
+
+    def index_version(self) -> int:
+        return struct.unpack(">I", (self.repo / ".git" / "index").read_bytes()[4:8])[0]
+
+    def check_version(self, version: int) -> None:
+        self.stage_changes()
+        if version == 3:
+            # Version 3 is only kept while an entry has extended flags.
+            self.git("update-index", "--skip-worktree", "top.txt")
+        self.git("update-index", "--index-version", str(version))
+        self.assertEqual(self.index_version(), version)
+        expected = self.expected()
+        self.assertIn(("d/f1.txt", "D"), expected)
+        self.assertIn(("d/renamed.txt", "A"), expected)
+        self.assertEqual(self.actual(), expected)
+
+    def test_index_v2(self) -> None:
+        self.check_version(2)
+
+    def test_index_v3(self) -> None:
+        self.check_version(3)
+
+    def test_index_v4(self) -> None:
+        self.check_version(4)
+
+    def test_clean_index(self) -> None:
+        self.assertEqual(self.actual(), [])
+
+    def test_cache_tree_invalidated_subtree(self) -> None:
+        # Only d/sub changes: the cache tree still covers e/ and the root files.
+        self.write("d/sub/f3.txt", "changed\n")
+        self.git("add", "d/sub/f3.txt")
+        self.assertEqual(self.actual(), self.expected())
+
+    def test_verification_and_coding_agree_on_renames(self) -> None:
+        self.git("mv", "d/f1.txt", "d/renamed.txt")
+        staged, _meta = validate.list_changed_files("verification", self.repo)
+        coding, _meta = validate.list_changed_files("coding", self.repo)
+        for changes in (staged, coding):
+            self.assertEqual(
+                sorted((c.path, c.status) for c in changes if c.path.startswith("d/")),
+                [("d/f1.txt", "D"), ("d/renamed.txt", "A")],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
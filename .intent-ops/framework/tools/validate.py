@@ -5,43 +5,449 @@ IntentOps deterministic validator (stdlib-only).
 Usage:
   python .intent-ops/framework/tools/validate.py --stage verification
   python .intent-ops/framework/tools/validate.py --stage coding
+  python .intent-ops/framework/tools/validate.py --stage coding --watch
+  python .intent-ops/framework/tools/validate.py --stage coding,verification
   python .intent-ops/framework/tools/validate.py --stage ci
+  python .intent-ops/framework/tools/validate.py --stage ci --shard 2/4
+  python .intent-ops/framework/tools/validate.py merge-reports validator-report.ci.shard-*.json
+  python .intent-ops/framework/tools/validate.py --stage audit [--rev-range v1.0..HEAD]
+  python .intent-ops/framework/tools/validate.py --stage pre-receive < "old new ref" lines
+  python .intent-ops/framework/tools/validate.py --stage compile
 
 Options:
+  --stage STAGE[,STAGE...]
+            Several stages run in one process, in the given order, sharing the
+            parsed kernel files (framework.yml, zones.yml, current-intent.json,
+            intent.json) and ref-relative git results (diffs, untracked listing,
+            HEAD snapshots, the staged index). One validator-report.<stage>.json
+            is still written per stage, after the last stage has run.
   --debug   Enable debug logging to stderr and include debug fields in the report.
+  --log-level LEVEL
+            error (failing findings, after each stage), warn (warning findings,
+            reports/metrics/traces/checkpoints that could not be written), info
+            (stage results and report paths), debug or trace (each path-rule
+            finding as it is found). Messages are only formatted when their
+            level is enabled. Default: off; --debug and --log-file imply debug.
+            Only --debug adds debug fields to reports.
+  --log-file PATH
+            Append log events as JSON lines ({"ts", "level", "event", "msg",
+            ...fields}) to PATH instead of writing them to stderr.
+  --dirty-count-limit N
+            Dirty worktree gates stop at the first offending path; with N > 1 they
+            also report how many offending paths were seen (bounded by N).
+  --git-cache-size N
+            LRU bound of the per-run memo for SHA-addressed git queries
+            (default 4096, 0 disables). Hit/miss counters land in report.git_cache.
+  --compact-report
+            Write reports as compact JSON instead of indented JSON. Reports are
+            always written atomically (temp file + rename, under an advisory lock
+            on the report directory, keeping the file's mode) and not rewritten
+            when nothing but the timestamp and the per-run cache/spawn counters
+            changed.
+  --trace PATH
+            Write a Chrome Trace Event JSON file (open in Perfetto or
+            chrome://tracing) with spans for each stage, its phases, every
+            validate_commit_snapshot call (tagged with the commit) and every git
+            subprocess (tagged with its argv; prefetched ones, which overlap, as
+            async slices with one id each).
+  --metrics-file PATH
+            After the run, atomically rewrite PATH (e.g. <textfile-dir>/intentops.prom)
+            with metrics in the Prometheus text format (not OpenMetrics): runs,
+            stage duration histogram, git subprocess count and time by kind,
+            findings by code, replayed commits, cache hits/lookups and hit
+            ratios, changed files. Counters and histograms continue from
+            the previous file contents, so they accumulate across runs.
+  --max-findings-per-code N
+            Keep at most N (>= 1) detailed findings per code in the report and in
+            each replayed commit (default: unbounded, or governance.findings.max_per_code
+            / governance.findings.per_code in framework.yml). Findings past the
+            cap are only counted: findings_truncated[code] has the total and a
+            bounded per-directory histogram. Pass/fail is unaffected.
+  --git-batch
+            Read commit-scoped files (git show <commit>:<path>, cat-file -e) through
+            one persistent git cat-file --batch, and list the changes of all replayed
+            ci commits with one git log --raw. The git process count of a ci run is
+            then independent of the number of commits.
+  --git-budget SPEC
+            Fail each stage that spawns more git processes than SPEC allows, with
+            GIT_BUDGET_EXCEEDED. SPEC is N (total) or SUBCOMMAND=N pairs, e.g.
+            "total=8,show=0". Every report carries git_spawns (total and per
+            subcommand) either way. tools/bench.py uses this on synthetic repos.
+  --serial-git
+            Run git queries strictly one at a time. By default independent
+            startup queries (repo root, diffs, dirty gates, HEAD snapshots) are
+            started as separate git processes up front and each step waits only
+            for the output it needs (dirty gates stream and stop early as usual);
+            counters land in report.git_prefetch.
+  --watch   coding only: stay running after the first full validation. Edits are
+            picked up by polling os.scandir mtimes every --watch-interval
+            seconds (default 1.0); only touched paths are re-queried
+            (git status -- <paths>) and re-evaluated against zones and scope.
+            Control files, git state changes and lifecycle transactions trigger
+            a full rerun. New/resolved findings stream to stdout as "+"/"-"
+            lines and the coding report is rewritten after every update.
+  --shard i/N
+            ci only: replay the i-th (1-based) of N contiguous slices of the commit
+            range and write validator-report.ci.shard-i-of-N.json. `merge-reports`
+            combines the shard reports into validator-report.ci.json.
+  --rev-range RANGE
+            audit only: rev-list range to walk (default: all of HEAD's history).
+  --trusted-ref GLOB
+            ci only, repeatable: commits reachable from matching refs already
+            passed elsewhere and are excluded from replay. Also configurable as
+            governance.ci.trusted_ref_globs in framework.yml, read at the merge
+            base (never from the PR's own commits or worktree). Matched by git
+            for-each-ref (`*` stops at `/`); refs containing the PR head are
+            ignored (ci_trusted_refs_ignored), and excluding the whole range
+            fails with CI_TRUSTED_REFS_EXCLUDE_ALL.
+  --fail-fast
+            ci only: stop replay at the first failing (non-skipped) commit.
+  --time-budget SECONDS
+            ci only: stop replay cleanly once SECONDS have elapsed, write a
+            checkpoint (default under <git-dir>/intentops/) and fail with
+            CI_REPLAY_INCOMPLETE.
+  --resume  ci only: continue from the checkpoint of a previous time-budgeted run.
+  --checkpoint PATH
+            ci only: explicit checkpoint file location.
+  --first-bad
+            ci only: locate just the earliest failing commit. Bisects over the
+            cumulative change set when the range is linear, the kernel exists at
+            the merge base and no commit touches control files or adds symlinks;
+            otherwise scans linearly, as it also does when the bisected commit
+            passes on replay. The strategy is reported in ci_first_bad.
 
 Stages:
   - coding: checks working tree + staged changes
   - verification: checks staged changes only (pre-commit hook)
-    - ci: deterministic commit-by-commit replay across the CI range
+  - ci: deterministic commit-by-commit replay across the CI range
+  - audit: streaming replay of an arbitrary range or the whole history, rolled up
+    per active_intent_id and per finding code instead of per commit. Commits
+    whose scope allows everything and whose zones stay under .intent-ops/ and
+    .github/agents/ are listed with a pathspec for those roots only
+    (audit_rollup.governed_only_commits)
+  - pre-receive: server-side hook for bare repositories; replays the commits a
+    push introduces (all ref updates batched into one `rev-list ... --not --all`)
+    from the object database and rejects the push on failure
+  - packs: lints every pack under paths.packs_root in parallel (intent.json
+    schema, status, intent_id == folder name) and refreshes the pack status
+    index at <git-dir>/intentops/pack-index.json (id, status, blob hash); packs
+    whose intent.json is unchanged since the last run are not re-read
+  - compile: parses framework.yml, zones.yml, current-intent.json and the active
+    intent.json once and writes them, with the regexes of their glob lists, to
+    <git-dir>/intentops/policy.marshal. Later runs load that artifact with one
+    marshal read and use each file from it while the file's size/mtime (if
+    older than the artifact) or blob hash is unchanged; an artifact written by
+    another validate.py is ignored (report.policy_artifact counts hits and
+    stale files)
+
+Hooks can run the zipapp built by build_pyz.py instead of this file
+(`python <git-dir>/intentops/validate.pyz --stage verification`); it carries
+precompiled bytecode, so startup does not depend on a writable __pycache__.
 """
 
 from __future__ import annotations
 
-import argparse
-import fnmatch
+# Hooks pay for every module imported here before any work starts, so only
+# what every run needs is imported at module level. argparse (CLI only),
+# concurrent.futures (pack lint), datetime (report time), hashlib and
+# tempfile are imported where they are used; typing is only needed by type
+# checkers (annotations are strings); dataclasses is replaced by _Record and
+# fnmatch by matches_any_glob().
+import itertools
 import json
+import locale
+import marshal
+import mmap
 import os
 import re
+import struct
 import subprocess
 import sys
-from dataclasses import dataclass
-from datetime import datetime, timezone
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Optional
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import argparse
+    import concurrent.futures
+    from typing import Any, Dict, List, Tuple, Optional, Union
+
+
+# ----------------------------
+# Records and globs
+# ----------------------------
+
+class _Factory:
+    """Record field default built per instance, e.g. `_Factory(list)`."""
+
+    __slots__ = ("make",)
+
+    def __init__(self, make: Any) -> None:
+        self.make = make
+
+
+class _RecordMeta(type):
+    # Annotated public class attributes become __slots__ (in declaration
+    # order) and their values _defaults, so a record lists each field once.
+    def __new__(mcs, name: str, bases: Tuple[type, ...], namespace: Dict[str, Any]) -> Any:
+        fields = tuple(f for f in namespace.get("__annotations__", ()) if not f.startswith("_"))
+        if fields:
+            namespace["_defaults"] = {f: namespace.pop(f) for f in fields if f in namespace}
+            namespace["__slots__"] = fields
+        return super().__new__(mcs, name, bases, namespace)
+
+
+class _Record(metaclass=_RecordMeta):
+    """
+    Plain slotted record declared like a dataclass: annotated class attributes
+    are the fields, in order, and their values the defaults (_Factory(make)
+    for one built per instance). Equality and repr go by field values, and
+    replace() returns a modified copy.
+    """
+
+    __slots__: Tuple[str, ...] = ()
+    _defaults: Dict[str, Any] = {}
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        names = self.__slots__
+        if len(args) > len(names):
+            raise TypeError(f"{type(self).__name__}() takes at most {len(names)} positional arguments")
+        for name, value in zip(names, args):
+            object.__setattr__(self, name, value)
+        for name in names[len(args):]:
+            if name in kwargs:
+                value = kwargs.pop(name)
+            elif name in self._defaults:
+                value = self._defaults[name]
+                value = value.make() if isinstance(value, _Factory) else value
+            else:
+                raise TypeError(f"{type(self).__name__}() missing argument {name!r}")
+            object.__setattr__(self, name, value)
+        if kwargs:
+            raise TypeError(f"{type(self).__name__}() got unexpected arguments {sorted(kwargs)}")
+
+    def _values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and self._values() == other._values()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def replace(self, **changes: Any) -> Any:
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+
+
+_GLOB_STAR = object()
+_GLOB_GROUP_IDS = itertools.count(1)
+
+
+def _translate_glob(pattern: str) -> str:
+    """
+    Regex for an fnmatch pattern, as fnmatch.translate() builds it (* and ? also
+    match "/"), including its guard against catastrophic backtracking: runs of
+    stars collapse into one, and every star followed by more stars is matched
+    atomically (lookahead plus backreference), so "*a*a*a*b" stays linear.
+    Group names are unique per process, so translations can share one regex.
+    """
+    out: List[Any] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            if not out or out[-1] is not _GLOB_STAR:
+                out.append(_GLOB_STAR)
+        elif c == "?":
+            out.append(".")
+        elif c == "[":
+            j = i
+            if j < n and pattern[j] == "!":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                out.append("\\[")
+                continue
+            stuff = pattern[i:j]
+            if "-" not in stuff:
+                stuff = stuff.replace("\\", "\\\\")
+            else:
+                chunks: List[str] = []
+                k = i + 2 if pattern[i] == "!" else i + 1
+                while True:
+                    k = pattern.find("-", k, j)
+                    if k < 0:
+                        break
+                    chunks.append(pattern[i:k])
+                    i = k + 1
+                    k = k + 3
+                chunk = pattern[i:j]
+                if chunk:
+                    chunks.append(chunk)
+                else:
+                    chunks[-1] += "-"
+                # Drop empty (reversed) ranges; they are invalid in a regex.
+                for k in range(len(chunks) - 1, 0, -1):
+                    if chunks[k - 1][-1] > chunks[k][0]:
+                        chunks[k - 1] = chunks[k - 1][:-1] + chunks[k][1:]
+                        del chunks[k]
+                stuff = "-".join(x.replace("\\", "\\\\").replace("-", "\\-") for x in chunks)
+            stuff = re.sub(r"([&~|])", r"\\\1", stuff)
+            i = j + 1
+            if not stuff:
+                out.append("(?!)")
+            elif stuff == "!":
+                out.append(".")
+            else:
+                if stuff[0] == "!":
+                    stuff = "^" + stuff[1:]
+                elif stuff[0] in "^[":
+                    stuff = "\\" + stuff
+                out.append(f"[{stuff}]")
+        else:
+            out.append(re.escape(c))
+
+    # Fixed text up to the first star, then (star, fixed) pairs: only the last
+    # star may be a plain .*, earlier ones match the shortest run up to their
+    # fixed text and never give it back.
+    res: List[str] = []
+    i, n = 0, len(out)
+    while i < n and out[i] is not _GLOB_STAR:
+        res.append(out[i])
+        i += 1
+    while i < n:
+        i += 1
+        if i == n:
+            res.append(".*")
+            break
+        fixed: List[str] = []
+        while i < n and out[i] is not _GLOB_STAR:
+            fixed.append(out[i])
+            i += 1
+        if i == n:
+            res.append(".*" + "".join(fixed))
+        else:
+            g = f"g{next(_GLOB_GROUP_IDS)}"
+            res.append(f"(?=(?P<{g}>.*?{''.join(fixed)}))(?P={g})")
+    return "(?s:" + "".join(res) + ")\\Z"
 
 
 # ----------------------------
-# Debug logging
+# Logging
 # ----------------------------
 
-_DEBUG = False
+# Events are logged with a %-style template and lazy arguments: nothing is
+# formatted (and callable arguments are not even called) unless the level is
+# enabled. Per-path loops hoist `_TRACE` into a local instead of calling in.
+
+LOG_ERROR = 40
+LOG_WARN = 30
+LOG_INFO = 20
+LOG_DEBUG = 10
+LOG_TRACE = 5
+LOG_LEVELS: Dict[str, int] = {"error": LOG_ERROR, "warn": LOG_WARN, "info": LOG_INFO, "debug": LOG_DEBUG, "trace": LOG_TRACE}
+_LEVEL_NAMES: Dict[int, str] = {v: k for k, v in LOG_LEVELS.items()}
+
+_LOG_THRESHOLD = LOG_ERROR + 1  # off
+_DEBUG = False  # debug level enabled
+_REPORT_DEBUG = False  # --debug: add debug fields to reports
+_TRACE = False
+_LOG_FILE: Optional[Any] = None  # JSON-lines sink (--log-file); replaces stderr
+_LOG_EVENT_RE = re.compile(r"^([A-Za-z_][\w.-]*(?: [\w-]+){0,4}):")
+
+
+def configure_logging(level: Optional[str], log_file: Optional[str] = None) -> None:
+    """level None turns logging off."""
+    global _LOG_THRESHOLD, _DEBUG, _TRACE, _LOG_FILE
+    _LOG_THRESHOLD = LOG_LEVELS[level] if level else LOG_ERROR + 1
+    _DEBUG = _LOG_THRESHOLD <= LOG_DEBUG
+    _TRACE = _LOG_THRESHOLD <= LOG_TRACE
+    if _LOG_FILE is not None:
+        _LOG_FILE.close()
+        _LOG_FILE = None
+    if log_file:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        _LOG_FILE = open(log_file, "a", encoding="utf-8")
+
+
+def add_logging_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--debug", action="store_true", help="Shorthand for --log-level debug; also include debug fields in reports.")
+    parser.add_argument("--log-level", choices=list(LOG_LEVELS), default=None, help="Log events at this level and above (default: off).")
+    parser.add_argument("--log-file", default=None, metavar="PATH", help="Append log events to PATH as JSON lines instead of stderr.")
+
+
+def resolve_log_level(args: argparse.Namespace) -> Optional[str]:
+    if args.log_level:
+        return args.log_level
+    if args.debug or args.log_file:
+        return "debug"
+    return None
+
+
+def _lazy(value: Any) -> Any:
+    return value() if callable(value) else value
+
+
+def _emit(level: int, msg: Any, args: Tuple[Any, ...], fields: Dict[str, Any]) -> None:
+    template = _lazy(msg)
+    text = template % tuple(_lazy(a) for a in args) if args else template
+    values = {k: _lazy(v) for k, v in fields.items()}
+    name = _LEVEL_NAMES.get(level, str(level))
+    if _LOG_FILE is not None:
+        m = _LOG_EVENT_RE.match(template)
+        record: Dict[str, Any] = {"ts": round(time.time(), 6), "level": name, "event": m.group(1) if m else None, "msg": text}
+        record.update(values)
+        _LOG_FILE.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
+        _LOG_FILE.flush()
+        return
+    if values:
+        text += " " + " ".join(f"{k}={v!r}" for k, v in values.items())
+    sys.stderr.write(f"[intentops.validate {name.upper()}] {text}\n")
+    sys.stderr.flush()
+
+
+def log(level: int, msg: Any, *args: Any, **fields: Any) -> None:
+    """Log `msg % args` plus structured fields; callables in msg/args/fields are resolved lazily."""
+    if level >= _LOG_THRESHOLD:
+        _emit(level, msg, args, fields)
+
+
+def log_stage_result(stage: str, ok: bool, report: Dict[str, Any], seconds: float) -> None:
+    """Findings at error/warn, then the stage verdict at info."""
+    if LOG_WARN >= _LOG_THRESHOLD:
+        for f in report.get("findings") or []:
+            level = LOG_ERROR if f.get("level") == "fail" else LOG_WARN
+            log(level, "finding: %s %s", stage, f.get("code"), path=f.get("path"), message=f.get("message"))
+    log(
+        LOG_INFO,
+        "stage result: %s %s",
+        stage,
+        "pass" if ok else "fail",
+        duration_ms=round(seconds * 1000, 1),
+        findings=len(report.get("findings") or []),
+        git_spawns=lambda: (report.get("git_spawns") or {}).get("total"),
+    )
 
 
-def debug(msg: str) -> None:
+def debug(msg: Any, *args: Any, **fields: Any) -> None:
     if _DEBUG:
-        sys.stderr.write(f"[intentops.validate DEBUG] {msg}\n")
-        sys.stderr.flush()
+        _emit(LOG_DEBUG, msg, args, fields)
+
+
+def trace(msg: Any, *args: Any, **fields: Any) -> None:
+    if _TRACE:
+        _emit(LOG_TRACE, msg, args, fields)
 
 
 # ----------------------------
@@ -88,7 +494,7 @@ def load_yaml_subset(path: Path) -> Dict[str, Any]:
       - no multiline strings
       - indentation must be consistent (2 spaces recommended)
     """
-    debug(f"load_yaml_subset: path={path}")
+    debug("load_yaml_subset: path=%s", path)
     if not path.exists():
         raise FileNotFoundError(str(path))
 
@@ -176,7 +582,7 @@ def load_yaml_subset(path: Path) -> Dict[str, Any]:
         container[key] = _parse_scalar(rest)
         i += 1
 
-    debug(f"load_yaml_subset: loaded top-level keys={list(root.keys())}")
+    debug("load_yaml_subset: loaded top-level keys=%s", lambda: list(root.keys()))
     return root
 
 
@@ -262,38 +668,393 @@ def load_yaml_subset_text(text: str) -> Dict[str, Any]:
 # Git helpers
 # ----------------------------
 
-@dataclass(frozen=True)
-class ChangedFile:
+class ChangedFile(_Record):
+    """Immutable (path, status) pair."""
+
     path: str
     status: str  # e.g. M, A, D, R100
 
+    def __init__(self, path: str, status: str) -> None:
+        # Hot path (one per changed file per commit): skip the generic __init__.
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "status", status)
 
-def run_git(args: List[str]) -> str:
-    debug(f"run_git: git {' '.join(args)}")
-    p = subprocess.run(
-        ["git"] + args,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        check=False,
-    )
-    if p.returncode != 0:
-        raise RuntimeError(f"git {' '.join(args)} failed: {p.stderr.strip()}")
-    return p.stdout
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"ChangedFile is immutable; cannot set {name!r}")
 
+    def __hash__(self) -> int:
+        return hash((self.path, self.status))
 
-def repo_root_from_git() -> Path:
-    root = Path(run_git(["rev-parse", "--show-toplevel"]).strip())
-    debug(f"repo_root_from_git: {root}")
-    return root
 
+# ----------------------------
+# Immutable git query memo
+# ----------------------------
 
-def _git_ref_exists(ref: str) -> bool:
-    try:
-        run_git(["rev-parse", "--verify", ref])
-        return True
-    except Exception:
+_SHA_RE = re.compile(r"[0-9a-f]{40}(?:[0-9a-f]{24})?")
+
+# Subcommands whose output is fully determined by the objects they address.
+_MEMO_SUBCOMMANDS = frozenset(["rev-list", "ls-tree", "cat-file", "show", "diff-tree"])
+
+# Options that do not make a query depend on refs, the index or the clock.
+_MEMO_SAFE_OPTIONS = frozenset(
+    ["--parents", "--reverse", "--name-status", "--name-only", "--no-commit-id", "--root", "--no-renames", "--count", "-r", "-e", "-t", "-s", "-p", "-z"]
+)
+
+
+def is_sha_addressed_git_query(args: List[str]) -> bool:
+    """
+    True when every revision in a read-only query is a full object id, so the
+    output cannot change during a run. Anything ref-relative (HEAD, branch names,
+    --all, abbreviated ids, ...) is rejected.
+    """
+    if not args or args[0] not in _MEMO_SUBCOMMANDS:
         return False
+    expect_count = False
+    for tok in args[1:]:
+        if tok == "--":
+            return True  # pathspecs follow
+        if expect_count:
+            if not tok.isdigit():
+                return False
+            expect_count = False
+            continue
+        if tok == "-n":
+            expect_count = True
+            continue
+        if tok.startswith("-"):
+            if tok not in _MEMO_SAFE_OPTIONS and not tok.startswith(("--format=", "--pretty=format:")):
+                return False
+            continue
+        rev = tok.split(":", 1)[0] if ":" in tok else tok
+        for part in rev.replace("...", "..").split(".."):
+            if not _SHA_RE.fullmatch(part.lstrip("^")):
+                return False
+    return not expect_count
+
+
+class GitQueryMemo:
+    """Per-run LRU cache of SHA-addressed git query results (stdout or failure)."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, ...], Tuple[bool, str]]" = OrderedDict()
+
+    def get(self, key: Tuple[str, ...]) -> Optional[Tuple[bool, str]]:
+        hit = self._entries.get(key)
+        if hit is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return hit
+
+    def lookup_alias(self, args: List[str]) -> Optional[Tuple[bool, str]]:
+        """
+        The cached result of another query (git args, keyed as run_git() keys
+        them) that also answers the caller's question. A hit is counted; a
+        miss is not, as the caller then runs its own query through run_git().
+        """
+        key = tuple(args)
+        hit = self._entries.get(key)
+        if hit is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return hit
+
+    def put(self, key: Tuple[str, ...], value: Tuple[bool, str]) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "max_entries": self.max_entries,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+_GIT_MEMO: Optional[GitQueryMemo] = None
+
+
+class GitPrefetcher:
+    """
+    Starts independent git queries early as plain subprocesses.
+
+    The stage pipeline prefetches queries as soon as their inputs are known and
+    the processes run while Python carries on; run_git() collects the output
+    only when it is actually needed, so startup latency approaches the slowest
+    git call rather than the sum of all of them. git_first_offending_path()
+    takes the live process instead and streams it, so a dirty gate still kills
+    git after the first offending path. Collected results are kept for the run,
+    so two consumers of the same query share one process.
+    """
+
+    def __init__(self) -> None:
+        self._procs: Dict[Tuple[str, ...], Tuple[Any, float]] = {}
+        self._results: Dict[Tuple[str, ...], Tuple[int, str, str]] = {}
+        self.prefetched = 0
+        self.used = 0
+
+    def prefetch(self, queries: List[List[str]]) -> None:
+        for args in queries:
+            key = tuple(args)
+            if key in self._procs or key in self._results:
+                continue
+            debug("git prefetch: git %s", lambda: " ".join(args))
+            started = time.perf_counter()
+            try:
+                p = subprocess.Popen(["git"] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            except OSError as e:
+                # Leave it to the consumer to run the query synchronously.
+                debug("git prefetch failed: git %s: %r", lambda: " ".join(args), e)
+                continue
+            note_git_spawn(args)
+            self._procs[key] = (p, started)
+            self.prefetched += 1
+
+    def take(self, args: List[str]) -> Optional[Tuple[int, str, str]]:
+        key = tuple(args)
+        if key in self._results:
+            self.used += 1
+            return self._results[key]
+        entry = self._procs.pop(key, None)
+        if entry is None:
+            return None
+        p, started = entry
+        stdout, stderr = p.communicate()
+        note_git_process("prefetch", started, args)
+        self._results[key] = (p.returncode, stdout, stderr)
+        self.used += 1
+        return self._results[key]
+
+    def take_stream(self, args: List[str]) -> Optional[Tuple[Any, float]]:
+        """Hand over a still-unread prefetched process as (Popen, started); the caller owns it."""
+        entry = self._procs.pop(tuple(args), None)
+        if entry is not None:
+            self.used += 1
+        return entry
+
+    def reset(self) -> None:
+        # Forget results before the working tree is looked at again (watch mode).
+        self.close()
+        self._results.clear()
+
+    def close(self) -> None:
+        # Nobody will read these any more: kill rather than wait for them.
+        for p, _ in self._procs.values():
+            p.kill()
+            p.communicate()
+        self._procs.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"prefetched": self.prefetched, "used": self.used}
+
+
+_GIT_PREFETCH: Optional[GitPrefetcher] = None
+
+
+class SessionSnapshot:
+    """
+    State shared by the stages of one multi-stage invocation
+    (--stage coding,verification): ref-relative git query results and parsed
+    kernel files. The working tree is treated as a snapshot for the whole
+    invocation, which is why reports are only written after the last stage.
+    """
+
+    def __init__(self) -> None:
+        self.git: Dict[Tuple[str, ...], Tuple[int, str, str]] = {}
+        self.files: Dict[Tuple[str, str], Tuple[bool, Any]] = {}
+        self.git_hits = 0
+        self.file_hits = 0
+
+    def load(self, kind: str, path: Path, loader: Any) -> Any:
+        key = (kind, str(path))
+        if key in self.files:
+            self.file_hits += 1
+            ok, value = self.files[key]
+        else:
+            try:
+                ok, value = True, loader()
+            except Exception as e:
+                ok, value = False, e
+            self.files[key] = (ok, value)
+        if not ok:
+            raise value
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {"git_hits": self.git_hits, "git_entries": len(self.git), "file_hits": self.file_hits, "file_entries": len(self.files)}
+
+
+_SESSION: Optional[SessionSnapshot] = None
+
+
+def session_load(kind: str, path: Path, loader: Any) -> Any:
+    if _POLICY is not None and kind in _POLICY_SOURCE_KINDS:
+        parse = loader
+        loader = lambda: _POLICY.load(kind, path, parse)  # noqa: E731
+    return _SESSION.load(kind, path, loader) if _SESSION is not None else loader()
+
+
+def _decode_git_output(data: bytes) -> str:
+    # Same decoding as subprocess.run(text=True).
+    return data.decode(locale.getpreferredencoding(False)).replace("\r\n", "\n")
+
+
+def prefetch_git(queries: List[List[str]]) -> None:
+    if _GIT_PREFETCH is not None:
+        _GIT_PREFETCH.prefetch(queries)
+
+
+def run_git(args: List[str], input_text: Optional[str] = None) -> str:
+    debug("run_git: git %s", lambda: " ".join(args))
+    key: Optional[Tuple[str, ...]] = None
+    if _GIT_MEMO is not None and input_text is None and is_sha_addressed_git_query(args):
+        key = tuple(args)
+        cached = _GIT_MEMO.get(key)
+        if cached is not None:
+            ok, value = cached
+            if not ok:
+                raise RuntimeError(value)
+            return value
+
+    session_key = tuple(args) if _SESSION is not None and input_text is None and key is None else None
+    prefetched: Optional[Tuple[int, str, str]] = None
+    if session_key is not None and session_key in _SESSION.git:
+        _SESSION.git_hits += 1
+        prefetched = _SESSION.git[session_key]
+    elif _GIT_PREFETCH is not None and input_text is None:
+        prefetched = _GIT_PREFETCH.take(args)
+    if prefetched is not None:
+        returncode, stdout, stderr = prefetched
+    else:
+        started = time.perf_counter()
+        note_git_spawn(args)
+        p = subprocess.run(
+            ["git"] + args,
+            input=input_text,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=False,
+        )
+        note_git_process("run", started, args)
+        returncode, stdout, stderr = p.returncode, p.stdout, p.stderr
+    if session_key is not None:
+        _SESSION.git[session_key] = (returncode, stdout, stderr)
+    if returncode != 0:
+        msg = f"git {' '.join(args)} failed: {stderr.strip()}"
+        if key is not None and _GIT_MEMO is not None:
+            _GIT_MEMO.put(key, (False, msg))
+        raise RuntimeError(msg)
+    if key is not None and _GIT_MEMO is not None:
+        _GIT_MEMO.put(key, (True, stdout))
+    return stdout
+
+
+def popen_git_stream(args: List[str]) -> Tuple[Any, Any]:
+    """
+    Start `git <args>` with stdout piped for line streaming. stderr is drained
+    on a thread (a chatty git must never block on a full pipe the caller is
+    not reading); the returned callable joins it and returns the text.
+    """
+    note_git_spawn(args)
+    p = subprocess.Popen(["git"] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    return p, drain_git_stderr(p)
+
+
+def drain_git_stderr(p: Any) -> Any:
+    """Read p's stderr on a thread; the returned callable joins it and returns the text."""
+    chunks: List[str] = []
+    drain = threading.Thread(target=lambda: chunks.append(p.stderr.read()), name="git-stderr", daemon=True)
+    drain.start()
+
+    def finish_stderr() -> str:
+        drain.join()
+        p.stderr.close()
+        return "".join(chunks)
+
+    return finish_stderr
+
+
+def git_first_offending_path(args: List[str], count_limit: int = 1) -> Tuple[Optional[str], int, bool]:
+    """
+    Stream `git <args>` path output and stop as soon as count_limit non-ignored
+    paths have been seen; the git process is killed instead of drained.
+
+    Returns (first_path, count, truncated). With count_limit > 1 the scan reads one
+    path past the limit so truncated tells whether more offending paths exist.
+    """
+    debug("git_first_offending_path: git %s (limit=%s)", lambda: " ".join(args), count_limit)
+    stop_after = max(1, count_limit) + (1 if count_limit > 1 else 0)
+    first: Optional[str] = None
+    count = 0
+    stopped_early = False
+
+    def scan(lines: Any) -> None:
+        nonlocal first, count, stopped_early
+        for line in lines:
+            if not line.strip():
+                continue
+            path = normalize_repo_rel_path(line.rstrip("\n"))
+            if is_ignored_generated(path):
+                continue
+            if first is None:
+                first = path
+            count += 1
+            if count >= stop_after:
+                stopped_early = True
+                break
+
+    if _SESSION is not None and tuple(args) in _SESSION.git:
+        # Already produced in full by an earlier stage; nothing left to short-circuit.
+        _SESSION.git_hits += 1
+        returncode, stdout, stderr = _SESSION.git[tuple(args)]
+        if returncode != 0:
+            raise RuntimeError(f"git {' '.join(args)} failed: {stderr.strip()}")
+        scan(stdout.splitlines())
+        return first, min(count, max(1, count_limit)), count_limit > 1 and count > count_limit
+
+    live = _GIT_PREFETCH.take_stream(args) if _GIT_PREFETCH is not None else None
+    if live is not None:
+        # Prefetched and still unread: stream it like our own process.
+        (p, started), kind = live, "prefetch"
+        finish_stderr = drain_git_stderr(p)
+    else:
+        started, kind = time.perf_counter(), "stream"
+        p, finish_stderr = popen_git_stream(args)
+    assert p.stdout is not None
+    try:
+        scan(p.stdout)
+    finally:
+        if stopped_early:
+            p.kill()
+        p.stdout.close()
+        stderr = finish_stderr()
+        p.wait()
+        note_git_process(kind, started, args)
+
+    if not stopped_early and p.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {stderr.strip()}")
+
+    truncated = count_limit > 1 and count > count_limit
+    return first, min(count, max(1, count_limit)), truncated
+
+
+def repo_root_from_git() -> Path:
+    root = Path(run_git(["rev-parse", "--show-toplevel"]).strip())
+    debug("repo_root_from_git: %s", root)
+    return root
 
 
 def is_ci_environment() -> bool:
@@ -315,40 +1076,132 @@ def git_first_parent(commit: str) -> Optional[str]:
     return parents[0] if parents else None
 
 
-def select_ci_base_ref(framework: Dict[str, Any]) -> Optional[str]:
+def ci_base_ref_candidates(framework: Dict[str, Any]) -> List[str]:
     cfg = framework.get("governance", {}) if isinstance(framework.get("governance", {}), dict) else {}
     ci_cfg = cfg.get("ci", {}) if isinstance(cfg.get("ci", {}), dict) else {}
     candidates = ci_cfg.get("base_ref_candidates")
 
-    base_candidates: List[str]
     if isinstance(candidates, list) and all(isinstance(x, str) and str(x).strip() for x in candidates):
-        base_candidates = [str(x).strip() for x in candidates]
-    else:
-        base_candidates = ["origin/main", "origin/master", "main", "master"]
+        return [str(x).strip() for x in candidates]
+    return ["origin/main", "origin/master", "main", "master"]
+
 
-    for cand in base_candidates:
-        if _git_ref_exists(cand):
+def resolve_ci_refs(candidates: List[str]) -> Tuple[Dict[str, Optional[str]], List[str]]:
+    """
+    Resolve the base ref candidates and HEAD through one `git cat-file --batch`.
+
+    Returns ({rev: oid or None} for every candidate and "HEAD", HEAD's parents).
+    The parents come from HEAD's commit object, so HEAD^1/HEAD^2 need no further
+    lookups. Names resolve exactly as `git rev-parse --verify` would.
+    """
+    resolved: Dict[str, Optional[str]] = {}
+    head_parents: List[str] = []
+    with GitCatFileBatch() as batch:
+        for rev in list(dict.fromkeys(candidates + ["HEAD"])):
+            obj = batch.read(rev)
+            resolved[rev] = obj[0] if obj is not None else None
+            if rev == "HEAD" and obj is not None and obj[1] == "commit":
+                for line in obj[2].split(b"\n"):
+                    if not line:
+                        break
+                    if line.startswith(b"parent "):
+                        head_parents.append(line[len(b"parent "):].decode("ascii"))
+    debug("resolve_ci_refs: %s head_parents=%s", resolved, head_parents)
+    return resolved, head_parents
+
+
+def select_ci_base_ref(framework: Dict[str, Any], resolved: Dict[str, Optional[str]]) -> Optional[str]:
+    for cand in ci_base_ref_candidates(framework):
+        if resolved.get(cand):
             return cand
     return None
 
 
-def detect_synthetic_merge_head(base_ref: str) -> Tuple[str, bool, Dict[str, Any]]:
-    parents = git_commit_parents("HEAD")
+def startup_git_queries(stage: str) -> List[List[str]]:
+    """Git queries a stage needs that depend on nothing but the working directory."""
+    queries: List[List[str]] = [["rev-parse", "--show-toplevel"]]
+    if stage == "coding":
+        queries += [["diff", "--name-status", "--no-renames"], ["ls-files", "--others", "--exclude-standard"]]
+    elif stage in ("verification", "ci"):
+        queries += [["diff", "--name-only"], ["ls-files", "--others", "--exclude-standard"]]
+    return queries
+
+
+def configured_trusted_ref_globs(framework: Dict[str, Any]) -> List[str]:
+    cfg = framework.get("governance", {}) if isinstance(framework.get("governance", {}), dict) else {}
+    ci_cfg = cfg.get("ci", {}) if isinstance(cfg.get("ci", {}), dict) else {}
+    globs = ci_cfg.get("trusted_ref_globs")
+    if not isinstance(globs, list):
+        return []
+    return [str(x).strip() for x in globs if isinstance(x, str) and str(x).strip()]
+
+
+def trusted_ref_patterns(globs: List[str]) -> List[str]:
+    """
+    `git for-each-ref` patterns for trusted ref globs. A glob not starting with
+    refs/ is tried under refs/, refs/heads/, refs/remotes/ and refs/tags/, so
+    "origin/release/*", "refs/remotes/origin/release/*" and "main" all work.
+    """
+    patterns: List[str] = []
+    for g in globs:
+        candidates = [g] if g.startswith("refs/") else [f"{ns}{g}" for ns in ("refs/", "refs/heads/", "refs/remotes/", "refs/tags/")]
+        patterns.extend(c for c in candidates if c not in patterns)
+    return patterns
+
+
+def expand_trusted_refs(globs: List[str], pr_head: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Resolve trusted ref globs to (refname, oid) with git's own ref matching
+    (`*` does not cross `/`; a literal matches up to a slash).
+
+    Refs that contain pr_head (the PR branch itself, a remote copy of it, or a
+    blanket glob such as "*") would exclude the commits under test and are
+    dropped. Returns (trusted refs, dropped refnames).
+    """
+    if not globs:
+        return [], []
+    patterns = trusted_ref_patterns(globs)
+    out = run_git(["for-each-ref", "--format=%(objectname) %(refname)", "--no-contains", pr_head, "--"] + patterns)
+    matched: List[Tuple[str, str]] = []
+    for line in out.splitlines():
+        parts = line.split(" ", 1)
+        if len(parts) == 2:
+            matched.append((parts[1], parts[0]))
+    dropped = run_git(["for-each-ref", "--format=%(refname)", "--contains", pr_head, "--"] + patterns).split()
+    return matched, dropped
+
+
+def list_replay_commits(merge_base: str, pr_head: str, trusted_oids: List[str]) -> List[str]:
+    """merge_base..pr_head in replay order, minus commits reachable from trusted refs."""
+    if not trusted_oids:
+        rev_out = run_git(["rev-list", "--reverse", f"{merge_base}..{pr_head}"])
+    else:
+        # Feed the exclusions through stdin: a glob can match thousands of refs.
+        stdin = "\n".join([pr_head, f"^{merge_base}"] + [f"^{oid}" for oid in trusted_oids]) + "\n"
+        rev_out = run_git(["rev-list", "--reverse", "--stdin"], input_text=stdin)
+    return [c.strip() for c in rev_out.splitlines() if c.strip()]
+
+
+def detect_synthetic_merge_head(
+    base_ref: str, resolved: Dict[str, Optional[str]], parents: List[str]
+) -> Tuple[str, bool, Dict[str, Any]]:
+    head = resolved.get("HEAD")
+    if not head:
+        raise RuntimeError("git cat-file --batch could not resolve HEAD")
     is_merge = len(parents) == 2
 
     meta: Dict[str, Any] = {
         "ci_head_is_merge": is_merge,
         "ci_synthetic_merge": False,
-        "ci_pr_head": run_git(["rev-parse", "HEAD"]).strip(),
+        "ci_pr_head": head,
         "ci_head_parents": parents,
     }
 
     if not is_merge:
         return meta["ci_pr_head"], False, meta
 
-    p1 = run_git(["rev-parse", "HEAD^1"]).strip()
-    p2 = run_git(["rev-parse", "HEAD^2"]).strip()
-    base_tip = run_git(["rev-parse", base_ref]).strip()
+    p1, p2 = parents
+    base_tip = resolved.get(base_ref)
     if p1 == base_tip:
         meta["ci_synthetic_merge"] = True
         meta["ci_pr_head"] = p2
@@ -357,8 +1210,9 @@ def detect_synthetic_merge_head(base_ref: str) -> Tuple[str, bool, Dict[str, Any
     return meta["ci_pr_head"], False, meta
 
 
-def git_diff_tree_name_status(commit: str) -> str:
-    return run_git(["diff-tree", "--name-status", "-r", "--no-commit-id", "--root", commit])
+def git_diff_tree_name_status(commit: str, pathspecs: Optional[List[str]] = None) -> str:
+    args = ["diff-tree", "--name-status", "-r", "--no-commit-id", "--root", commit]
+    return run_git(args + ["--", *pathspecs] if pathspecs else args)
 
 
 def parse_name_status_with_rename_expansion(output: str) -> List[ChangedFile]:
@@ -398,6 +1252,13 @@ def is_symlink_in_ref(ref: str, repo_rel_path: str) -> bool:
 
 def git_blob_exists(ref: str, repo_rel_path: str) -> bool:
     p = normalize_repo_rel_path(repo_rel_path)
+    if _GIT_BATCH is not None:
+        return _GIT_BATCH.read(f"{ref}:{p}") is not None
+    if _GIT_MEMO is not None:
+        # A memoised `git show <ref>:<path>` already answers the question.
+        shown = _GIT_MEMO.lookup_alias(["show", f"{ref}:{p}"])
+        if shown is not None:
+            return shown[0]
     try:
         run_git(["cat-file", "-e", f"{ref}:{p}"])
         return True
@@ -434,22 +1295,27 @@ def normalize_intent_status(status_value: Any) -> Tuple[Optional[str], Optional[
     return None, None
 
 
-def list_changed_files(stage: str) -> Tuple[List[ChangedFile], Dict[str, Any]]:
+def list_changed_files(stage: str, repo_root: Optional[Path] = None) -> Tuple[List[ChangedFile], Dict[str, Any]]:
     files: Dict[str, ChangedFile] = {}
     meta: Dict[str, Any] = {}
 
+    def add_staged() -> None:
+        # Prefer the in-process index reader; fall back to git if the index uses
+        # a layout the reader does not support (split/sparse index, etc.).
+        if repo_root is not None:
+            try:
+                for c in session_load("index", repo_root, lambda: staged_changes_from_index(repo_root)):
+                    files[c.path] = c
+                return
+            except Exception as e:
+                debug("index reader unavailable, falling back to git diff --cached: %r", e)
+        add_from_name_status(run_git(["diff", "--cached", "--name-status", "--no-renames"]))
+
     def add_from_name_status(output: str) -> None:
-        for line in output.splitlines():
-            if not line.strip():
-                continue
-            parts = line.split("\t")
-            status = parts[0].strip()
-            if status.startswith("R") and len(parts) >= 3:
-                new_path = parts[2].strip()
-                files[new_path] = ChangedFile(path=new_path, status=status)
-            elif len(parts) >= 2:
-                path = parts[1].strip()
-                files[path] = ChangedFile(path=path, status=status)
+        # Every listing runs with --no-renames: a rename is D + A here, in the
+        # index reader and in the CI replay alike.
+        for c in parse_name_status_with_rename_expansion(output):
+            files[c.path] = c
 
     def add_untracked(output: str) -> None:
         for line in output.splitlines():
@@ -458,21 +1324,18 @@ def list_changed_files(stage: str) -> Tuple[List[ChangedFile], Dict[str, Any]]:
                 continue
             files[p] = ChangedFile(path=p, status="U")
 
-    debug(f"list_changed_files: stage={stage}")
+    debug("list_changed_files: stage=%s", stage)
     if stage == "verification":
-        add_from_name_status(run_git(["diff", "--cached", "--name-status"]))
+        add_staged()
         add_untracked(run_git(["ls-files", "--others", "--exclude-standard"]))
     elif stage == "coding":
-        add_from_name_status(run_git(["diff", "--cached", "--name-status"]))
-        add_from_name_status(run_git(["diff", "--name-status"]))
+        add_staged()
+        add_from_name_status(run_git(["diff", "--name-status", "--no-renames"]))
         add_untracked(run_git(["ls-files", "--others", "--exclude-standard"]))
     elif stage == "ci":
         base_candidates = ["origin/main", "origin/master", "main", "master"]
-        base_ref: Optional[str] = None
-        for cand in base_candidates:
-            if _git_ref_exists(cand):
-                base_ref = cand
-                break
+        resolved, head_parents = resolve_ci_refs(base_candidates)
+        base_ref: Optional[str] = next((c for c in base_candidates if resolved.get(c)), None)
 
         meta["ci_base_ref"] = base_ref
         meta["ci_merge_base"] = None
@@ -482,40 +1345,358 @@ def list_changed_files(stage: str) -> Tuple[List[ChangedFile], Dict[str, Any]]:
             try:
                 merge_base = run_git(["merge-base", base_ref, "HEAD"]).strip()
                 meta["ci_merge_base"] = merge_base
-                add_from_name_status(run_git(["diff", "--name-status", f"{merge_base}..HEAD"]))
+                add_from_name_status(run_git(["diff", "--name-status", "--no-renames", f"{merge_base}..HEAD"]))
             except Exception as e:
-                debug(f"ci merge-base or diff failed, fallback: {e}")
+                debug("ci merge-base or diff failed, fallback: %s", e)
                 base_ref = None
                 meta["ci_base_ref"] = None
                 meta["ci_merge_base"] = None
 
         if base_ref is None:
             # Fallback: HEAD~1..HEAD (if possible), else diff root
-            try:
-                run_git(["rev-parse", "--verify", "HEAD~1"])
+            if head_parents:
                 meta["ci_fallback_mode"] = "head~1"
-                add_from_name_status(run_git(["diff", "--name-status", "HEAD~1..HEAD"]))
-            except Exception:
+                add_from_name_status(run_git(["diff", "--name-status", "--no-renames", "HEAD~1..HEAD"]))
+            else:
                 meta["ci_fallback_mode"] = "root"
-                add_from_name_status(run_git(["diff", "--name-status", "--root", "HEAD"]))
+                add_from_name_status(run_git(["diff", "--name-status", "--no-renames", "--root", "HEAD"]))
     else:
         raise ValueError(f"Unknown stage: {stage}")
 
-    debug(f"list_changed_files: count={len(files)}")
+    debug("list_changed_files: count=%s", len(files))
     return sorted(files.values(), key=lambda x: x.path), meta
 
 
+# ----------------------------
+# In-process index reader (staged changes)
+# ----------------------------
+
+_INDEX_FLAG_EXTENDED = 0x4000
+_INDEX_EXT_FLAG_INTENT_TO_ADD = 0x2000
+_S_IFMT = 0o170000
+_S_IFDIR = 0o040000
+
+
+def git_dir_for_repo(repo_root: Path) -> Path:
+    env_dir = os.environ.get("GIT_DIR")
+    if env_dir:
+        return Path(env_dir).resolve()
+    dotgit = repo_root / ".git"
+    if dotgit.is_file():
+        # Linked worktrees and submodules use a "gitdir: <path>" pointer file.
+        content = dotgit.read_text(encoding="utf-8").strip()
+        if not content.startswith("gitdir:"):
+            raise ValueError(f"Unrecognised .git file: {dotgit}")
+        gd = Path(content[len("gitdir:"):].strip())
+        return gd if gd.is_absolute() else (repo_root / gd).resolve()
+    return dotgit
+
+
+class GitCatFileBatch:
+    """
+    Persistent `git cat-file --batch` reader: one subprocess serves any number of
+    object lookups.
+    """
+
+    def __init__(self) -> None:
+        debug("GitCatFileBatch: git cat-file --batch")
+        self._started = time.perf_counter()
+        note_git_spawn(["cat-file"])
+        self._p = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def read(self, rev: str) -> Optional[Tuple[str, str, bytes]]:
+        """Return (oid, type, content) for rev, or None if the object is missing."""
+        assert self._p.stdin is not None and self._p.stdout is not None
+        self._p.stdin.write(rev.encode("utf-8") + b"\n")
+        self._p.stdin.flush()
+        header = self._p.stdout.readline()
+        if not header:
+            raise RuntimeError(f"git cat-file --batch exited while reading {rev!r}")
+        parts = header.split()
+        if len(parts) != 3:
+            # "<rev> missing" / "<rev> ambiguous"
+            return None
+        size = int(parts[2])
+        content = self._p.stdout.read(size)
+        self._p.stdout.read(1)  # trailing LF
+        return parts[0].decode("ascii"), parts[1].decode("ascii"), content
+
+    def close(self) -> None:
+        try:
+            if self._p.stdin is not None:
+                self._p.stdin.close()
+        finally:
+            self._p.wait()
+            note_git_process("batch", self._started, ["cat-file", "--batch"])
+
+    def __enter__(self) -> "GitCatFileBatch":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# --git-batch: one reader serves commit-scoped blob reads for the whole run.
+_GIT_BATCH: Optional[GitCatFileBatch] = None
+
+
+def _decode_index_varint(buf: Any, pos: int) -> Tuple[int, int]:
+    # git's offset varint (varint.c): every continuation byte adds one before shifting.
+    c = buf[pos]
+    pos += 1
+    val = c & 0x7F
+    while c & 0x80:
+        c = buf[pos]
+        pos += 1
+        val = ((val + 1) << 7) | (c & 0x7F)
+    return val, pos
+
+
+class GitIndexSnapshot(_Record):
+    version: int
+    entries: Dict[bytes, Tuple[int, bytes]]  # path -> (mode, oid) for stage-0 entries
+    unmerged: List[bytes]
+    cache_tree: Dict[bytes, bytes]  # "dir/" prefix ("" for root) -> tree oid (valid entries only)
+
+
+def _parse_index_cache_tree(data: bytes, hash_size: int) -> Dict[bytes, bytes]:
+    out: Dict[bytes, bytes] = {}
+    pos = 0
+    # (prefix, remaining subtrees) for the directories currently being expanded
+    stack: List[List[Any]] = []
+    while pos < len(data):
+        nul = data.index(b"\0", pos)
+        name = data[pos:nul]
+        nl = data.index(b"\n", nul + 1)
+        entry_count_raw, subtree_count_raw = data[nul + 1:nl].split(b" ")
+        pos = nl + 1
+
+        while stack and stack[-1][1] == 0:
+            stack.pop()
+        parent = b""
+        if stack:
+            stack[-1][1] -= 1
+            parent = stack[-1][0]
+        prefix = parent + name + b"/" if name else parent
+
+        if int(entry_count_raw) >= 0:
+            out[prefix] = data[pos:pos + hash_size]
+            pos += hash_size
+        stack.append([prefix, int(subtree_count_raw)])
+    return out
+
+
+def read_git_index(index_path: Path, hash_size: int = 20) -> GitIndexSnapshot:
+    """
+    Parse a git index file (versions 2-4) via mmap.
+
+    Raises ValueError for layouts this reader does not model (split index,
+    sparse-directory entries, unknown required extensions).
+    """
+    with open(index_path, "rb") as fh:
+        buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if buf[:4] != b"DIRC":
+            raise ValueError(f"not a git index: {index_path}")
+        version, count = struct.unpack_from(">II", buf, 4)
+        if version not in (2, 3, 4):
+            raise ValueError(f"unsupported index version: {version}")
+
+        entries: Dict[bytes, Tuple[int, bytes]] = {}
+        unmerged: List[bytes] = []
+        flags_off = 40 + hash_size
+        pos = 12
+        prev_name = b""
+        for _ in range(count):
+            start = pos
+            mode = struct.unpack_from(">I", buf, start + 24)[0]
+            oid = buf[start + 40:start + flags_off]
+            flags = struct.unpack_from(">H", buf, start + flags_off)[0]
+            name_pos = start + flags_off + 2
+            ext_flags = 0
+            if version >= 3 and flags & _INDEX_FLAG_EXTENDED:
+                ext_flags = struct.unpack_from(">H", buf, name_pos)[0]
+                name_pos += 2
+
+            if version == 4:
+                strip, name_pos = _decode_index_varint(buf, name_pos)
+                nul = buf.find(b"\0", name_pos)
+                name = prev_name[:len(prev_name) - strip] + buf[name_pos:nul]
+                pos = nul + 1
+            else:
+                name_len = flags & 0x0FFF
+                nul = buf.find(b"\0", name_pos) if name_len == 0x0FFF else name_pos + name_len
+                name = buf[name_pos:nul]
+                pos = start + ((nul - start + 8) & ~7)
+            prev_name = name
+
+            if (mode & _S_IFMT) == _S_IFDIR:
+                raise ValueError("sparse index directory entries are not supported")
+            if ext_flags & _INDEX_EXT_FLAG_INTENT_TO_ADD:
+                continue
+            if (flags >> 12) & 0x3:
+                if not unmerged or unmerged[-1] != name:
+                    unmerged.append(name)
+                continue
+            entries[name] = (mode, oid)
+
+        cache_tree: Dict[bytes, bytes] = {}
+        end = len(buf) - hash_size
+        while pos + 8 <= end:
+            sig = buf[pos:pos + 4]
+            size = struct.unpack_from(">I", buf, pos + 4)[0]
+            data = buf[pos + 8:pos + 8 + size]
+            pos += 8 + size
+            if sig == b"TREE":
+                cache_tree = _parse_index_cache_tree(data, hash_size)
+            elif not (65 <= sig[0] <= 90):
+                # Lowercase signatures ("link", "sdir", ...) are required extensions.
+                raise ValueError(f"unsupported required index extension: {sig!r}")
+    finally:
+        buf.close()
+
+    return GitIndexSnapshot(version=version, entries=entries, unmerged=unmerged, cache_tree=cache_tree)
+
+
+def _iter_tree_entries(content: bytes, hash_size: int) -> Any:
+    pos = 0
+    while pos < len(content):
+        sp = content.index(b" ", pos)
+        nul = content.index(b"\0", sp + 1)
+        yield int(content[pos:sp], 8), content[sp + 1:nul], content[nul + 1:nul + 1 + hash_size]
+        pos = nul + 1 + hash_size
+
+
+def staged_changes_from_index(repo_root: Path) -> List[ChangedFile]:
+    """
+    In-process equivalent of `git diff --cached --name-status --no-renames`
+    (renames are reported as D + A, like every other change listing).
+
+    HEAD's tree is walked through a single `git cat-file --batch` process;
+    subtrees whose OID equals the index cache-tree OID are skipped unread.
+    """
+    index_path = Path(os.environ.get("GIT_INDEX_FILE") or (git_dir_for_repo(repo_root) / "index"))
+    if not index_path.exists():
+        raise ValueError(f"git index not found: {index_path}")
+
+    head: Dict[bytes, Tuple[int, bytes]] = {}
+    skipped: set = set()
+    with GitCatFileBatch() as batch:
+        head_tree = batch.read("HEAD^{tree}")
+        hash_size = len(head_tree[0]) // 2 if head_tree is not None else 20
+        index = read_git_index(index_path, hash_size=hash_size)
+        debug("staged_changes_from_index: version=%s entries=%s cache_tree=%s", index.version, len(index.entries), len(index.cache_tree))
+
+        pending: List[Tuple[bytes, bytes]] = []
+        if head_tree is not None:
+            pending.append((b"", bytes.fromhex(head_tree[0])))
+        while pending:
+            prefix, tree_oid = pending.pop()
+            if index.cache_tree.get(prefix) == tree_oid:
+                skipped.add(prefix)
+                continue
+            obj = batch.read(tree_oid.hex())
+            if obj is None or obj[1] != "tree":
+                raise RuntimeError(f"failed to read HEAD tree {tree_oid.hex()}")
+            for mode, name, oid in _iter_tree_entries(obj[2], hash_size):
+                if (mode & _S_IFMT) == _S_IFDIR:
+                    pending.append((prefix + name + b"/", oid))
+                else:
+                    head[prefix + name] = (mode, oid)
+
+    def under_skipped(path: bytes) -> bool:
+        i = path.find(b"/")
+        while i != -1:
+            if path[:i + 1] in skipped:
+                return True
+            i = path.find(b"/", i + 1)
+        return False
+
+    changes: List[Tuple[bytes, str]] = []
+    if b"" not in skipped:
+        for path, (mode, oid) in index.entries.items():
+            if skipped and under_skipped(path):
+                continue
+            h = head.pop(path, None)
+            if h is None:
+                changes.append((path, "A"))
+            elif h != (mode, oid):
+                changes.append((path, "T" if (h[0] & _S_IFMT) != (mode & _S_IFMT) else "M"))
+        unmerged = set(index.unmerged)
+        changes.extend((path, "D") for path in head if path not in unmerged)
+    changes.extend((path, "U") for path in index.unmerged)
+
+    return [ChangedFile(path=p.decode("utf-8", "surrogateescape"), status=s) for p, s in changes]
+
+
 # ----------------------------
 # Path matching
 # ----------------------------
 
+def find_symlinked_paths(repo_root: Path, repo_rel_paths: List[str]) -> Dict[str, str]:
+    """
+    Return {path: symlinked component} for paths where the leaf or any parent
+    directory is a symlink in the working tree.
+
+    Each directory on the way is listed once with os.scandir, however many of the
+    paths share it. Missing directories are skipped (nothing to follow).
+    """
+    wanted: Dict[str, set] = {}
+    for p in repo_rel_paths:
+        parts = p.split("/")
+        for i in range(len(parts)):
+            wanted.setdefault("/".join(parts[:i]), set()).add(parts[i])
+
+    symlinks: set = set()
+    for parent, names in wanted.items():
+        try:
+            with os.scandir(repo_root / parent if parent else repo_root) as it:
+                for entry in it:
+                    if entry.name in names and entry.is_symlink():
+                        symlinks.add(f"{parent}/{entry.name}" if parent else entry.name)
+        except OSError:
+            continue
+
+    out: Dict[str, str] = {}
+    if not symlinks:
+        return out
+    for p in repo_rel_paths:
+        i = p.find("/")
+        while True:
+            component = p if i == -1 else p[:i]
+            if component in symlinks:
+                out[p] = component
+                break
+            if i == -1:
+                break
+            i = p.find("/", i + 1)
+    return out
+
+
+_GLOB_SET_CACHE: Dict[Tuple[str, ...], Any] = {}
+# Regex sources of pattern lists, seeded from the compiled policy artifact.
+_GLOB_SET_SOURCES: Dict[Tuple[str, ...], str] = {}
+
+
+def glob_set_source(patterns: List[str]) -> str:
+    parts = [_translate_glob(os.path.normcase(pat.replace("\\", "/"))) for pat in patterns]
+    return "|".join(parts) or "(?!)"
+
+
 def matches_any_glob(path: str, patterns: List[str]) -> bool:
-    p = path.replace("\\", "/")
-    for pat in patterns:
-        pat2 = pat.replace("\\", "/")
-        if fnmatch.fnmatch(p, pat2):
-            return True
-    return False
+    # fnmatch.fnmatch() semantics (normcase on both sides), but each pattern
+    # list is compiled once into a single alternation.
+    key = tuple(patterns)
+    rx = _GLOB_SET_CACHE.get(key)
+    if rx is None:
+        source = _GLOB_SET_SOURCES.get(key)
+        rx = _GLOB_SET_CACHE[key] = re.compile(source if source is not None else glob_set_source(patterns))
+    return rx.match(os.path.normcase(path.replace("\\", "/"))) is not None
 
 
 _GENERATED_OUTPUT_GLOBS = [
@@ -532,15 +1713,22 @@ def is_ignored_generated(path: str) -> bool:
 # Validation core
 # ----------------------------
 
-@dataclass
-class Finding:
+class Finding(_Record):
     level: str  # "fail" | "warn" | "info"
     code: str
     message: str
     path: Optional[str] = None
 
+    def __init__(self, level: str, code: str, message: str, path: Optional[str] = None) -> None:
+        self.level = level
+        self.code = code
+        self.message = message
+        self.path = path
+
 
 def now_iso() -> str:
+    from datetime import datetime, timezone
+
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
 
@@ -567,111 +1755,417 @@ def make_summary(stage: str) -> Dict[str, Any]:
         "ci_fallback_mode": None,
         "ci_commit_count": 0,
         "ci_commits": [],
+        "ci_shard": None,
+        "ci_trusted_refs": None,
+        "ci_trusted_refs_ignored": None,
+        "ci_trusted_excluded_commit_count": None,
+        "ci_replay_stopped": None,
+        "ci_first_bad": None,
+        "ci_resumed_from": None,
+        "ci_closed_packs": None,
+        "audit_range": None,
+        "audit_rollup": None,
+        "pre_receive_updates": None,
+        "packs": None,
+        "git_cache": None,
+        "git_prefetch": None,
+        "session_cache": None,
+        "policy_artifact": None,
+        "git_spawns": None,
         "findings": [],
+        "findings_truncated": None,
         "debug": {},
     }
 
 
 def add_debug(summary: Dict[str, Any], key: str, value: Any) -> None:
-    if _DEBUG:
+    """Record a report debug field; a callable value is only evaluated with --debug."""
+    if _REPORT_DEBUG:
         summary.setdefault("debug", {})
-        summary["debug"][key] = value
+        summary["debug"][key] = _lazy(value)
 
 
 def add_fail(summary: Dict[str, Any], findings: List[Finding], code: str, msg: str, path: Optional[str] = None) -> None:
-    findings.append(Finding("fail", code, msg, path))
+    # The verdict never depends on whether the detailed finding is kept.
     summary["pass"] = False
+    if admit_finding(findings, code, path, "fail"):
+        findings.append(Finding("fail", code, msg, path))
 
 
 def add_warn(summary: Dict[str, Any], findings: List[Finding], code: str, msg: str, path: Optional[str] = None) -> None:
-    findings.append(Finding("warn", code, msg, path))
+    if admit_finding(findings, code, path, "warn"):
+        findings.append(Finding("warn", code, msg, path))
 
 
-def normalize_repo_rel_path(path: str) -> str:
-    p = str(path).replace("\\", "/").strip()
-    while p.startswith("./"):
-        p = p[2:]
-    p = p.lstrip("/")
-    p = os.path.normpath(p).replace("\\", "/")
-    return p
+# ----------------------------
+# Finding caps
+# ----------------------------
 
+# Directories tracked per capped code; the rest are counted under "(other)".
+_FINDING_HISTOGRAM_MAX_DIRS = 50
 
-def load_framework_config(repo_root: Path) -> Dict[str, Any]:
-    fpath = repo_root / ".intent-ops" / "framework" / "config" / "framework.yml"
-    debug(f"load_framework_config: {fpath}")
-    return load_yaml_subset(fpath)
 
+class FindingCaps(_Record):
+    """Max detailed findings kept per code: default (None = unbounded) and per_code overrides."""
 
-def derive_framework_paths(framework: Dict[str, Any]) -> Dict[str, str]:
-    paths = framework.get("paths", {}) if isinstance(framework.get("paths", {}), dict) else {}
-    framework_root = normalize_repo_rel_path(paths.get("framework_root", ".intent-ops/framework"))
-    intents_root = normalize_repo_rel_path(paths.get("intents_root", ".intent-ops/intents"))
-    current_intent_file = normalize_repo_rel_path(paths.get("current_intent_file", ".intent-ops/intents/current-intent.json"))
-    return {
-        "framework_root": framework_root,
-        "intents_root": intents_root,
-        "current_intent_file": current_intent_file,
-    }
+    default: Optional[int] = None
+    per_code: Dict[str, int] = _Factory(dict)
 
+    def limit(self, code: str) -> Optional[int]:
+        return self.per_code.get(code, self.default)
 
-def load_zones_config(repo_root: Path, framework_root: str) -> Dict[str, Any]:
-    zpath = repo_root / framework_root / "config" / "zones.yml"
-    debug(f"load_zones_config: {zpath}")
-    return load_yaml_subset(zpath)
+    def active(self) -> bool:
+        return self.default is not None or bool(self.per_code)
 
 
-def load_current_intent(repo_root: Path, current_intent_file: str) -> Dict[str, Any]:
-    cpath = repo_root / current_intent_file
-    debug(f"load_current_intent: {cpath}")
-    if not cpath.exists():
-        raise FileNotFoundError(str(cpath))
-    data = json.loads(cpath.read_text(encoding="utf-8"))
-    debug(f"load_current_intent: keys={list(data.keys())}")
-    return data
+class FindingBudget:
+    """
+    Applies FindingCaps while findings are generated: past the cap a finding is
+    only counted (total plus a bounded per-directory histogram) instead of
+    being materialised, sorted and serialised.
 
+    `truncated` is {code: {"level", "limit", "total", "dirs"}} for codes that went over
+    their cap; it is filled in place, so reports can reference it up front.
+    """
 
-def resolve_active_pack(intents_root: Path, current_intent: Dict[str, Any]) -> Path:
-    intents_root = intents_root.resolve()
-    pack_rel = current_intent.get("active_pack_path")
-    debug(f"resolve_active_pack: intents_root={intents_root} active_pack_path={pack_rel!r}")
-    if not isinstance(pack_rel, str) or not pack_rel:
-        raise ValueError("current-intent.json missing/invalid active_pack_path")
-    pack_path = (intents_root / normalize_repo_rel_path(pack_rel)).resolve()
-    debug(f"resolve_active_pack: resolved={pack_path}")
-    if intents_root not in pack_path.parents and pack_path != intents_root:
-        raise ValueError("active_pack_path escapes intents root")
-    return pack_path
+    def __init__(self, caps: FindingCaps) -> None:
+        self.caps = caps
+        self.counts: Dict[str, int] = {}
+        self.dirs: Dict[str, Dict[str, int]] = {}
+        self.truncated: Dict[str, Dict[str, Any]] = {}
 
+    def admit(self, code: str, path: Optional[str], level: str = "fail") -> bool:
+        limit = self.caps.limit(code)
+        if limit is None:
+            return True
+        n = self.counts.get(code, 0) + 1
+        self.counts[code] = n
 
-def load_intent_json(active_pack: Path) -> Dict[str, Any]:
-    ipath = active_pack / "intent.json"
-    debug(f"load_intent_json: {ipath}")
-    if not ipath.exists():
-        raise FileNotFoundError(str(ipath))
-    data = json.loads(ipath.read_text(encoding="utf-8"))
-    debug(f"load_intent_json: keys={list(data.keys())}")
-    return data
+        hist = self.dirs.setdefault(code, {})
+        d = "(none)" if not path else (path.rsplit("/", 1)[0] if "/" in path else ".")
+        if d not in hist and len(hist) >= _FINDING_HISTOGRAM_MAX_DIRS:
+            d = "(other)"
+        hist[d] = hist.get(d, 0) + 1
 
+        if n <= limit:
+            return True
+        info = self.truncated.get(code)
+        if info is None:
+            info = self.truncated[code] = {"level": level, "limit": limit, "total": n, "dirs": hist}
+        info["total"] = n
+        return False
 
-def load_json_from_git_show(repo_rel_path: str, ref: str = "HEAD") -> Optional[Dict[str, Any]]:
-    p = normalize_repo_rel_path(repo_rel_path)
-    try:
-        raw = run_git(["show", f"{ref}:{p}"])
-    except Exception:
-        return None
-    try:
-        return json.loads(raw)
-    except Exception:
-        return None
 
+class FindingList(list):
+    """List of Finding that may carry a FindingBudget (see admit_finding)."""
 
-def load_yaml_subset_from_git_show(repo_rel_path: str, ref: str) -> Optional[Dict[str, Any]]:
-    p = normalize_repo_rel_path(repo_rel_path)
-    try:
-        raw = run_git(["show", f"{ref}:{p}"])
-    except Exception:
-        return None
-    try:
+    budget: Optional[FindingBudget] = None
+
+
+def admit_finding(findings: List[Any], code: str, path: Optional[str], level: str) -> bool:
+    budget = getattr(findings, "budget", None)
+    return budget is None or budget.admit(code, path, level)
+
+
+def finding_caps_from_config(framework: Dict[str, Any], cli_default: Optional[int]) -> Optional[FindingCaps]:
+    """
+    governance.findings.max_per_code (int) and governance.findings.per_code
+    ({CODE: int}) from framework.yml; --max-findings-per-code overrides the default.
+    """
+    gov = framework.get("governance", {}) if isinstance(framework.get("governance", {}), dict) else {}
+    cfg = gov.get("findings", {}) if isinstance(gov.get("findings", {}), dict) else {}
+
+    def as_cap(value: Any) -> Optional[int]:
+        try:
+            n = int(str(value).strip())
+        except (TypeError, ValueError):
+            return None
+        # 0 would keep no finding of a code at all, so rollups could not see it.
+        return n if n >= 1 else None
+
+    caps = FindingCaps(default=as_cap(cfg.get("max_per_code")))
+    per_code = cfg.get("per_code")
+    if isinstance(per_code, dict):
+        for code, value in per_code.items():
+            cap = as_cap(value)
+            if cap is not None:
+                caps.per_code[str(code)] = cap
+    if cli_default is not None:
+        caps.default = cli_default
+    return caps if caps.active() else None
+
+
+class RunOptions(_Record):
+    # Dirty gates stop at the first offending path; > 1 also reports a bounded count.
+    dirty_count_limit: int = 1
+    # (index, count), 1-based: replay only this contiguous slice of the CI range.
+    shard: Optional[Tuple[int, int]] = None
+    # audit stage: rev-list arguments to walk (default: all of HEAD's history).
+    rev_range: Optional[str] = None
+    # pre-receive stage: (old, new, ref) updates read from the hook's stdin.
+    ref_updates: Optional[List[Tuple[str, str, str]]] = None
+    # ci stage: extra trusted ref globs (on top of governance.ci.trusted_ref_globs).
+    trusted_ref_globs: Optional[List[str]] = None
+    # ci stage: stop at the first failing commit / after this many seconds
+    # (writing a checkpoint), and continue from a previous checkpoint.
+    fail_fast: bool = False
+    time_budget: Optional[float] = None
+    resume: bool = False
+    checkpoint_path: Optional[Path] = None
+    # ci stage: only locate the earliest failing commit.
+    first_bad: bool = False
+    # Max detailed findings per code (overrides governance.findings.max_per_code).
+    max_findings_per_code: Optional[int] = None
+    # watch mode: receives the PathPolicy compiled by the run, if it gets that far.
+    policy_sink: Optional[List["PathPolicy"]] = None
+
+
+class PathPolicy(_Record):
+    """Per-path zone and scope rules of one run, resolved once."""
+
+    stage: str
+    purple_paths: List[str]
+    orange_paths: List[str]
+    allow_purple_paths: List[str]
+    allowed_paths: List[str]
+    forbidden_paths: List[str]
+    current_intent_rel: str
+    active_pack_repo_rel: str
+    # False while a lifecycle transaction (closed pack, switch, close) is in
+    # play: those rules look at the whole change set, not one path at a time.
+    lifecycle_quiet: bool = True
+    # Files whose change invalidates the policy itself (watch mode reruns fully).
+    control_paths: List[str] = _Factory(list)
+    # Closed packs other than the active one (their files are immutable).
+    closed_packs: Optional["ClosedPackLookup"] = None
+
+    def is_under_active_pack(self, repo_rel_path: str) -> bool:
+        # Pure string check on normalised repo-relative paths. Symlinked path
+        # components under governed roots are rejected by the symlink ban, so
+        # no per-path realpath resolution is needed here.
+        prefix = (self.active_pack_repo_rel.rstrip("/") + "/") if self.active_pack_repo_rel != "." else ""
+        return repo_rel_path == self.active_pack_repo_rel or repo_rel_path.startswith(prefix)
+
+
+def path_rule_findings(policy: PathPolicy, path: str, symlinked: bool) -> List[Finding]:
+    """Zone, scope and symlink findings for one changed path (all level "fail")."""
+    p = normalize_repo_rel_path(path)
+    out: List[Finding] = []
+
+    if is_ignored_generated(p):
+        return out
+
+    # Patch 05: Symlink ban under governed roots (precomputed per directory)
+    if symlinked:
+        out.append(
+            Finding("fail", "SYMLINK_FORBIDDEN", "Symlinks are forbidden under governed roots (.intent-ops/** and .github/agents/**).", p)
+        )
+
+    if policy.closed_packs is not None and not policy.is_under_active_pack(p):
+        closed_pack = policy.closed_packs.match(p)
+        if closed_pack is not None:
+            # Immutability is the whole story for this path; zone rules would only repeat it.
+            out.append(Finding("fail", "CLOSED_INTENT_IMMUTABLE", f"Pack {closed_pack} is closed; its files are immutable.", p))
+            return out
+
+    # Treat current-intent.json as a control file (not orange)
+    if p == policy.current_intent_rel:
+        if policy.stage == "coding":
+            out.append(Finding("fail", "CURRENT_INTENT_CHANGED_IN_CODING", "current-intent.json may not be changed in coding stage.", p))
+        return out
+
+    if matches_any_glob(p, policy.purple_paths):
+        if policy.allow_purple_paths:
+            if policy.stage not in ("verification", "ci"):
+                out.append(
+                    Finding(
+                        "fail",
+                        "KERNEL_UPGRADE_FORBIDDEN_STAGE",
+                        "Kernel upgrade allowlist for purple paths is only permitted in verification or ci stage.",
+                        p,
+                    )
+                )
+                return out
+            if matches_any_glob(p, policy.allow_purple_paths):
+                return out
+            out.append(
+                Finding(
+                    "fail",
+                    "PURPLE_TOUCHED_NOT_ALLOWLISTED",
+                    "Purple zone file modified but not in kernel_upgrade.allow_purple_paths allowlist.",
+                    p,
+                )
+            )
+            return out
+
+        out.append(Finding("fail", "PURPLE_TOUCHED", "Framework (purple zone) must never be modified.", p))
+        return out
+
+    if matches_any_glob(p, policy.orange_paths) and not policy.is_under_active_pack(p):
+        out.append(
+            Finding("fail", "ORANGE_OUTSIDE_ACTIVE_PACK", "Only the active intent pack may be modified under intents (orange zone).", p)
+        )
+        return out
+
+    if policy.forbidden_paths and matches_any_glob(p, policy.forbidden_paths):
+        out.append(Finding("fail", "SCOPE_VIOLATION_FORBIDDEN", "Changed file matches scope.forbidden_paths (deny-wins).", p))
+        return out
+
+    if policy.allowed_paths and not matches_any_glob(p, policy.allowed_paths):
+        out.append(Finding("fail", "SCOPE_VIOLATION_NOT_ALLOWED", "Changed file is outside scope.allowed_paths for this intent.", p))
+
+    return out
+
+
+def governed_symlink_candidates(changed: List[ChangedFile]) -> List[str]:
+    # Deletions have nothing on disk to check.
+    return [
+        c.path
+        for c in changed
+        if not str(c.status).startswith("D") and (c.path.startswith(".intent-ops/") or c.path.startswith(".github/agents/"))
+    ]
+
+
+def evaluate_dirty_gates(summary: Dict[str, Any], findings: List[Finding], stage: str, options: RunOptions) -> None:
+    """Streaming, short-circuiting dirty worktree gates (verification + ci)."""
+
+    def gate(args: List[str], code: str, message: str) -> None:
+        try:
+            first, count, truncated = git_first_offending_path(args, options.dirty_count_limit)
+        except Exception as e:
+            debug("%s dirty gate (%s) failed to evaluate: %r", stage, code, e)
+            return
+        if first is None:
+            return
+        if options.dirty_count_limit > 1:
+            message = f"{message} {count}{'+' if truncated else ''} offending path(s) found."
+        add_fail(summary, findings, code, message, first)
+
+    if stage == "verification":
+        gate(
+            ["diff", "--name-only"],
+            "VERIFICATION_DIRTY_WORKTREE",
+            "verification stage requires a clean working tree (no unstaged tracked changes).",
+        )
+    elif stage == "ci":
+        gate(
+            ["diff", "--name-only"],
+            "CI_DIRTY_WORKTREE",
+            "ci stage requires a clean working tree (no unstaged tracked changes).",
+        )
+        gate(
+            ["ls-files", "--others", "--exclude-standard"],
+            "CI_UNTRACKED_PRESENT",
+            "ci stage requires no untracked files (excluding ignored generated outputs).",
+        )
+
+
+def normalize_repo_rel_path(path: str) -> str:
+    p = str(path).replace("\\", "/").strip()
+    while p.startswith("./"):
+        p = p[2:]
+    p = p.lstrip("/")
+    p = os.path.normpath(p).replace("\\", "/")
+    return p
+
+
+def framework_config_path(repo_root: Path) -> Path:
+    return repo_root / ".intent-ops" / "framework" / "config" / "framework.yml"
+
+
+def load_framework_config(repo_root: Path) -> Dict[str, Any]:
+    fpath = framework_config_path(repo_root)
+    debug("load_framework_config: %s", fpath)
+    return session_load("yaml", fpath, lambda: load_yaml_subset(fpath))
+
+
+def derive_framework_paths(framework: Dict[str, Any]) -> Dict[str, str]:
+    paths = framework.get("paths", {}) if isinstance(framework.get("paths", {}), dict) else {}
+    framework_root = normalize_repo_rel_path(paths.get("framework_root", ".intent-ops/framework"))
+    intents_root = normalize_repo_rel_path(paths.get("intents_root", ".intent-ops/intents"))
+    current_intent_file = normalize_repo_rel_path(paths.get("current_intent_file", ".intent-ops/intents/current-intent.json"))
+    packs_root = normalize_repo_rel_path(paths.get("packs_root", f"{intents_root}/packs"))
+    return {
+        "framework_root": framework_root,
+        "intents_root": intents_root,
+        "packs_root": packs_root,
+        "current_intent_file": current_intent_file,
+    }
+
+
+def zones_config_path(repo_root: Path, framework_root: str) -> Path:
+    return repo_root / framework_root / "config" / "zones.yml"
+
+
+def load_zones_config(repo_root: Path, framework_root: str) -> Dict[str, Any]:
+    zpath = zones_config_path(repo_root, framework_root)
+    debug("load_zones_config: %s", zpath)
+    return session_load("yaml", zpath, lambda: load_yaml_subset(zpath))
+
+
+def load_current_intent(repo_root: Path, current_intent_file: str) -> Dict[str, Any]:
+    cpath = repo_root / current_intent_file
+    debug("load_current_intent: %s", cpath)
+    data = session_load("json", cpath, lambda: _load_json_file(cpath))
+    debug("load_current_intent: keys=%s", lambda: list(data.keys()))
+    return data
+
+
+def _load_json_file(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        raise FileNotFoundError(str(path))
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def resolve_active_pack(intents_root: Path, current_intent: Dict[str, Any]) -> Path:
+    intents_root = intents_root.resolve()
+    pack_rel = current_intent.get("active_pack_path")
+    debug("resolve_active_pack: intents_root=%s active_pack_path=%r", intents_root, pack_rel)
+    if not isinstance(pack_rel, str) or not pack_rel:
+        raise ValueError("current-intent.json missing/invalid active_pack_path")
+    pack_path = (intents_root / normalize_repo_rel_path(pack_rel)).resolve()
+    debug("resolve_active_pack: resolved=%s", pack_path)
+    if intents_root not in pack_path.parents and pack_path != intents_root:
+        raise ValueError("active_pack_path escapes intents root")
+    return pack_path
+
+
+def load_intent_json(active_pack: Path) -> Dict[str, Any]:
+    ipath = active_pack / "intent.json"
+    debug("load_intent_json: %s", ipath)
+    data = session_load("json", ipath, lambda: _load_json_file(ipath))
+    debug("load_intent_json: keys=%s", lambda: list(data.keys()))
+    return data
+
+
+def git_show_blob(ref: str, repo_rel_path: str) -> str:
+    """`git show <ref>:<path>` for a file; served by the --git-batch reader when enabled."""
+    p = normalize_repo_rel_path(repo_rel_path)
+    if _GIT_BATCH is None:
+        return run_git(["show", f"{ref}:{p}"])
+    obj = _GIT_BATCH.read(f"{ref}:{p}")
+    if obj is None or obj[1] != "blob":
+        raise RuntimeError(f"git cat-file: {ref}:{p} is not a blob")
+    return _decode_git_output(obj[2])
+
+
+def load_json_from_git_show(repo_rel_path: str, ref: str = "HEAD") -> Optional[Dict[str, Any]]:
+    try:
+        raw = git_show_blob(ref, repo_rel_path)
+    except Exception:
+        return None
+    try:
+        return json.loads(raw)
+    except Exception:
+        return None
+
+
+def load_yaml_subset_from_git_show(repo_rel_path: str, ref: str) -> Optional[Dict[str, Any]]:
+    try:
+        raw = git_show_blob(ref, repo_rel_path)
+    except Exception:
+        return None
+    try:
         return load_yaml_subset_text(raw)
     except Exception:
         return None
@@ -684,7 +2178,69 @@ def _findings_sorted(findings_list: List[Dict[str, Any]]) -> List[Dict[str, Any]
     return sorted(findings_list, key=key_fn)
 
 
-def validate_commit_snapshot(commit: str, parent: Optional[str], changed: List[ChangedFile]) -> Dict[str, Any]:
+# Roots whose changes are always enumerated (symlink ban, bootstrap, kernel-missing check).
+_GOVERNED_ROOTS = (".intent-ops", ".github/agents")
+
+
+def is_under_governed_root(path: str) -> bool:
+    return any(path == root or path.startswith(root + "/") for root in _GOVERNED_ROOTS)
+
+
+def non_governed_changes_inert(
+    zone_globs: List[str], allowed: Optional[List[str]], forbidden: List[str], control_paths: List[str], pack_prefix: str
+) -> bool:
+    """
+    True if no commit-replay rule can fire on a path outside the governed
+    roots: the zone globs, the active pack and the control files (a switch or
+    close transaction looks at the whole change set) all lie under a governed
+    root, and the scope forbids nothing and allows everything (allowed=None:
+    no allowlist).
+    """
+    if not is_under_governed_root(pack_prefix.rstrip("/")) or not all(is_under_governed_root(p) for p in control_paths):
+        return False
+    # A glob with a literal governed-root directory can only match below it.
+    if not all(any(g.startswith(root + "/") for root in _GOVERNED_ROOTS) for g in zone_globs):
+        return False
+    if forbidden:
+        return False
+    return allowed is None or any(set(g) == {"*"} for g in allowed)
+
+
+def validate_commit_snapshot(
+    commit: str,
+    parent: Optional[str],
+    changed: Optional[List[ChangedFile]],
+    closed_packs: Optional["ClosedPackTrie"] = None,
+    lister: Optional[Any] = None,
+    caps: Optional[FindingCaps] = None,
+    modes: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    if _SPANS is None:
+        return _validate_commit_snapshot(commit, parent, changed, closed_packs, lister, caps, modes)
+    started = time.perf_counter()
+    try:
+        return _validate_commit_snapshot(commit, parent, changed, closed_packs, lister, caps, modes)
+    finally:
+        _SPANS.complete("validate_commit_snapshot", "commit", started, commit=commit, parent=parent, changed=len(changed or ()))
+
+
+def _validate_commit_snapshot(
+    commit: str,
+    parent: Optional[str],
+    changed: Optional[List[ChangedFile]],
+    closed_packs: Optional["ClosedPackTrie"],
+    lister: Optional[Any],
+    caps: Optional[FindingCaps],
+    modes: Optional[Dict[str, str]],
+) -> Dict[str, Any]:
+    """
+    changed=None: the changes are listed on demand with lister(pathspecs), and
+    only under the governed roots when no rule can fire on any other path.
+    result["changed_files"] then holds whatever was listed.
+
+    modes: {path: mode in commit} for the changed paths, as parsed from
+    `git log --raw`; the symlink ban then needs no `git ls-tree` per path.
+    """
     result: Dict[str, Any] = {
         "commit": commit,
         "parent": parent,
@@ -696,38 +2252,65 @@ def validate_commit_snapshot(commit: str, parent: Optional[str], changed: List[C
         "changed_files": [],
         "ignored_changed_files": [],
         "findings": [],
+        "findings_truncated": None,
     }
+    budget = FindingBudget(caps) if caps is not None else None
+    if budget is not None:
+        result["findings_truncated"] = budget.truncated
 
     def add_commit_fail(code: str, message: str, path: Optional[str] = None) -> None:
         result["pass"] = False
-        result["findings"].append({"level": "fail", "code": code, "message": message, "path": path})
+        if budget is None or budget.admit(code, path):
+            result["findings"].append({"level": "fail", "code": code, "message": message, "path": path})
 
     def add_commit_warn(code: str, message: str, path: Optional[str] = None) -> None:
-        result["findings"].append({"level": "warn", "code": code, "message": message, "path": path})
+        if budget is None or budget.admit(code, path, "warn"):
+            result["findings"].append({"level": "warn", "code": code, "message": message, "path": path})
 
-    ignored: List[ChangedFile] = []
-    eff: List[ChangedFile] = []
-    for c in changed:
-        p = normalize_repo_rel_path(c.path)
-        if is_ignored_generated(p):
-            ignored.append(ChangedFile(path=p, status=c.status))
-        else:
-            eff.append(ChangedFile(path=p, status=c.status))
+    def is_symlink(path: str) -> bool:
+        if modes is not None and path in modes:
+            return modes[path] == "120000"
+        return is_symlink_in_ref(commit, path)
+
+    def split_changes(changed: List[ChangedFile]) -> List[ChangedFile]:
+        ignored: List[ChangedFile] = []
+        eff: List[ChangedFile] = []
+        for c in changed:
+            p = normalize_repo_rel_path(c.path)
+            if is_ignored_generated(p):
+                ignored.append(ChangedFile(path=p, status=c.status))
+            else:
+                eff.append(ChangedFile(path=p, status=c.status))
 
-    eff = sorted(eff, key=lambda x: (x.path, x.status))
-    ignored = sorted(ignored, key=lambda x: (x.path, x.status))
+        eff = sorted(eff, key=lambda x: (x.path, x.status))
+        ignored = sorted(ignored, key=lambda x: (x.path, x.status))
+
+        result["changed_files"] = [{"path": c.path, "status": c.status} for c in eff]
+        result["ignored_changed_files"] = [{"path": c.path, "status": c.status} for c in ignored]
+        return eff
+
+    def list_changes(governed_only: bool) -> Optional[List[ChangedFile]]:
+        try:
+            return split_changes(lister(list(_GOVERNED_ROOTS) if governed_only else None))
+        except Exception as e:
+            add_commit_fail("CI_DIFF_TREE_FAILED", str(e))
+            return None
 
-    result["changed_files"] = [{"path": c.path, "status": c.status} for c in eff]
-    result["ignored_changed_files"] = [{"path": c.path, "status": c.status} for c in ignored]
+    eff = split_changes(changed) if changed is not None else None
 
-    governed_patterns = [".intent-ops/**", ".github/agents/intentops.*.agent.md"]
-    touches_governed = any(matches_any_glob(c.path, governed_patterns) for c in eff)
+    def touches_governed() -> Optional[bool]:
+        governed = eff if eff is not None else list_changes(True)
+        if governed is None:
+            return None
+        governed_patterns = [".intent-ops/**", ".github/agents/intentops.*.agent.md"]
+        return any(matches_any_glob(c.path, governed_patterns) for c in governed)
 
     framework_at = load_yaml_subset_from_git_show(".intent-ops/framework/config/framework.yml", ref=commit)
     if framework_at is None:
-        if touches_governed:
+        touched = touches_governed()
+        if touched:
             add_commit_fail("CI_KERNEL_MISSING_IN_COMMIT", "Commit touches governed roots before the kernel exists.")
-        else:
+        elif touched is not None:
             result["skipped"] = True
         result["findings"] = _findings_sorted(result["findings"])
         return result
@@ -739,9 +2322,10 @@ def validate_commit_snapshot(commit: str, parent: Optional[str], changed: List[C
 
     current_intent_at = load_json_from_git_show(current_intent_file_rel, ref=commit)
     if current_intent_at is None:
-        if touches_governed:
+        touched = touches_governed()
+        if touched:
             add_commit_fail("CI_KERNEL_MISSING_IN_COMMIT", "Commit touches governed roots before current-intent control file exists.")
-        else:
+        elif touched is not None:
             result["skipped"] = True
         result["findings"] = _findings_sorted(result["findings"])
         return result
@@ -820,6 +2404,28 @@ def validate_commit_snapshot(commit: str, parent: Optional[str], changed: List[C
     bootstrap_initialisation = (not parent_has_framework) or (not parent_has_current_intent)
     result["bootstrap_initialisation"] = bool(bootstrap_initialisation)
 
+    # Listed on demand: changes outside the governed roots only when they can matter.
+    if eff is None:
+        control_paths = [current_intent_rel_norm, active_intent_json_rel]
+        governed_only = (
+            not bootstrap_initialisation
+            and closed_packs is None
+            and non_governed_changes_inert(
+                purple_effective + orange_effective,
+                [normalize_repo_rel_path(x) for x in allowed_paths if isinstance(x, str)] if allowed_paths else None,
+                [normalize_repo_rel_path(x) for x in forbidden_paths if isinstance(x, str)],
+                control_paths,
+                active_pack_repo_prefix,
+            )
+        )
+        eff = list_changes(governed_only)
+        if eff is not None and governed_only and any(c.path in control_paths for c in eff):
+            # Possible switch or close transaction: those rules see the whole change set.
+            eff = list_changes(False)
+        if eff is None:
+            result["findings"] = _findings_sorted(result["findings"])
+            return result
+
     if bootstrap_initialisation:
         governed_allow = [".intent-ops/**", ".github/agents/intentops.*.agent.md"]
         for c in eff:
@@ -837,7 +2443,7 @@ def validate_commit_snapshot(commit: str, parent: Optional[str], changed: List[C
             if str(c.status).startswith("D"):
                 continue
             if p.startswith(".intent-ops/") or p.startswith(".github/agents/"):
-                if is_symlink_in_ref(commit, p):
+                if is_symlink(p):
                     add_commit_fail("SYMLINK_FORBIDDEN", "Symlinks are forbidden under governed roots.", p)
 
         result["findings"] = _findings_sorted(result["findings"])
@@ -868,6 +2474,17 @@ def validate_commit_snapshot(commit: str, parent: Optional[str], changed: List[C
             if c.path.startswith(active_pack_repo_prefix):
                 add_commit_fail("CLOSED_INTENT_IMMUTABLE", "Closed intent is immutable; pack files cannot be modified.", c.path)
 
+    # Every other pack closed in the parent snapshot is immutable too
+    immutable: List[str] = []
+    if closed_packs is not None:
+        for c in eff:
+            if c.path.startswith(active_pack_repo_prefix):
+                continue
+            closed_pack = closed_packs.match(c.path)
+            if closed_pack is not None:
+                add_commit_fail("CLOSED_INTENT_IMMUTABLE", f"Pack {closed_pack} is closed; its files are immutable.", c.path)
+                immutable.append(c.path)
+
     # Switch transaction strictness
     if switch_detected:
         for c in eff:
@@ -928,9 +2545,13 @@ def validate_commit_snapshot(commit: str, parent: Optional[str], changed: List[C
 
         # Symlink ban (tree-based)
         if not str(c.status).startswith("D") and (p.startswith(".intent-ops/") or p.startswith(".github/agents/")):
-            if is_symlink_in_ref(commit, p):
+            if is_symlink(p):
                 add_commit_fail("SYMLINK_FORBIDDEN", "Symlinks are forbidden under governed roots.", p)
 
+        if p in immutable:
+            # Already CLOSED_INTENT_IMMUTABLE; zone rules would only repeat it.
+            continue
+
         # Purple
         if matches_any_glob(p, purple_effective):
             if allow_purple_paths and matches_any_glob(p, allow_purple_paths):
@@ -965,732 +2586,2942 @@ def validate_commit_snapshot(commit: str, parent: Optional[str], changed: List[C
     return result
 
 
-def effective_level(framework: Dict[str, Any]) -> str:
-    lvl = framework.get("governance", {}).get("level", "var")
-    lvl = str(lvl).strip().lower()
-    if lvl not in ("var", "syn", "tyr"):
-        lvl = "var"
-    debug(f"effective_level: {lvl}")
-    return lvl
-
+def replay_commit(
+    commit: str,
+    parents: Optional[List[str]] = None,
+    closed_packs: Optional["ClosedPackTracker"] = None,
+    known: Optional[Tuple[List[str], List[ChangedFile], Dict[str, str]]] = None,
+    governed_first: bool = False,
+    caps: Optional[FindingCaps] = None,
+) -> Dict[str, Any]:
+    """
+    known: the commit's entry from git_log_raw_changes(), saving rev-list and diff-tree.
 
-def validate(stage: str) -> Tuple[bool, List[Finding], Dict[str, Any], Optional[Path], Optional[Path]]:
-    summary = make_summary(stage)
-    findings: List[Finding] = []
-    active_pack: Optional[Path] = None
-    repo_root: Optional[Path] = None
+    caps: the stage's finding caps, applied to this commit's findings.
 
-    # Repo root
+    governed_first: list the changes under the governed roots with a pathspec
+    and the rest only if a rule needs them. result["governed_only"] tells
+    whether the commit was decided without the full list (changed_files then
+    holds only what was listed).
+    """
+    if known is not None:
+        parents = known[0]
+    elif parents is None:
+        parents = git_commit_parents(commit)
+    parent = parents[0] if parents else None
+    if governed_first and known is None and closed_packs is None:
+        listed: List[Optional[List[str]]] = []
+
+        def lister(pathspecs: Optional[List[str]]) -> List[ChangedFile]:
+            listed.append(pathspecs)
+            return parse_name_status_with_rename_expansion(git_diff_tree_name_status(commit, pathspecs))
+
+        result = validate_commit_snapshot(commit, parent, None, None, lister, caps)
+        result["governed_only"] = None not in listed
+        return result
     try:
-        repo_root = repo_root_from_git()
+        if known is not None:
+            changed = sorted(known[1], key=lambda x: (x.path, x.status))
+        else:
+            dt = git_diff_tree_name_status(commit)
+            changed = parse_name_status_with_rename_expansion(dt)
     except Exception as e:
-        add_fail(summary, findings, "REPO_ROOT_FAILED", f"Failed to locate repo root via git: {e}")
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
-
-    add_debug(summary, "cwd", str(Path.cwd()))
-    add_debug(summary, "repo_root", str(repo_root))
+        return {
+            "commit": commit,
+            "parent": parent,
+            "pass": False,
+            "skipped": False,
+            "active_intent_id": None,
+            "active_pack_path": None,
+            "changed_files": [],
+            "ignored_changed_files": [],
+            "findings": [{"level": "fail", "code": "CI_DIFF_TREE_FAILED", "message": str(e), "path": None}],
+        }
+    modes = known[2] if known is not None else None
+    if closed_packs is None:
+        return validate_commit_snapshot(commit, parent, changed, caps=caps, modes=modes)
+    trie = closed_packs.at(parent) if parent else None
+    result = validate_commit_snapshot(commit, parent, changed, trie, caps=caps, modes=modes)
+    closed_packs.advance(commit, parent, changed)
+    return result
 
-    # framework.yml
-    try:
-        framework = load_framework_config(repo_root)
-    except Exception as e:
-        debug(f"framework load exception: {e!r}")
-        add_fail(summary, findings, "FRAMEWORK_LOAD_FAILED", f"Failed to load framework.yml: {e}")
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
 
-    # Patch 06: framework.yml paths invariants
-    paths_obj = framework.get("paths")
-    if not isinstance(paths_obj, dict):
-        add_fail(summary, findings, "FRAMEWORK_PATHS_INVALID", "framework.yml must define a 'paths' mapping with required keys.")
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
+# ----------------------------
+# Fail-fast / time-budgeted replay with checkpoints
+# ----------------------------
 
-    required_path_keys = ("framework_root", "intents_root", "current_intent_file")
-    bad_path_keys: List[str] = []
-    for k in required_path_keys:
-        v = paths_obj.get(k)
-        if not isinstance(v, str) or not v.strip():
-            bad_path_keys.append(k)
+def intentops_cache_dir(repo_root: Path) -> Path:
+    # Local, unversioned state lives in the git dir so it never shows up as
+    # untracked files for the dirty worktree gates.
+    return git_dir_for_repo(repo_root) / "intentops"
 
-    if bad_path_keys:
-        add_fail(
-            summary,
-            findings,
-            "FRAMEWORK_PATHS_INVALID",
-            f"framework.yml paths must define non-empty strings for: {', '.join(bad_path_keys)}",
-        )
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
 
-    lvl = effective_level(framework)
-    summary["governance_level"] = lvl
+def default_checkpoint_path(repo_root: Path, shard: Optional[Tuple[int, int]]) -> Path:
+    name = "ci" if shard is None else f"ci.shard-{shard[0]}-of-{shard[1]}"
+    return intentops_cache_dir(repo_root) / f"checkpoint.{name}.json"
 
-    fw_paths = derive_framework_paths(framework)
-    framework_root_rel = fw_paths["framework_root"]
-    intents_root_rel = fw_paths["intents_root"]
-    current_intent_file_rel = fw_paths["current_intent_file"]
 
-    add_debug(summary, "framework_root", framework_root_rel)
-    add_debug(summary, "intents_root", intents_root_rel)
-    add_debug(summary, "current_intent_file", current_intent_file_rel)
+def commit_range_digest(commits: List[str]) -> str:
+    import hashlib
 
-    # current-intent.json
-    try:
-        current_intent = load_current_intent(repo_root, current_intent_file_rel)
+    return hashlib.sha256("\n".join(commits).encode("ascii")).hexdigest()
 
-        required_ci_keys = ("schema_version", "active_intent_id", "active_pack_path")
-        missing_ci = [k for k in required_ci_keys if k not in current_intent]
-        if missing_ci:
-            raise ValueError(f"current-intent.json missing required keys: {', '.join(missing_ci)}")
 
-        summary["active_intent_id"] = current_intent.get("active_intent_id")
-        summary["active_pack_path"] = current_intent.get("active_pack_path")
-        intents_root_abs = (repo_root.resolve() / intents_root_rel).resolve()
-        active_pack = resolve_active_pack(intents_root_abs, current_intent)
+def load_checkpoint(path: Path, range_key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
     except Exception as e:
-        debug(f"current intent resolve exception: {e!r}")
-        add_fail(summary, findings, "CURRENT_INTENT_SCHEMA_INVALID", f"Failed to load/validate current intent control file: {e}")
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
+        debug("load_checkpoint: %s: %r", path, e)
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("ci_commits"), list):
+        return None
+    if any(data.get(k) != v for k, v in range_key.items()):
+        debug("load_checkpoint: %s belongs to a different range", path)
+        return None
+    return data
 
-    add_debug(summary, "active_pack_resolved", str(active_pack))
 
-    if active_pack is None or not active_pack.exists():
-        add_fail(summary, findings, "ACTIVE_PACK_MISSING", f"Active intent pack does not exist: {active_pack}")
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
+def write_checkpoint(path: Path, range_key: Dict[str, Any], commit_results: List[Dict[str, Any]]) -> None:
+    data = dict(range_key)
+    data.update(
+        {
+            "schema_version": "1.0",
+            "tool": "intentops.validate",
+            "timestamp": now_iso(),
+            "last_validated_commit": commit_results[-1]["commit"] if commit_results else None,
+            "ci_commits": commit_results,
+        }
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Atomic so a run killed mid-write never leaves a truncated checkpoint for --resume.
+    replace_file_atomically(path, json.dumps(data, sort_keys=True) + "\n", prefix=f".{path.name}.", suffix=".tmp")
+    debug("write_checkpoint: %s (%s commit(s))", path, len(commit_results))
+
+
+def replay_commits_with_checkpoint(
+    commits: List[str],
+    options: RunOptions,
+    checkpoint_path: Path,
+    range_key: Dict[str, Any],
+    closed_packs: Optional["ClosedPackTracker"] = None,
+    caps: Optional[FindingCaps] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str], bool, Optional[str]]:
+    """
+    Replay commits in order, honouring --fail-fast, --time-budget and --resume.
 
-    # ----------------------------
-    # CI mode: deterministic commit replay
-    # ----------------------------
-    if stage == "ci":
-        # Dirty worktree gates (CI-level only)
+    Returns (commit_results, stopped, resumed, resumed_from) where stopped is
+    None, "fail_fast" or "time_budget", resumed tells whether a checkpoint for
+    this range was used and resumed_from is its last commit (None when it was
+    written before the first commit). A time-budget stop writes a checkpoint
+    with the results so far; a completed replay removes it.
+    """
+    def failed(res: Dict[str, Any]) -> bool:
+        return not res.get("pass") and not res.get("skipped")
+
+    commit_results: List[Dict[str, Any]] = []
+    resumed = False
+    resumed_from: Optional[str] = None
+    if options.resume:
+        cp = load_checkpoint(checkpoint_path, range_key)
+        done = cp["ci_commits"] if cp is not None else []
+        if cp is not None and [r.get("commit") for r in done] == commits[:len(done)]:
+            commit_results = list(done)
+            resumed = True
+            resumed_from = cp.get("last_validated_commit")
+
+    if options.fail_fast and any(failed(r) for r in commit_results):
+        return commit_results, "fail_fast", resumed, resumed_from
+
+    pending = commits[len(commit_results):]
+    known: Dict[str, Tuple[List[str], List[ChangedFile], Dict[str, str]]] = {}
+    if _GIT_BATCH is not None and pending:
+        # One `git log --raw` instead of a rev-list and a diff-tree per commit.
         try:
-            ci_unstaged = [normalize_repo_rel_path(x) for x in run_git(["diff", "--name-only"]).splitlines() if x.strip()]
-            ci_unstaged = [p for p in ci_unstaged if not is_ignored_generated(p)]
+            known = git_log_raw_changes(pending)
         except Exception as e:
-            ci_unstaged = []
-            debug(f"ci dirty gate (unstaged) failed to evaluate: {e!r}")
+            debug("batched change listing failed, replaying per commit: %r", e)
+
+    deadline = time.monotonic() + options.time_budget if options.time_budget is not None else None
+    stopped: Optional[str] = None
+    for commit in pending:
+        if deadline is not None and time.monotonic() >= deadline:
+            stopped = "time_budget"
+            break
+        res = replay_commit(commit, closed_packs=closed_packs, known=known.get(commit), caps=caps)
+        commit_results.append(res)
+        if options.fail_fast and failed(res):
+            stopped = "fail_fast"
+            break
 
-        try:
-            ci_untracked = [
-                normalize_repo_rel_path(x) for x in run_git(["ls-files", "--others", "--exclude-standard"]).splitlines() if x.strip()
-            ]
-            ci_untracked = [p for p in ci_untracked if not is_ignored_generated(p)]
-        except Exception as e:
-            ci_untracked = []
-            debug(f"ci dirty gate (untracked) failed to evaluate: {e!r}")
+    try:
+        if stopped == "time_budget":
+            write_checkpoint(checkpoint_path, range_key, commit_results)
+        elif stopped is None and checkpoint_path.exists():
+            checkpoint_path.unlink()
+    except OSError as e:
+        log(LOG_WARN, "checkpoint not written: %s: %r", checkpoint_path, e)
 
-        if ci_unstaged:
-            add_fail(
-                summary,
-                findings,
-                "CI_DIRTY_WORKTREE",
-                "ci stage requires a clean working tree (no unstaged tracked changes).",
-                ci_unstaged[0],
-            )
+    return commit_results, stopped, resumed, resumed_from
 
-        if ci_untracked:
-            add_fail(
-                summary,
-                findings,
-                "CI_UNTRACKED_PRESENT",
-                "ci stage requires no untracked files (excluding ignored generated outputs).",
-                ci_untracked[0],
-            )
 
-        base_ref = select_ci_base_ref(framework)
-        if not base_ref:
-            add_fail(
-                summary,
-                findings,
-                "CI_BASE_REF_UNAVAILABLE",
-                "No configured CI base ref candidates exist in this clone.",
-            )
+# ----------------------------
+# First-bad commit search
+# ----------------------------
 
-        if findings:
-            summary["ci_mode"] = "commit_replay"
-            summary["ci_base_ref"] = base_ref
-            summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-            ok = summary["pass"] is True
-            return ok, findings, summary, active_pack, repo_root
+def git_log_raw_changes(commits: List[str]) -> Dict[str, Tuple[List[str], List[ChangedFile], Dict[str, str]]]:
+    """
+    One `git log --raw` over the given commits.
 
-        summary["ci_mode"] = "commit_replay"
-        summary["ci_base_ref"] = base_ref
-        try:
-            summary["ci_base_tip"] = run_git(["rev-parse", base_ref]).strip()
-        except Exception:
-            summary["ci_base_tip"] = None
+    Returns {commit: (parents, changed_files, modes)} with the same
+    first-parent paths `git diff-tree` reports during replay; modes maps each
+    changed path to its mode in the commit ("000000" when deleted).
+    """
+    out = run_git(
+        ["log", "--no-walk=unsorted", "--stdin", "--root", "--no-renames", "--raw", "--format=%x01%H %P"],
+        input_text="\n".join(commits) + "\n",
+    )
+    changes: Dict[str, Tuple[List[str], List[ChangedFile], Dict[str, str]]] = {}
+    cur: Optional[str] = None
+    for line in out.splitlines():
+        if line.startswith("\x01"):
+            shas = line[1:].split()
+            cur = shas[0] if shas else None
+            if cur is not None:
+                changes[cur] = (shas[1:], [], {})
+            continue
+        if cur is None or not line.startswith(":") or "\t" not in line:
+            continue
+        meta, path = line.split("\t", 1)
+        fields = meta[1:].split()
+        if len(fields) < 5:
+            continue
+        rel = normalize_repo_rel_path(path)
+        changes[cur][1].append(ChangedFile(path=rel, status=fields[4]))
+        changes[cur][2][rel] = fields[1]
+    return changes
 
-        pr_head, is_synth, meta = detect_synthetic_merge_head(base_ref)
-        summary.update(meta)
-        summary["ci_pr_head"] = pr_head
-        if is_synth:
-            summary["ci_fallback_mode"] = "synthetic_merge_head^2"
 
-        try:
-            merge_base = run_git(["merge-base", base_ref, pr_head]).strip()
-            summary["ci_merge_base"] = merge_base
-        except Exception as e:
-            add_fail(summary, findings, "CI_MERGE_BASE_FAILED", f"Failed to compute merge-base for CI range: {e}")
-            summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-            ok = summary["pass"] is True
-            return ok, findings, summary, active_pack, repo_root
+def first_bad_bisectable(
+    commits: List[str], merge_base: str, changes: Dict[str, Tuple[List[str], List[ChangedFile], Dict[str, str]]]
+) -> Tuple[bool, str]:
+    """
+    Bisection is only sound when every commit is judged against the same policy
+    and only on path membership: a linear range, a kernel at the merge base, no
+    commit touching the control files (framework config, current-intent.json,
+    any intent.json) and no symlinks introduced.
+    """
+    framework_at = load_yaml_subset_from_git_show(".intent-ops/framework/config/framework.yml", ref=merge_base)
+    if framework_at is None:
+        return False, "kernel missing at merge base"
+    fw_paths = derive_framework_paths(framework_at)
+    current_intent_rel = normalize_repo_rel_path(fw_paths["current_intent_file"])
+    if not git_blob_exists(merge_base, current_intent_rel):
+        return False, "current-intent control file missing at merge base"
+    config_prefix = normalize_repo_rel_path(f"{fw_paths['framework_root']}/config").rstrip("/") + "/"
+    intents_prefix = normalize_repo_rel_path(fw_paths["intents_root"]).rstrip("/") + "/"
+
+    for commit in commits:
+        if commit not in changes:
+            return False, f"no change record for {commit}"
+        parents, changed, modes = changes[commit]
+        if len(parents) > 1:
+            return False, "range contains merge commits"
+        if "120000" in modes.values():
+            return False, "range introduces symlinks"
+        for c in changed:
+            if c.path == current_intent_rel or c.path.startswith(config_prefix):
+                return False, "range changes framework control files"
+            if c.path.startswith(intents_prefix) and c.path.endswith("/intent.json"):
+                return False, "range changes intent lifecycle files"
+    return True, "zone and scope checks only"
 
-        try:
-            rev_out = run_git(["rev-list", "--reverse", f"{merge_base}..{pr_head}"])
-            commits = [c.strip() for c in rev_out.splitlines() if c.strip()]
-        except Exception as e:
-            add_fail(summary, findings, "CI_REV_LIST_FAILED", f"Failed to enumerate CI commits for replay: {e}")
-            summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-            ok = summary["pass"] is True
-            return ok, findings, summary, active_pack, repo_root
 
-        summary["ci_commit_count"] = len(commits)
-        commit_results: List[Dict[str, Any]] = []
+def find_first_bad_commit(
+    commits: List[str], merge_base: str, closed_packs: Optional["ClosedPackTracker"] = None, caps: Optional[FindingCaps] = None
+) -> Dict[str, Any]:
+    """
+    Locate the earliest commit in replay order that fails validate_commit_snapshot.
+
+    When first_bad_bisectable() holds, a commit fails iff one of its own changed
+    paths falls outside the (constant) zones/scope policy, so "some commit up to
+    k fails" equals "the cumulative change set up to k fails at k", which is
+    monotone in k and can be bisected. The cumulative set is the union of the
+    per-commit path lists rather than a merge_base..k tree diff, so a reverted
+    violation still counts. Otherwise replay linearly and stop at the first
+    failure. The returned "result" is always a genuine per-commit replay result.
+    """
+    report: Dict[str, Any] = {"commit": None, "index": None, "strategy": "linear", "reason": None, "evaluations": 0, "result": None}
+    if not commits:
+        report["reason"] = "empty range"
+        return report
 
-        for commit in commits:
-            parent = git_first_parent(commit)
-            try:
-                dt = git_diff_tree_name_status(commit)
-                changed = parse_name_status_with_rename_expansion(dt)
-            except Exception as e:
-                changed = []
-                res = {
-                    "commit": commit,
-                    "parent": parent,
-                    "pass": False,
-                    "skipped": False,
-                    "active_intent_id": None,
-                    "active_pack_path": None,
-                    "changed_files": [],
-                    "ignored_changed_files": [],
-                    "findings": [{"level": "fail", "code": "CI_DIFF_TREE_FAILED", "message": str(e), "path": None}],
-                }
-                commit_results.append(res)
-                continue
+    try:
+        changes = git_log_raw_changes(commits)
+        bisectable, reason = first_bad_bisectable(commits, merge_base, changes)
+    except Exception as e:
+        debug("find_first_bad_commit: change listing failed: %r", e)
+        changes = {}
+        bisectable, reason = False, "change listing failed"
+    report["reason"] = reason
+
+    def linear_scan() -> Dict[str, Any]:
+        for idx, commit in enumerate(commits):
+            res = replay_commit(commit, closed_packs=closed_packs, known=changes.get(commit), caps=caps)
+            report["evaluations"] += 1
+            if not res.get("pass") and not res.get("skipped"):
+                report.update({"commit": commit, "index": idx, "result": res})
+                break
+        return report
+
+    if not bisectable:
+        return linear_scan()
+
+    report["strategy"] = "bisect"
+    # No intent.json changes in the range, so pack statuses are those of the merge base.
+    closed_at_base = closed_packs.at(merge_base) if closed_packs is not None else None
+
+    def cumulative_fails(k: int) -> bool:
+        merged: Dict[str, ChangedFile] = {}
+        for commit in commits[: k + 1]:
+            for c in changes[commit][1]:
+                merged[c.path] = c
+        parents = changes[commits[k]][0]
+        res = validate_commit_snapshot(commits[k], parents[0] if parents else None, list(merged.values()), closed_at_base, caps=caps)
+        report["evaluations"] += 1
+        debug("first-bad: k=%s commit=%s fails=%s", k, commits[k], not res.get("pass"))
+        return not res.get("pass")
+
+    lo, hi = 0, len(commits) - 1
+    if not cumulative_fails(hi):
+        return report
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if cumulative_fails(mid):
+            hi = mid
+        else:
+            lo = mid + 1
 
-            res = validate_commit_snapshot(commit, parent, changed)
-            commit_results.append(res)
+    res = replay_commit(commits[lo], closed_packs=closed_packs, known=changes.get(commits[lo]), caps=caps)
+    report["evaluations"] += 1
+    if res.get("pass") or res.get("skipped"):
+        # The cumulative predicate disagreed with a real replay, so the bisection
+        # premise did not hold for this range; trust only a linear scan.
+        debug("first-bad: bisection landed on passing commit %s, rescanning linearly", commits[lo])
+        report.update({"strategy": "linear", "reason": "bisection inconsistent with replay"})
+        return linear_scan()
+    report.update({"commit": commits[lo], "index": lo, "result": res})
+    return report
 
-        summary["ci_commits"] = commit_results
 
-        failing_commits = [c for c in commit_results if not c.get("pass") and not c.get("skipped")]
-        if failing_commits:
-            add_fail(
-                summary,
-                findings,
-                "CI_COMMIT_REPLAY_FAILED",
-                f"{len(failing_commits)} commit(s) failed validation in CI commit replay.",
-            )
+# ----------------------------
+# History audit (streaming)
+# ----------------------------
 
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        ok = summary["pass"] is True
-        return ok, findings, summary, active_pack, repo_root
+_AUDIT_SAMPLE_COMMITS = 5
 
-    # zones.yml (non-CI)
+
+class RevListError(RuntimeError):
+    """`git rev-list` itself failed (bad range, missing objects), as opposed to a replay error."""
+
+
+def iter_rev_list_with_parents(rev_args: List[str]) -> Any:
+    """Yield (commit, parents) from `git rev-list --reverse --parents` as git produces them."""
+    args = ["rev-list", "--reverse", "--parents"] + rev_args
+    debug("iter_rev_list_with_parents: git %s", lambda: " ".join(args))
+    started = time.perf_counter()
+    p, finish_stderr = popen_git_stream(args)
+    assert p.stdout is not None
     try:
-        zones = load_zones_config(repo_root, framework_root_rel)
-    except Exception as e:
-        debug(f"zones load exception: {e!r}")
-        add_fail(summary, findings, "ZONES_LOAD_FAILED", f"Failed to load zones.yml: {e}")
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
+        for line in p.stdout:
+            parts = line.split()
+            if parts:
+                yield parts[0], parts[1:]
+    finally:
+        p.stdout.close()
+        stderr = finish_stderr()
+        p.wait()
+        note_git_process("stream", started, args)
+    if p.returncode != 0:
+        raise RevListError(f"git {' '.join(args)} failed: {stderr.strip()}")
+
+
+class AuditRollup:
+    """Incremental per-intent / per-code aggregation of replayed commit results."""
+
+    def __init__(self) -> None:
+        self.commits = 0
+        self.failed_commits = 0
+        self.skipped_commits = 0
+        # Commits decided from their governed-root changes alone.
+        self.governed_only_commits = 0
+        self.intents: Dict[str, Dict[str, Any]] = {}
+        self.codes: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, res: Dict[str, Any]) -> None:
+        commit = res.get("commit")
+        failed = not res.get("pass") and not res.get("skipped")
+        self.commits += 1
+        if failed:
+            self.failed_commits += 1
+        if res.get("skipped"):
+            self.skipped_commits += 1
+        if res.get("governed_only"):
+            self.governed_only_commits += 1
+
+        intent_key = str(res.get("active_intent_id") or "<none>")
+        intent = self.intents.get(intent_key)
+        if intent is None:
+            intent = self.intents[intent_key] = {
+                "commits": 0,
+                "failed_commits": 0,
+                "skipped_commits": 0,
+                "first_commit": commit,
+                "last_commit": commit,
+                "first_failing_commit": None,
+                "codes": {},
+            }
+        intent["commits"] += 1
+        intent["last_commit"] = commit
+        if res.get("skipped"):
+            intent["skipped_commits"] += 1
+        if failed:
+            intent["failed_commits"] += 1
+            if intent["first_failing_commit"] is None:
+                intent["first_failing_commit"] = commit
+
+        seen_codes: set = set()
+        truncated = res.get("findings_truncated") or {}
+        for f in res.get("findings") or []:
+            code = str(f.get("code"))
+            # Capped codes count every occurrence, not just the kept ones.
+            n = 1
+            if code in truncated and code not in seen_codes:
+                n += truncated[code]["total"] - truncated[code]["limit"]
+            intent["codes"][code] = intent["codes"].get(code, 0) + n
+            entry = self.codes.get(code)
+            if entry is None:
+                entry = self.codes[code] = {"level": f.get("level"), "count": 0, "commits": 0, "sample_commits": []}
+            entry["count"] += n
+            if code not in seen_codes:
+                seen_codes.add(code)
+                entry["commits"] += 1
+                if len(entry["sample_commits"]) < _AUDIT_SAMPLE_COMMITS:
+                    entry["sample_commits"].append(commit)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "commits": self.commits,
+            "failed_commits": self.failed_commits,
+            "skipped_commits": self.skipped_commits,
+            "governed_only_commits": self.governed_only_commits,
+            "intents": self.intents,
+            "codes": self.codes,
+        }
+
+
+def audit_history(rev_range: str, rollup: AuditRollup, caps: Optional[FindingCaps] = None) -> None:
+    """
+    Replay every commit of rev_range (default: all of HEAD's history) into
+    rollup without keeping per-commit results; memory stays bounded by the
+    rollup size. On an exception the rollup holds the commits replayed so far.
+    """
+    for commit, parents in iter_rev_list_with_parents(rev_range.split()):
+        rollup.add(replay_commit(commit, parents, governed_first=True, caps=caps))
 
-    # Patch 06: zones.yml invariants
-    zones_obj = zones.get("zones")
-    if not isinstance(zones_obj, dict):
-        add_fail(summary, findings, "ZONES_SCHEMA_INVALID", "zones.yml must define a 'zones' mapping.")
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
 
-    purple_paths_inv = (zones_obj.get("purple", {}) or {}).get("paths")
-    orange_paths_inv = (zones_obj.get("orange", {}) or {}).get("paths")
+# ----------------------------
+# Pre-receive hook (bare repositories)
+# ----------------------------
 
-    def _valid_paths_list(v: Any) -> bool:
-        if not isinstance(v, list) or not v:
-            return False
-        for item in v:
-            if not isinstance(item, str) or not item.strip():
-                return False
-        return True
+def is_zero_oid(oid: str) -> bool:
+    return bool(oid) and set(oid) == {"0"}
 
-    if not _valid_paths_list(purple_paths_inv) or not _valid_paths_list(orange_paths_inv):
-        add_fail(
-            summary,
-            findings,
-            "ZONES_SCHEMA_INVALID",
-            "zones.yml must define non-empty string lists for zones.purple.paths and zones.orange.paths.",
-        )
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
 
-    # intent.json
-    try:
-        intent = load_intent_json(active_pack)
-    except Exception as e:
-        debug(f"intent.json load exception: {e!r}")
-        add_fail(summary, findings, "INTENT_LOAD_FAILED", f"Failed to load intent.json: {e}")
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
+def parse_ref_updates(text: str) -> List[Tuple[str, str, str]]:
+    """Parse pre-receive stdin: one "<old-oid> <new-oid> <ref>" line per updated ref."""
+    updates: List[Tuple[str, str, str]] = []
+    for line in str(text).splitlines():
+        if not line.strip():
+            continue
+        parts = line.split()
+        if len(parts) != 3:
+            raise ValueError(f"invalid pre-receive line: {line!r}")
+        updates.append((parts[0], parts[1], parts[2]))
+    return updates
 
-    # Minimal contract checks
-    required_keys = ("schema_version", "intent_id", "goal", "status", "scope", "operations", "acceptance_criteria")
-    for req_key in required_keys:
-        if req_key not in intent:
-            add_fail(summary, findings, "INTENT_SCHEMA_MINIMAL", f"intent.json missing required key: {req_key}")
 
-    status_norm, status_warn = normalize_intent_status(intent.get("status"))
-    if status_warn == "INTENT_STATUS_DEFAULTED":
-        add_warn(summary, findings, "INTENT_STATUS_DEFAULTED", "intent.status missing/empty; defaulting to 'open'.")
-    if status_warn == "INTENT_STATUS_LEGACY_MAPPED":
-        add_warn(summary, findings, "INTENT_STATUS_LEGACY_MAPPED", "intent.status legacy value mapped to 'open'.")
+def validate_pre_receive(
+    summary: Dict[str, Any], findings: List[Finding], updates: List[Tuple[str, str, str]], caps: Optional[FindingCaps] = None
+) -> Tuple[bool, List[Finding], Dict[str, Any], Optional[Path], Optional[Path]]:
+    """
+    Replay the commits a push introduces, entirely from the object database.
 
-    if status_norm is None:
-        add_fail(summary, findings, "INTENT_STATUS_INVALID", "intent.status must be either 'open' or 'closed'.")
-        status = "open"
-    else:
-        status = status_norm
+    All ref updates of the push share one `rev-list <new>... --not --all`, so a
+    commit reachable from several pushed branches is validated once.
+    """
+    summary["ci_mode"] = "pre_receive_replay"
+    summary["pre_receive_updates"] = [{"old": o, "new": n, "ref": r} for o, n, r in updates]
 
-    if current_intent.get("active_intent_id") != intent.get("intent_id"):
+    tips: List[str] = []
+    for _old, new, _ref in updates:
+        if not is_zero_oid(new) and new not in tips:
+            tips.append(new)
+
+    commit_results: List[Dict[str, Any]] = []
+    if tips:
+        try:
+            for commit, parents in iter_rev_list_with_parents(tips + ["--not", "--all"]):
+                commit_results.append(replay_commit(commit, parents, caps=caps))
+        except Exception as e:
+            add_fail(summary, findings, "PRE_RECEIVE_REV_LIST_FAILED", f"Failed to enumerate pushed commits: {e}")
+
+    summary["ci_commit_count"] = len(commit_results)
+    summary["ci_commits"] = commit_results
+
+    failing_commits = [c for c in commit_results if not c.get("pass") and not c.get("skipped")]
+    if failing_commits:
         add_fail(
             summary,
             findings,
-            "ACTIVE_INTENT_ID_MISMATCH",
-            "current-intent.json active_intent_id must match the active pack intent.json intent_id.",
-            current_intent_file_rel,
+            "CI_COMMIT_REPLAY_FAILED",
+            f"{len(failing_commits)} pushed commit(s) failed validation.",
         )
 
-    scope = intent.get("scope", {}) if isinstance(intent.get("scope", {}), dict) else {}
-    allowed_paths = scope.get("allowed_paths", [])
-    forbidden_paths = scope.get("forbidden_paths", [])
+    summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+    ok = summary["pass"] is True
+    return ok, findings, summary, None, None
 
-    if not isinstance(allowed_paths, list) or not allowed_paths:
-        add_fail(summary, findings, "INTENT_SCOPE_INVALID", "scope.allowed_paths must be a non-empty array")
-        allowed_paths = []
 
-    if forbidden_paths is None:
-        forbidden_paths = []
-    if not isinstance(forbidden_paths, list):
-        add_fail(summary, findings, "INTENT_SCOPE_INVALID", "scope.forbidden_paths must be an array if present")
-        forbidden_paths = []
+def format_pre_receive_rejection(report: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    for f in report.get("findings") or []:
+        if f.get("level") == "fail" and f.get("code") != "CI_COMMIT_REPLAY_FAILED":
+            lines.append(f"intentops: {f.get('code')}: {f.get('message')}")
+    for c in report.get("ci_commits") or []:
+        if c.get("pass") or c.get("skipped"):
+            continue
+        for f in c.get("findings") or []:
+            if f.get("level") != "fail":
+                continue
+            where = f" ({f.get('path')})" if f.get("path") else ""
+            lines.append(f"intentops: {str(c.get('commit'))[:12]} {f.get('code')}{where}: {f.get('message')}")
+    for f in report.get("findings") or []:
+        if f.get("code") == "CI_COMMIT_REPLAY_FAILED":
+            lines.append(f"intentops: push rejected: {f.get('message')}")
+    return "\n".join(lines) + ("\n" if lines else "")
 
-    add_debug(summary, "scope_allowed_paths_count", len(allowed_paths))
-    add_debug(summary, "scope_forbidden_paths_count", len(forbidden_paths))
 
-    # Git changes
+# ----------------------------
+# CI sharding
+# ----------------------------
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse "i/N" (1-based shard index i of N shards)."""
     try:
-        changed, ci_meta = list_changed_files(stage)
-    except Exception as e:
-        debug(f"git diff exception: {e!r}")
-        add_fail(summary, findings, "GIT_DIFF_FAILED", f"Failed to list changed files: {e}")
-        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-        return False, findings, summary, active_pack, repo_root
+        i_raw, n_raw = str(value).split("/", 1)
+        i, n = int(i_raw), int(n_raw)
+    except ValueError:
+        raise ValueError(f"invalid shard {value!r}: expected i/N")
+    if n < 1 or not 1 <= i <= n:
+        raise ValueError(f"invalid shard {value!r}: need 1 <= i <= N")
+    return i, n
 
-    if stage == "ci":
-        summary["ci_base_ref"] = ci_meta.get("ci_base_ref")
-        summary["ci_merge_base"] = ci_meta.get("ci_merge_base")
-        summary["ci_fallback_mode"] = ci_meta.get("ci_fallback_mode")
 
-    ignored: List[ChangedFile] = []
-    effective_changed: List[ChangedFile] = []
-    for c in changed:
-        p = normalize_repo_rel_path(c.path)
-        if is_ignored_generated(p):
-            ignored.append(ChangedFile(path=p, status=c.status))
-            continue
-        effective_changed.append(ChangedFile(path=p, status=c.status))
+_STAGES = ("coding", "verification", "ci", "audit", "pre-receive", "packs", "compile")
 
-    changed = sorted(effective_changed, key=lambda x: x.path)
-    summary["changed_files"] = [{"path": c.path, "status": c.status} for c in changed]
-    summary["ignored_changed_files"] = [{"path": c.path, "status": c.status} for c in ignored]
 
-    # Dirty worktree gates
-    if stage == "verification":
-        try:
-            unstaged = [normalize_repo_rel_path(x) for x in run_git(["diff", "--name-only"]).splitlines() if x.strip()]
-            unstaged = [p for p in unstaged if not is_ignored_generated(p)]
-        except Exception as e:
-            unstaged = []
-            debug(f"verification dirty gate failed to evaluate: {e!r}")
+def parse_stages(value: str) -> List[str]:
+    """Parse "coding" or "coding,verification" into an ordered, duplicate-free stage list."""
+    stages = [x.strip() for x in str(value).split(",") if x.strip()]
+    if not stages:
+        raise ValueError("no stage given")
+    unknown = [x for x in stages if x not in _STAGES]
+    if unknown:
+        raise ValueError(f"unknown stage(s): {', '.join(unknown)}")
+    if len(set(stages)) != len(stages):
+        raise ValueError("duplicate stage")
+    return stages
 
-        if unstaged:
-            add_fail(
-                summary,
-                findings,
-                "VERIFICATION_DIRTY_WORKTREE",
-                "verification stage requires a clean working tree (no unstaged tracked changes).",
-                unstaged[0],
-            )
 
-    if stage == "ci":
-        try:
-            ci_unstaged = [normalize_repo_rel_path(x) for x in run_git(["diff", "--name-only"]).splitlines() if x.strip()]
-            ci_unstaged = [p for p in ci_unstaged if not is_ignored_generated(p)]
-        except Exception as e:
-            ci_unstaged = []
-            debug(f"ci dirty gate (unstaged) failed to evaluate: {e!r}")
+def shard_bounds(total: int, index: int, count: int) -> Tuple[int, int]:
+    # Contiguous, balanced slices of the rev-list order: shard sizes differ by at most one.
+    return (index - 1) * total // count, index * total // count
 
-        try:
-            ci_untracked = [normalize_repo_rel_path(x) for x in run_git(["ls-files", "--others", "--exclude-standard"]).splitlines() if x.strip()]
-            ci_untracked = [p for p in ci_untracked if not is_ignored_generated(p)]
-        except Exception as e:
-            ci_untracked = []
-            debug(f"ci dirty gate (untracked) failed to evaluate: {e!r}")
 
-        if ci_unstaged:
-            add_fail(
-                summary,
-                findings,
-                "CI_DIRTY_WORKTREE",
-                "ci stage requires a clean working tree (no unstaged tracked changes).",
-                ci_unstaged[0],
-            )
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
 
-        if ci_untracked:
-            add_fail(
-                summary,
-                findings,
-                "CI_UNTRACKED_PRESENT",
-                "ci stage requires no untracked files (excluding ignored generated outputs).",
-                ci_untracked[0],
-            )
 
-    # Zones
-    zones_obj = zones.get("zones", {}) if isinstance(zones.get("zones", {}), dict) else {}
-    purple_paths = (zones_obj.get("purple", {}) or {}).get("paths", []) or []
-    orange_paths = (zones_obj.get("orange", {}) or {}).get("paths", []) or []
+def merge_ci_shard_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine `--shard i/N` CI reports into one standard ci report: commits in the
+    original rev-list order, the full-range ci_commit_count and a recomputed
+    CI_COMMIT_REPLAY_FAILED aggregate.
+    """
+    merged = make_summary("ci")
+    findings: List[Finding] = []
+    seen_findings: set = set()
+
+    shards: Dict[int, Dict[str, Any]] = {}
+    counts: set = set()
+    for rep in reports:
+        shard = rep.get("ci_shard") if isinstance(rep, dict) and isinstance(rep.get("ci_shard"), dict) else None
+        if shard is None or rep.get("stage") != "ci":
+            add_fail(merged, findings, "CI_SHARD_REPORT_INVALID", "Input is not a sharded ci validator report.")
+            continue
+        index, count = shard.get("index"), shard.get("count")
+        if not _is_int(index) or not _is_int(count) or not 1 <= index <= count:
+            add_fail(merged, findings, "CI_SHARD_REPORT_INVALID", f"Invalid shard position {index!r}/{count!r}.")
+            continue
+        if "commit_offset" in shard and not (_is_int(shard["commit_offset"]) and _is_int(shard.get("range_commit_count"))):
+            add_fail(merged, findings, "CI_SHARD_REPORT_INVALID", f"Shard {index}/{count} has an invalid commit_offset or range_commit_count.")
+            continue
+        counts.add(count)
+        if shard.get("index") in shards:
+            add_fail(merged, findings, "CI_SHARD_REPORT_INVALID", f"Duplicate report for shard {shard.get('index')}/{shard.get('count')}.")
+            continue
+        shards[shard.get("index")] = rep
+
+    if len(counts) > 1:
+        add_fail(merged, findings, "CI_SHARD_REPORT_INVALID", f"Shard reports disagree on the shard count: {sorted(counts)}.")
+
+    ordered = [shards[k] for k in sorted(shards)]
+    if ordered:
+        first = ordered[0]
+        for key in (
+            "governance_level",
+            "active_intent_id",
+            "active_pack_path",
+            "ci_mode",
+            "ci_base_ref",
+            "ci_base_tip",
+            "ci_pr_head",
+            "ci_head_is_merge",
+            "ci_head_parents",
+            "ci_synthetic_merge",
+            "ci_merge_base",
+            "ci_fallback_mode",
+        ):
+            merged[key] = first.get(key)
+
+        for key in ("ci_merge_base", "ci_pr_head"):
+            values = {r.get(key) for r in ordered}
+            if len(values) > 1:
+                add_fail(merged, findings, "CI_SHARD_REPORT_INVALID", f"Shard reports were produced for different ranges ({key} differs).")
+
+        shard_count = next(iter(counts)) if len(counts) == 1 else None
+        missing = [i for i in range(1, (shard_count or 0) + 1) if i not in shards]
+        if missing:
+            add_fail(merged, findings, "CI_SHARD_MISSING", f"Missing report(s) for shard(s): {', '.join(str(i) for i in missing)}.")
+
+    # Carry over run-level findings (dirty gates, base ref, ...) from every shard.
+    for rep in ordered:
+        for f in rep.get("findings") or []:
+            if f.get("code") == "CI_COMMIT_REPLAY_FAILED":
+                continue
+            key = (f.get("level"), f.get("code"), f.get("message"), f.get("path"))
+            if key in seen_findings:
+                continue
+            seen_findings.add(key)
+            if f.get("level") == "fail":
+                add_fail(merged, findings, str(f.get("code")), str(f.get("message")), f.get("path"))
+            else:
+                add_warn(merged, findings, str(f.get("code")), str(f.get("message")), f.get("path"))
+
+    covered = [r for r in ordered if "commit_offset" in r["ci_shard"]]
+    if len(covered) != len(ordered):
+        add_fail(merged, findings, "CI_SHARD_INCOMPLETE", "At least one shard stopped before commit replay.")
+
+    commit_results: List[Dict[str, Any]] = []
+    for rep in sorted(covered, key=lambda r: r["ci_shard"]["commit_offset"]):
+        commit_results.extend(rep.get("ci_commits") or [])
+    merged["ci_commits"] = commit_results
+    merged["ci_commit_count"] = covered[0]["ci_shard"]["range_commit_count"] if covered else 0
+    if covered and len(commit_results) != merged["ci_commit_count"]:
+        add_fail(
+            merged,
+            findings,
+            "CI_SHARD_INCOMPLETE",
+            f"Shard reports cover {len(commit_results)} of {merged['ci_commit_count']} commit(s) in the CI range.",
+        )
 
-    add_debug(summary, "purple_paths", purple_paths)
-    add_debug(summary, "orange_paths", orange_paths)
+    failing_commits = [c for c in commit_results if not c.get("pass") and not c.get("skipped")]
+    if failing_commits:
+        add_fail(
+            merged,
+            findings,
+            "CI_COMMIT_REPLAY_FAILED",
+            f"{len(failing_commits)} commit(s) failed validation in CI commit replay.",
+        )
 
-    repo_root_resolved = repo_root.resolve()
-    intents_root = (repo_root_resolved / intents_root_rel).resolve()
+    merged["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+    return merged
 
-    active_pack_rel_from_intents = os.path.relpath(active_pack.resolve(), intents_root).replace("\\", "/")
-    active_pack_prefix = (active_pack_rel_from_intents.rstrip("/") + "/") if active_pack_rel_from_intents != "." else ""
 
-    active_pack_repo_rel = normalize_repo_rel_path(os.path.relpath(active_pack.resolve(), repo_root_resolved))
-    active_pack_repo_prefix = (active_pack_repo_rel.rstrip("/") + "/") if active_pack_repo_rel != "." else ""
+def effective_level(framework: Dict[str, Any]) -> str:
+    lvl = framework.get("governance", {}).get("level", "var")
+    lvl = str(lvl).strip().lower()
+    if lvl not in ("var", "syn", "tyr"):
+        lvl = "var"
+    debug("effective_level: %s", lvl)
+    return lvl
 
-    add_debug(summary, "intents_root", str(intents_root))
-    add_debug(summary, "active_pack_rel_from_intents", active_pack_rel_from_intents)
 
-    def is_under_active_pack(repo_rel_path: str) -> bool:
-        pr = repo_rel_path.replace("\\", "/")
-        full = (repo_root_resolved / pr).resolve()
-        try:
-            rel = os.path.relpath(full, intents_root).replace("\\", "/")
-        except Exception:
-            return False
-        return rel == active_pack_rel_from_intents or rel.startswith(active_pack_prefix)
+def validate(stage: str, options: Optional[RunOptions] = None) -> Tuple[bool, List[Finding], Dict[str, Any], Optional[Path], Optional[Path]]:
+    if _SPANS is None:
+        return _validate_stage(stage, options)
+    started = time.perf_counter()
+    try:
+        return _validate_stage(stage, options)
+    finally:
+        _SPANS.phase(None)
+        _SPANS.complete("validate", "stage", started, stage=stage)
 
-    kernel_upgrade = intent.get("kernel_upgrade", {}) if isinstance(intent.get("kernel_upgrade", {}), dict) else {}
-    allow_purple_paths = kernel_upgrade.get("allow_purple_paths", [])
-    if allow_purple_paths is None:
-        allow_purple_paths = []
-    if not isinstance(allow_purple_paths, list):
-        allow_purple_paths = []
-    allow_purple_paths = [str(x) for x in allow_purple_paths if isinstance(x, str) and str(x).strip()]
 
-    current_intent_rel_norm = normalize_repo_rel_path(current_intent_file_rel)
+def _validate_stage(stage: str, options: Optional[RunOptions]) -> Tuple[bool, List[Finding], Dict[str, Any], Optional[Path], Optional[Path]]:
+    global _POLICY
+
+    options = options or RunOptions()
+    summary = make_summary(stage)
+    findings: List[Finding] = FindingList()
+    active_pack: Optional[Path] = None
+    repo_root: Optional[Path] = None
+
+    if stage == "pre-receive":
+        # Bare repository: no working tree, everything comes from the object database.
+        # No framework.yml to read in a bare repository: only the CLI cap applies.
+        cli_caps = FindingCaps(default=options.max_findings_per_code) if options.max_findings_per_code is not None else None
+        return validate_pre_receive(summary, findings, options.ref_updates or [], cli_caps)
+
+    # Independent git queries run concurrently from here on; each consumer
+    # waits only for the query it needs.
+    prefetch_git(startup_git_queries(stage))
+    trace_phase("framework")
+
+    # Repo root
+    try:
+        repo_root = repo_root_from_git()
+    except Exception as e:
+        add_fail(summary, findings, "REPO_ROOT_FAILED", f"Failed to locate repo root via git: {e}")
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    add_debug(summary, "cwd", str(Path.cwd()))
+    add_debug(summary, "repo_root", str(repo_root))
+
+    # Kernel files unchanged since --stage compile are served from its artifact.
+    if stage != "compile":
+        use_policy_artifact(repo_root)
+
+    # framework.yml
+    try:
+        framework = load_framework_config(repo_root)
+    except Exception as e:
+        debug("framework load exception: %r", e)
+        add_fail(summary, findings, "FRAMEWORK_LOAD_FAILED", f"Failed to load framework.yml: {e}")
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    # Patch 06: framework.yml paths invariants
+    paths_obj = framework.get("paths")
+    if not isinstance(paths_obj, dict):
+        add_fail(summary, findings, "FRAMEWORK_PATHS_INVALID", "framework.yml must define a 'paths' mapping with required keys.")
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    required_path_keys = ("framework_root", "intents_root", "current_intent_file")
+    bad_path_keys: List[str] = []
+    for k in required_path_keys:
+        v = paths_obj.get(k)
+        if not isinstance(v, str) or not v.strip():
+            bad_path_keys.append(k)
+
+    if bad_path_keys:
+        add_fail(
+            summary,
+            findings,
+            "FRAMEWORK_PATHS_INVALID",
+            f"framework.yml paths must define non-empty strings for: {', '.join(bad_path_keys)}",
+        )
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    lvl = effective_level(framework)
+    summary["governance_level"] = lvl
+
+    caps = finding_caps_from_config(framework, options.max_findings_per_code)
+    if caps is not None:
+        findings.budget = FindingBudget(caps)
+        summary["findings_truncated"] = findings.budget.truncated
+
+    fw_paths = derive_framework_paths(framework)
+    framework_root_rel = fw_paths["framework_root"]
+    intents_root_rel = fw_paths["intents_root"]
+    current_intent_file_rel = fw_paths["current_intent_file"]
+
+    add_debug(summary, "framework_root", framework_root_rel)
+    add_debug(summary, "intents_root", intents_root_rel)
+    add_debug(summary, "current_intent_file", current_intent_file_rel)
 
     # ----------------------------
-    # Patch 04: Intent lifecycle transactions
+    # Packs mode: lint every pack, refresh the pack status index
     # ----------------------------
+    if stage == "packs":
+        trace_phase("pack lint")
+        try:
+            active_pack = resolve_active_pack(
+                repo_root.resolve() / intents_root_rel, load_current_intent(repo_root, current_intent_file_rel)
+            )
+        except Exception as e:
+            # Only decides where the report goes; linting does not depend on it.
+            debug("packs: active pack unavailable: %r", e)
+        _entries, pack_findings, counts = scan_packs(repo_root, fw_paths["packs_root"])
+        summary["packs"] = dict(counts, index_path=str(pack_index_path(repo_root)))
+        for f in pack_findings:
+            if f.level == "fail":
+                add_fail(summary, findings, f.code, f.message, f.path)
+            else:
+                add_warn(summary, findings, f.code, f.message, f.path)
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        ok = summary["pass"] is True
+        return ok, findings, summary, active_pack, repo_root
 
-    def is_under_repo_prefix(repo_rel_path: str, prefix: str) -> bool:
-        pr = normalize_repo_rel_path(repo_rel_path)
-        pre = normalize_repo_rel_path(prefix).rstrip("/")
-        if not pre:
-            return True
-        return pr == pre or pr.startswith(pre + "/")
+    # ----------------------------
+    # Compile mode: parse the kernel files once into the policy artifact
+    # ----------------------------
+    if stage == "compile":
+        trace_phase("policy compile")
+        try:
+            _POLICY, active_pack = compile_policy(repo_root, fw_paths)
+            _GLOB_SET_SOURCES.update(_POLICY.tables)
+        except Exception as e:
+            debug("policy compile exception: %r", e)
+            add_fail(summary, findings, "POLICY_COMPILE_FAILED", f"Failed to compile the policy artifact: {e}")
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        ok = summary["pass"] is True
+        return ok, findings, summary, active_pack, repo_root
 
-    current_intent_file_touched = any(c.path == current_intent_rel_norm for c in changed)
-    head_current_intent = load_json_from_git_show(current_intent_rel_norm, ref="HEAD")
-    old_ptrs = current_intent_pointers(head_current_intent)
-    new_ptrs = current_intent_pointers(current_intent)
-    switch_detected = (old_ptrs is not None and new_ptrs is not None and old_ptrs != new_ptrs)
+    # current-intent.json
+    try:
+        current_intent = load_current_intent(repo_root, current_intent_file_rel)
 
-    # Closing transition detection for the *current* active pack
-    active_intent_json_rel = normalize_repo_rel_path(f"{active_pack_repo_rel.rstrip('/')}/intent.json")
-    head_intent = load_json_from_git_show(active_intent_json_rel, ref="HEAD")
-    if head_intent is None:
-        add_debug(summary, "head_intent_status_missing_assumed_open", True)
-        head_status = "open"
-    else:
-        head_status_norm, _ = normalize_intent_status(head_intent.get("status"))
-        head_status = head_status_norm or "open"
+        required_ci_keys = ("schema_version", "active_intent_id", "active_pack_path")
+        missing_ci = [k for k in required_ci_keys if k not in current_intent]
+        if missing_ci:
+            raise ValueError(f"current-intent.json missing required keys: {', '.join(missing_ci)}")
+
+        summary["active_intent_id"] = current_intent.get("active_intent_id")
+        summary["active_pack_path"] = current_intent.get("active_pack_path")
+        intents_root_abs = (repo_root.resolve() / intents_root_rel).resolve()
+        active_pack = resolve_active_pack(intents_root_abs, current_intent)
+    except Exception as e:
+        debug("current intent resolve exception: %r", e)
+        add_fail(summary, findings, "CURRENT_INTENT_SCHEMA_INVALID", f"Failed to load/validate current intent control file: {e}")
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    add_debug(summary, "active_pack_resolved", str(active_pack))
+
+    if stage in ("coding", "verification") and active_pack is not None:
+        # HEAD snapshots for the lifecycle transition checks.
+        active_pack_rel = normalize_repo_rel_path(os.path.relpath(active_pack.resolve(), repo_root.resolve()))
+        prefetch_git(
+            [
+                ["show", f"HEAD:{normalize_repo_rel_path(current_intent_file_rel)}"],
+                ["show", f"HEAD:{normalize_repo_rel_path(active_pack_rel.rstrip('/') + '/intent.json')}"],
+            ]
+        )
+
+    if active_pack is None or not active_pack.exists():
+        add_fail(summary, findings, "ACTIVE_PACK_MISSING", f"Active intent pack does not exist: {active_pack}")
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    # ----------------------------
+    # Audit mode: streaming full-history replay
+    # ----------------------------
+    if stage == "audit":
+        trace_phase("audit replay")
+        rev_range = options.rev_range or "HEAD"
+        summary["audit_range"] = rev_range
+        rollup = AuditRollup()
+        try:
+            audit_history(rev_range, rollup, caps)
+        except RevListError as e:
+            add_fail(summary, findings, "AUDIT_REV_LIST_FAILED", f"Failed to enumerate commits for audit: {e}")
+        except Exception as e:
+            debug("audit replay exception: %r", e)
+            add_fail(summary, findings, "AUDIT_REPLAY_FAILED", f"History audit stopped after {rollup.commits} commit(s): {e}")
+
+        # Partial on failure: whatever was replayed before the error still counts.
+        summary["audit_rollup"] = rollup.to_dict()
+        if rollup.failed_commits:
+            add_fail(
+                summary,
+                findings,
+                "AUDIT_COMMITS_FAILED",
+                f"{rollup.failed_commits} of {rollup.commits} commit(s) failed validation in the history audit.",
+            )
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        ok = summary["pass"] is True
+        return ok, findings, summary, active_pack, repo_root
+
+    # ----------------------------
+    # CI mode: deterministic commit replay
+    # ----------------------------
+    if stage == "ci":
+        trace_phase("ci replay")
+        if options.shard is not None:
+            summary["ci_shard"] = {"index": options.shard[0], "count": options.shard[1]}
+
+        # Dirty worktree gates (CI-level only)
+        evaluate_dirty_gates(summary, findings, stage, options)
+
+        try:
+            resolved_refs, head_parents = resolve_ci_refs(ci_base_ref_candidates(framework))
+        except Exception as e:
+            debug("resolve_ci_refs failed: %r", e)
+            resolved_refs, head_parents = {}, []
+        base_ref = select_ci_base_ref(framework, resolved_refs)
+        if not base_ref:
+            add_fail(
+                summary,
+                findings,
+                "CI_BASE_REF_UNAVAILABLE",
+                "No configured CI base ref candidates exist in this clone.",
+            )
+
+        if findings:
+            summary["ci_mode"] = "commit_replay"
+            summary["ci_base_ref"] = base_ref
+            summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+            ok = summary["pass"] is True
+            return ok, findings, summary, active_pack, repo_root
+
+        summary["ci_mode"] = "commit_replay"
+        summary["ci_base_ref"] = base_ref
+        summary["ci_base_tip"] = resolved_refs.get(base_ref)
+
+        pr_head, is_synth, meta = detect_synthetic_merge_head(base_ref, resolved_refs, head_parents)
+        summary.update(meta)
+        summary["ci_pr_head"] = pr_head
+        if is_synth:
+            summary["ci_fallback_mode"] = "synthetic_merge_head^2"
+
+        try:
+            merge_base = run_git(["merge-base", base_ref, pr_head]).strip()
+            summary["ci_merge_base"] = merge_base
+        except Exception as e:
+            add_fail(summary, findings, "CI_MERGE_BASE_FAILED", f"Failed to compute merge-base for CI range: {e}")
+            summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+            ok = summary["pass"] is True
+            return ok, findings, summary, active_pack, repo_root
+
+        # The configured globs come from framework.yml at the merge base: the PR's own
+        # framework.yml must not choose which of its commits skip replay.
+        framework_at_base = load_yaml_subset_from_git_show(".intent-ops/framework/config/framework.yml", ref=merge_base) or {}
+        trusted_globs = configured_trusted_ref_globs(framework_at_base) + list(options.trusted_ref_globs or [])
+        try:
+            trusted_refs, dropped_refs = expand_trusted_refs(trusted_globs, pr_head)
+            commits = list_replay_commits(merge_base, pr_head, sorted({oid for _ref, oid in trusted_refs}))
+            range_count = len(commits)
+            if trusted_globs:
+                summary["ci_trusted_refs"] = [ref for ref, _oid in trusted_refs]
+                summary["ci_trusted_refs_ignored"] = dropped_refs
+                range_count = int(run_git(["rev-list", "--count", f"{merge_base}..{pr_head}"]).strip() or 0)
+                summary["ci_trusted_excluded_commit_count"] = range_count - len(commits)
+        except Exception as e:
+            add_fail(summary, findings, "CI_REV_LIST_FAILED", f"Failed to enumerate CI commits for replay: {e}")
+            summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+            ok = summary["pass"] is True
+            return ok, findings, summary, active_pack, repo_root
+
+        if range_count and not commits:
+            # Something trusted already contains every PR commit: replaying nothing would pass vacuously.
+            add_fail(
+                summary,
+                findings,
+                "CI_TRUSTED_REFS_EXCLUDE_ALL",
+                f"Trusted refs exclude all {range_count} commit(s) of the CI range; nothing would be replayed.",
+            )
+            summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+            return False, findings, summary, active_pack, repo_root
+
+        if options.shard is not None:
+            shard_index, shard_count = options.shard
+            start, end = shard_bounds(len(commits), shard_index, shard_count)
+            summary["ci_shard"].update({"commit_offset": start, "range_commit_count": len(commits)})
+            commits = commits[start:end]
+
+        summary["ci_commit_count"] = len(commits)
+        packs_root_rel = fw_paths["packs_root"]
+        closed_packs = ClosedPackTracker(
+            packs_root_rel,
+            {e["blob"]: e.get("status") for e in load_pack_index(repo_root, packs_root_rel).values() if e.get("blob")},
+        )
+        if options.first_bad:
+            try:
+                first_bad = find_first_bad_commit(commits, merge_base, closed_packs, caps)
+            finally:
+                closed_packs.close()
+            summary["ci_closed_packs"] = closed_packs.stats()
+            first_result = first_bad.pop("result")
+            summary["ci_first_bad"] = first_bad
+            summary["ci_commits"] = [first_result] if first_result is not None else []
+            if first_result is not None:
+                add_fail(
+                    summary,
+                    findings,
+                    "CI_COMMIT_REPLAY_FAILED",
+                    f"First failing commit in CI replay: {first_bad['commit']} "
+                    f"(#{first_bad['index'] + 1} of {len(commits)}, {first_bad['strategy']}, "
+                    f"{first_bad['evaluations']} evaluation(s)).",
+                )
+            summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+            ok = summary["pass"] is True
+            return ok, findings, summary, active_pack, repo_root
+
+        checkpoint_path = options.checkpoint_path or default_checkpoint_path(repo_root, options.shard)
+        range_key = {
+            "ci_merge_base": merge_base,
+            "ci_pr_head": pr_head,
+            "ci_shard": summary["ci_shard"],
+            "range_digest": commit_range_digest(commits),
+        }
+        try:
+            commit_results, stopped, resumed, resumed_from = replay_commits_with_checkpoint(
+                commits, options, checkpoint_path, range_key, closed_packs, caps
+            )
+        finally:
+            closed_packs.close()
+        summary["ci_closed_packs"] = closed_packs.stats()
+        summary["ci_commits"] = commit_results
+        summary["ci_replay_stopped"] = stopped
+        summary["ci_resumed_from"] = resumed_from
+        if options.resume and not resumed:
+            add_warn(summary, findings, "CI_CHECKPOINT_NOT_USED", "No checkpoint matching this CI range was found; replayed from the start.")
+        if stopped == "time_budget":
+            add_fail(
+                summary,
+                findings,
+                "CI_REPLAY_INCOMPLETE",
+                f"Time budget exhausted after {len(commit_results)} of {len(commits)} commit(s); rerun with --resume to continue.",
+            )
+
+        failing_commits = [c for c in commit_results if not c.get("pass") and not c.get("skipped")]
+        if failing_commits:
+            add_fail(
+                summary,
+                findings,
+                "CI_COMMIT_REPLAY_FAILED",
+                f"{len(failing_commits)} commit(s) failed validation in CI commit replay.",
+            )
+
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        ok = summary["pass"] is True
+        return ok, findings, summary, active_pack, repo_root
+
+    trace_phase("config")
+    # zones.yml (non-CI)
+    try:
+        zones = load_zones_config(repo_root, framework_root_rel)
+    except Exception as e:
+        debug("zones load exception: %r", e)
+        add_fail(summary, findings, "ZONES_LOAD_FAILED", f"Failed to load zones.yml: {e}")
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    # Patch 06: zones.yml invariants
+    zones_obj = zones.get("zones")
+    if not isinstance(zones_obj, dict):
+        add_fail(summary, findings, "ZONES_SCHEMA_INVALID", "zones.yml must define a 'zones' mapping.")
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    purple_paths_inv = (zones_obj.get("purple", {}) or {}).get("paths")
+    orange_paths_inv = (zones_obj.get("orange", {}) or {}).get("paths")
+
+    def _valid_paths_list(v: Any) -> bool:
+        if not isinstance(v, list) or not v:
+            return False
+        for item in v:
+            if not isinstance(item, str) or not item.strip():
+                return False
+        return True
+
+    if not _valid_paths_list(purple_paths_inv) or not _valid_paths_list(orange_paths_inv):
+        add_fail(
+            summary,
+            findings,
+            "ZONES_SCHEMA_INVALID",
+            "zones.yml must define non-empty string lists for zones.purple.paths and zones.orange.paths.",
+        )
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    # intent.json
+    try:
+        intent = load_intent_json(active_pack)
+    except Exception as e:
+        debug("intent.json load exception: %r", e)
+        add_fail(summary, findings, "INTENT_LOAD_FAILED", f"Failed to load intent.json: {e}")
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    # Minimal contract checks
+    required_keys = ("schema_version", "intent_id", "goal", "status", "scope", "operations", "acceptance_criteria")
+    for req_key in required_keys:
+        if req_key not in intent:
+            add_fail(summary, findings, "INTENT_SCHEMA_MINIMAL", f"intent.json missing required key: {req_key}")
+
+    status_norm, status_warn = normalize_intent_status(intent.get("status"))
+    if status_warn == "INTENT_STATUS_DEFAULTED":
+        add_warn(summary, findings, "INTENT_STATUS_DEFAULTED", "intent.status missing/empty; defaulting to 'open'.")
+    if status_warn == "INTENT_STATUS_LEGACY_MAPPED":
+        add_warn(summary, findings, "INTENT_STATUS_LEGACY_MAPPED", "intent.status legacy value mapped to 'open'.")
+
+    if status_norm is None:
+        add_fail(summary, findings, "INTENT_STATUS_INVALID", "intent.status must be either 'open' or 'closed'.")
+        status = "open"
+    else:
+        status = status_norm
+
+    if current_intent.get("active_intent_id") != intent.get("intent_id"):
+        add_fail(
+            summary,
+            findings,
+            "ACTIVE_INTENT_ID_MISMATCH",
+            "current-intent.json active_intent_id must match the active pack intent.json intent_id.",
+            current_intent_file_rel,
+        )
+
+    scope = intent.get("scope", {}) if isinstance(intent.get("scope", {}), dict) else {}
+    allowed_paths = scope.get("allowed_paths", [])
+    forbidden_paths = scope.get("forbidden_paths", [])
+
+    if not isinstance(allowed_paths, list) or not allowed_paths:
+        add_fail(summary, findings, "INTENT_SCOPE_INVALID", "scope.allowed_paths must be a non-empty array")
+        allowed_paths = []
+
+    if forbidden_paths is None:
+        forbidden_paths = []
+    if not isinstance(forbidden_paths, list):
+        add_fail(summary, findings, "INTENT_SCOPE_INVALID", "scope.forbidden_paths must be an array if present")
+        forbidden_paths = []
+
+    add_debug(summary, "scope_allowed_paths_count", len(allowed_paths))
+    add_debug(summary, "scope_forbidden_paths_count", len(forbidden_paths))
+
+    trace_phase("changed files")
+    # Git changes
+    try:
+        changed, ci_meta = list_changed_files(stage, repo_root)
+    except Exception as e:
+        debug("git diff exception: %r", e)
+        add_fail(summary, findings, "GIT_DIFF_FAILED", f"Failed to list changed files: {e}")
+        summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+        return False, findings, summary, active_pack, repo_root
+
+    if stage == "ci":
+        summary["ci_base_ref"] = ci_meta.get("ci_base_ref")
+        summary["ci_merge_base"] = ci_meta.get("ci_merge_base")
+        summary["ci_fallback_mode"] = ci_meta.get("ci_fallback_mode")
+
+    ignored: List[ChangedFile] = []
+    effective_changed: List[ChangedFile] = []
+    for c in changed:
+        p = normalize_repo_rel_path(c.path)
+        if is_ignored_generated(p):
+            ignored.append(ChangedFile(path=p, status=c.status))
+            continue
+        effective_changed.append(ChangedFile(path=p, status=c.status))
+
+    changed = sorted(effective_changed, key=lambda x: x.path)
+    summary["changed_files"] = [{"path": c.path, "status": c.status} for c in changed]
+    summary["ignored_changed_files"] = [{"path": c.path, "status": c.status} for c in ignored]
+
+    trace_phase("dirty gates")
+    # Dirty worktree gates
+    if stage == "verification":
+        evaluate_dirty_gates(summary, findings, stage, options)
+
+    trace_phase("zones")
+    # Zones
+    zones_obj = zones.get("zones", {}) if isinstance(zones.get("zones", {}), dict) else {}
+    purple_paths = (zones_obj.get("purple", {}) or {}).get("paths", []) or []
+    orange_paths = (zones_obj.get("orange", {}) or {}).get("paths", []) or []
+
+    add_debug(summary, "purple_paths", purple_paths)
+    add_debug(summary, "orange_paths", orange_paths)
+
+    repo_root_resolved = repo_root.resolve()
+    intents_root = (repo_root_resolved / intents_root_rel).resolve()
+
+    active_pack_rel_from_intents = os.path.relpath(active_pack.resolve(), intents_root).replace("\\", "/")
+
+    active_pack_repo_rel = normalize_repo_rel_path(os.path.relpath(active_pack.resolve(), repo_root_resolved))
+    active_pack_repo_prefix = (active_pack_repo_rel.rstrip("/") + "/") if active_pack_repo_rel != "." else ""
+
+    add_debug(summary, "intents_root", str(intents_root))
+    add_debug(summary, "active_pack_rel_from_intents", active_pack_rel_from_intents)
+
+    kernel_upgrade = intent.get("kernel_upgrade", {}) if isinstance(intent.get("kernel_upgrade", {}), dict) else {}
+    allow_purple_paths = kernel_upgrade.get("allow_purple_paths", [])
+    if allow_purple_paths is None:
+        allow_purple_paths = []
+    if not isinstance(allow_purple_paths, list):
+        allow_purple_paths = []
+    allow_purple_paths = [str(x) for x in allow_purple_paths if isinstance(x, str) and str(x).strip()]
+
+    current_intent_rel_norm = normalize_repo_rel_path(current_intent_file_rel)
+
+    trace_phase("lifecycle")
+    # ----------------------------
+    # Patch 04: Intent lifecycle transactions
+    # ----------------------------
+
+    def is_under_repo_prefix(repo_rel_path: str, prefix: str) -> bool:
+        pr = normalize_repo_rel_path(repo_rel_path)
+        pre = normalize_repo_rel_path(prefix).rstrip("/")
+        if not pre:
+            return True
+        return pr == pre or pr.startswith(pre + "/")
+
+    current_intent_file_touched = any(c.path == current_intent_rel_norm for c in changed)
+    head_current_intent = load_json_from_git_show(current_intent_rel_norm, ref="HEAD")
+    old_ptrs = current_intent_pointers(head_current_intent)
+    new_ptrs = current_intent_pointers(current_intent)
+    switch_detected = (old_ptrs is not None and new_ptrs is not None and old_ptrs != new_ptrs)
+
+    # Closing transition detection for the *current* active pack
+    active_intent_json_rel = normalize_repo_rel_path(f"{active_pack_repo_rel.rstrip('/')}/intent.json")
+    head_intent = load_json_from_git_show(active_intent_json_rel, ref="HEAD")
+    if head_intent is None:
+        add_debug(summary, "head_intent_status_missing_assumed_open", True)
+        head_status = "open"
+    else:
+        head_status_norm, _ = normalize_intent_status(head_intent.get("status"))
+        head_status = head_status_norm or "open"
+
+    working_status = status
+
+    if head_status == "closed" and working_status == "open":
+        add_fail(
+            summary,
+            findings,
+            "CLOSED_TO_OPEN_FORBIDDEN",
+            "Closed intents may not be reopened (closed -> open is forbidden).",
+            active_intent_json_rel,
+        )
+
+    close_transition = head_status == "open" and working_status == "closed"
+
+    # Closed means immutable (based on HEAD)
+    if head_status == "closed":
+        for c in changed:
+            if is_under_repo_prefix(c.path, active_pack_repo_prefix):
+                add_fail(
+                    summary,
+                    findings,
+                    "CLOSED_INTENT_IMMUTABLE",
+                    "Active intent is closed in HEAD; files under the pack are immutable.",
+                    c.path,
+                )
+
+    # Switch transaction detection (current-intent.json modified)
+    if current_intent_file_touched and stage == "coding":
+        add_fail(
+            summary,
+            findings,
+            "CURRENT_INTENT_CHANGED_IN_CODING",
+            "current-intent.json may not be changed in coding stage.",
+            current_intent_rel_norm,
+        )
+
+    if switch_detected:
+        if stage == "coding":
+            add_fail(
+                summary,
+                findings,
+                "CURRENT_INTENT_CHANGED_IN_CODING",
+                "current-intent.json may not be changed in coding stage.",
+                current_intent_rel_norm,
+            )
+        # Strict switch transaction allowed change set
+        for c in changed:
+            if c.path == current_intent_rel_norm:
+                continue
+            if is_under_repo_prefix(c.path, active_pack_repo_prefix):
+                continue
+            add_fail(
+                summary,
+                findings,
+                "SWITCH_TRANSACTION_MIXED_CHANGES",
+                "When current-intent.json changes, only the new active pack and current-intent.json may change.",
+                c.path,
+            )
+
+        # Target pack must be open
+        if working_status == "closed":
+            add_fail(
+                summary,
+                findings,
+                "CLOSED_INTENT_NOT_ACTIVATABLE",
+                "Cannot switch to an intent pack whose status is 'closed'.",
+                active_intent_json_rel,
+            )
+
+        # Switch and close cannot be combined
+        if isinstance(head_current_intent, dict):
+            prev_pack_rel = head_current_intent.get("active_pack_path")
+            if isinstance(prev_pack_rel, str) and prev_pack_rel.strip():
+                prev_pack_abs = (intents_root / normalize_repo_rel_path(prev_pack_rel)).resolve()
+                prev_pack_repo_rel = normalize_repo_rel_path(os.path.relpath(prev_pack_abs, repo_root_resolved))
+                prev_intent_json_rel = normalize_repo_rel_path(f"{prev_pack_repo_rel.rstrip('/')}/intent.json")
+                if any(c.path == prev_intent_json_rel for c in changed):
+                    prev_head_intent = load_json_from_git_show(prev_intent_json_rel, ref="HEAD")
+                    prev_working_intent: Optional[Dict[str, Any]] = None
+                    try:
+                        prev_working_intent = json.loads((repo_root_resolved / prev_intent_json_rel).read_text(encoding="utf-8"))
+                    except Exception:
+                        prev_working_intent = None
+                    prev_head_status_norm, _ = normalize_intent_status((prev_head_intent or {}).get("status"))
+                    prev_working_status_norm, _ = normalize_intent_status((prev_working_intent or {}).get("status"))
+                    prev_head_status = prev_head_status_norm or "open"
+                    prev_working_status = prev_working_status_norm or "open"
+                    if prev_head_status == "open" and prev_working_status == "closed":
+                        add_fail(
+                            summary,
+                            findings,
+                            "SWITCH_AND_CLOSE_COMBINED",
+                            "Switching active intent and closing the previous intent cannot be combined in one run.",
+                            prev_intent_json_rel,
+                        )
+
+    # Close transaction strictness
+    if close_transition:
+        if switch_detected:
+            add_fail(
+                summary,
+                findings,
+                "SWITCH_AND_CLOSE_COMBINED",
+                "Switching active intent and closing an intent cannot be combined in one run.",
+                active_intent_json_rel,
+            )
+
+        if stage not in ("verification", "ci"):
+            add_fail(
+                summary,
+                findings,
+                "CLOSE_FORBIDDEN_STAGE",
+                "Closing an intent (open -> closed) is only permitted in verification or ci stage.",
+                active_intent_json_rel,
+            )
+
+        for c in changed:
+            if c.path != active_intent_json_rel:
+                add_fail(
+                    summary,
+                    findings,
+                    "CLOSE_TRANSACTION_MIXED_CHANGES",
+                    "When closing an intent, only the intent.json status flip is permitted (plus ignored generated outputs).",
+                    c.path,
+                )
+
+    trace_phase("symlinks")
+    # Patch 05: Symlink ban under governed roots
+    # - deterministic: only checks the working tree paths
+    # - skip deletions and missing files
+    # - any symlinked component (not just the leaf) counts, which is what keeps
+    #   the string-only active pack membership above sound
+    governed_symlinks = find_symlinked_paths(repo_root_resolved, governed_symlink_candidates(changed))
+
+    # Closed packs besides the active one, looked up only for the packs the
+    # changed paths fall in (the pack status index is read, never written).
+    closed_packs = ClosedPackLookup(repo_root, fw_paths["packs_root"], active_pack_repo_rel, {c.path for c in changed})
+
+    trace_phase("path rules")
+    # Apply rules
+    policy = PathPolicy(
+        stage=stage,
+        purple_paths=purple_paths,
+        orange_paths=orange_paths,
+        allow_purple_paths=allow_purple_paths,
+        allowed_paths=allowed_paths,
+        forbidden_paths=forbidden_paths,
+        current_intent_rel=current_intent_rel_norm,
+        active_pack_repo_rel=active_pack_repo_rel,
+        lifecycle_quiet=head_status != "closed" and not switch_detected and not close_transition,
+        control_paths=[
+            ".intent-ops/framework/config/framework.yml",
+            normalize_repo_rel_path(f"{framework_root_rel}/config/zones.yml"),
+            current_intent_rel_norm,
+            active_intent_json_rel,
+        ],
+        closed_packs=closed_packs,
+    )
+    if options.policy_sink is not None:
+        options.policy_sink.append(policy)
+    tracing = _TRACE
+    for c in changed:
+        for f in path_rule_findings(policy, c.path, normalize_repo_rel_path(c.path) in governed_symlinks):
+            add_fail(summary, findings, f.code, f.message, f.path)
+            if tracing:
+                trace("path rule: %s", f.path, code=f.code, status=c.status)
+    add_debug(summary, "closed_packs", closed_packs.stats)
+
+    summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
+    ok = summary["pass"] is True
+    return ok, findings, summary, active_pack, repo_root
+
+
+# Set by --compact-report: no indentation, minimal separators.
+_COMPACT_REPORTS = False
+
+
+# Report keys that differ between otherwise identical runs (run time and
+# per-process cache/spawn counters); they never justify a rewrite on their own.
+_REPORT_VOLATILE_KEYS = frozenset({"timestamp", "git_cache", "git_prefetch", "session_cache", "git_spawns", "policy_artifact"})
+
+
+def _report_stable_digest(report: Any) -> Optional[str]:
+    """sha256 of a report minus its volatile keys (_REPORT_VOLATILE_KEYS)."""
+    if not isinstance(report, dict):
+        return None
+    stable = {k: v for k, v in report.items() if k not in _REPORT_VOLATILE_KEYS}
+    blob = json.dumps(stable, sort_keys=True, separators=(",", ":"), default=str)
+    import hashlib
+
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class _ReportDirLock:
+    """
+    Advisory flock on the report directory, so concurrent writers (e.g. two
+    runner stages in one worktree) serialise compare-and-replace. Locking the
+    directory avoids leaving a lock file in the worktree. No-op without fcntl.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.fd: Optional[int] = None
+
+    def __enter__(self) -> "_ReportDirLock":
+        try:
+            import fcntl
+        except ImportError:
+            return self
+        try:
+            self.fd = os.open(str(self.directory), os.O_RDONLY)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        except OSError as e:
+            debug("report lock unavailable for %s: %r", self.directory, e)
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self.fd is not None:
+            os.close(self.fd)  # closing releases the flock
+            self.fd = None
+
+
+def write_report_file(path: Path, stage: str, report: Dict[str, Any]) -> bool:
+    """
+    Write a report atomically (temp file in the same directory + os.replace).
+    The temp name matches validator-report.*.json, so a concurrent coding run
+    ignores it like the report itself. Skips the write when everything but
+    `timestamp` is unchanged and the encoding matches. Returns True if written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    compact = _COMPACT_REPORTS
+    if compact:
+        text = json.dumps(report, sort_keys=True, separators=(",", ":")) + "\n"
+    else:
+        text = json.dumps(report, indent=2, sort_keys=True) + "\n"
+    digest = _report_stable_digest(report)
+
+    with _ReportDirLock(path.parent):
+        try:
+            current = path.read_text(encoding="utf-8")
+            same_encoding = current.startswith("{\n") != compact
+            if same_encoding and _report_stable_digest(json.loads(current)) == digest:
+                debug("report unchanged, not rewritten: %s", path)
+                return False
+        except (OSError, ValueError):
+            pass
+
+        replace_file_atomically(path, text, prefix=f"validator-report.{stage}.", suffix=".tmp.json")
+    return True
+
+
+_UMASK: Optional[int] = None
+
+
+def new_file_mode() -> int:
+    """Mode open(path, "w") gives a new file (0o666 minus the umask)."""
+    global _UMASK
+    if _UMASK is None:
+        # The umask can only be read by setting it.
+        _UMASK = os.umask(0o022)
+        os.umask(_UMASK)
+    return 0o666 & ~_UMASK
+
+
+def replace_file_atomically(path: Path, text: Union[str, bytes], prefix: str, suffix: str) -> None:
+    """
+    Write text (or bytes) to a temp file in path's directory and rename it over
+    path. The result keeps path's current mode, or gets the mode a plain write
+    would create (mkstemp alone would leave it 0600).
+    """
+    import tempfile
+
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        mode = new_file_mode()
+    fd, tmp = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=str(path.parent))
+    try:
+        with (os.fdopen(fd, "wb") if isinstance(text, bytes) else os.fdopen(fd, "w", encoding="utf-8")) as fh:
+            fh.write(text)
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def write_report_to_pack(active_pack: Path, stage: str, report: Dict[str, Any]) -> Path:
+    path = active_pack / "evidence" / "logs" / f"validator-report.{stage}.json"
+    write_report_file(path, stage, report)
+    return path
+
+
+def write_report_fallback(repo_root: Path, stage: str, report: Dict[str, Any]) -> Path:
+    # If we can't resolve the active pack, still write somewhere deterministic.
+    path = repo_root / ".intent-ops" / "intents" / f"validator-report.{stage}.json"
+    write_report_file(path, stage, report)
+    return path
+
+
+def write_report(report_name: str, report: Dict[str, Any], active_pack: Optional[Path], repo_root: Optional[Path]) -> None:
+    try:
+        if active_pack is not None and active_pack.exists():
+            p = write_report_to_pack(active_pack, report_name, report)
+            log(LOG_INFO, "report written: %s", p)
+        elif repo_root is not None and repo_root.exists():
+            p = write_report_fallback(repo_root, report_name, report)
+            log(LOG_INFO, "report written: %s (fallback location)", p)
+        else:
+            log(LOG_WARN, "report not written: %s has no active pack and no repo root", report_name)
+    except Exception as e:
+        log(LOG_WARN, "report not written: %s: %r", report_name, e)
+
+
+def locate_report_targets() -> Tuple[Optional[Path], Optional[Path]]:
+    """Resolve (active_pack, repo_root) for writing reports outside a validation run."""
+    try:
+        repo_root = repo_root_from_git()
+    except Exception as e:
+        debug("locate_report_targets: no repo root: %r", e)
+        return None, None
+    try:
+        fw_paths = derive_framework_paths(load_framework_config(repo_root))
+        current_intent = load_current_intent(repo_root, fw_paths["current_intent_file"])
+        active_pack = resolve_active_pack(repo_root.resolve() / fw_paths["intents_root"], current_intent)
+    except Exception as e:
+        debug("locate_report_targets: active pack unavailable: %r", e)
+        return None, repo_root
+    return active_pack, repo_root
+
+
+# ----------------------------
+# Run metrics (--metrics-file)
+# ----------------------------
+
+_METRICS_PREFIX = "intentops_validate"
+_STAGE_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class RunMetrics:
+    """
+    Measurements of one invocation for the metrics textfile. Git processes are
+    recorded from the prefetch thread too, hence the lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.git_processes: Dict[str, int] = {}
+        self.git_seconds: Dict[str, float] = {}
+        self.stages: List[Tuple[str, bool, float, Dict[str, Any]]] = []
+
+    def git_process(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self.git_processes[kind] = self.git_processes.get(kind, 0) + 1
+            self.git_seconds[kind] = self.git_seconds.get(kind, 0.0) + seconds
+
+    def stage(self, stage: str, ok: bool, seconds: float, report: Dict[str, Any]) -> None:
+        self.stages.append((stage, ok, seconds, report))
+
+
+_METRICS: Optional[RunMetrics] = None
+
+
+_GIT_SPAWNS: Dict[str, int] = {}
+_GIT_SPAWNS_LOCK = threading.Lock()
+
+
+# Global git options that take their value as the next argument.
+_GIT_GLOBAL_OPTIONS_WITH_VALUE = frozenset(["-C", "-c", "--git-dir", "--work-tree", "--namespace", "--exec-path"])
+
+
+def git_subcommand(args: Any) -> str:
+    """The subcommand of a git argv, skipping global options (`-C <dir>`, `--no-optional-locks`, ...)."""
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        i += 2 if args[i] in _GIT_GLOBAL_OPTIONS_WITH_VALUE else 1
+    return args[i] if i < len(args) else "?"
+
+
+def note_git_spawn(args: Any) -> None:
+    """Count a git subprocess by subcommand; every spawn site calls this (see --git-budget)."""
+    sub = git_subcommand(args)
+    with _GIT_SPAWNS_LOCK:
+        _GIT_SPAWNS[sub] = _GIT_SPAWNS.get(sub, 0) + 1
+
+
+def git_spawns_snapshot() -> Dict[str, int]:
+    with _GIT_SPAWNS_LOCK:
+        return dict(_GIT_SPAWNS)
+
+
+def git_spawns_since(before: Dict[str, int]) -> Dict[str, Any]:
+    now = git_spawns_snapshot()
+    by_sub = {k: v - before.get(k, 0) for k, v in sorted(now.items()) if v - before.get(k, 0)}
+    return {"total": sum(by_sub.values()), "by_subcommand": by_sub}
+
+
+def parse_git_budget(value: str) -> Dict[str, int]:
+    """argparse type for --git-budget: "N" or "total=N,show=M,..." (max git spawns per stage)."""
+    import argparse
+
+    budget: Dict[str, int] = {}
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        key, sep, num = part.partition("=")
+        if not sep:
+            key, num = "total", key
+        try:
+            limit = int(num)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid --git-budget entry {part!r}; expected N or SUBCOMMAND=N")
+        if limit < 0:
+            raise argparse.ArgumentTypeError(f"--git-budget limits must be >= 0, got {part!r}")
+        budget[key.strip()] = limit
+    if not budget:
+        raise argparse.ArgumentTypeError("--git-budget needs at least one limit")
+    return budget
+
+
+def check_git_budget(report: Dict[str, Any], spawns: Dict[str, Any], budget: Dict[str, int]) -> bool:
+    """Add GIT_BUDGET_EXCEEDED to a finished stage report for each exceeded limit."""
+    within = True
+    for key, limit in sorted(budget.items()):
+        used = spawns["total"] if key == "total" else spawns["by_subcommand"].get(key, 0)
+        what = "git" if key == "total" else f"git {key}"
+        if used > limit:
+            within = False
+            report["pass"] = False
+            report.setdefault("findings", []).append(
+                {
+                    "level": "fail",
+                    "code": "GIT_BUDGET_EXCEEDED",
+                    "message": f"{report.get('stage')} spawned {used} {what} process(es); budget is {limit}.",
+                    "path": None,
+                }
+            )
+    return within
+
+
+def note_git_process(kind: str, started: float, args: Any) -> None:
+    """Record a finished git subprocess (kind: run, stream, batch or prefetch) started at perf_counter() `started`."""
+    if _METRICS is not None:
+        _METRICS.git_process(kind, time.perf_counter() - started)
+    if _SPANS is not None:
+        # Prefetched processes and the long-lived cat-file batch run alongside other spans.
+        record = _SPANS.overlapping if kind in ("prefetch", "batch") else _SPANS.complete
+        record(f"git {git_subcommand(args)}", "git", started, kind=kind, argv=" ".join(args))
+
+
+def _metric_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k in sorted(labels):
+        v = str(labels[k]).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _metric_sample_order(key: str) -> Tuple[str, int, float]:
+    # Histogram series: per label set, buckets by ascending le, then _sum, _count.
+    name, _, labels = key.partition("{")
+    le = re.search(r'le="([^"]*)"', labels)
+    rest = re.sub(r'le="[^"]*",?', "", labels)
+    suffix = 1 if name.endswith("_sum") else 2 if name.endswith("_count") else 0
+    return rest, suffix, float(le.group(1)) if le else 0.0
+
+
+def _report_cache_counts(report: Dict[str, Any]) -> Dict[str, Tuple[int, int]]:
+    """{cache: (hits, lookups)} from the cache stats a report carries."""
+    out: Dict[str, Tuple[int, int]] = {}
+    memo = report.get("git_cache") or {}
+    if memo:
+        out["git_memo"] = (memo.get("hits", 0), memo.get("hits", 0) + memo.get("misses", 0))
+    prefetch = report.get("git_prefetch") or {}
+    if prefetch:
+        out["git_prefetch"] = (prefetch.get("used", 0), prefetch.get("prefetched", 0))
+    session = report.get("session_cache") or {}
+    if session:
+        out["session_git"] = (session.get("git_hits", 0), session.get("git_hits", 0) + session.get("git_entries", 0))
+        out["session_files"] = (session.get("file_hits", 0), session.get("file_hits", 0) + session.get("file_entries", 0))
+    packs = report.get("packs") or {}
+    if packs:
+        out["pack_index"] = (packs.get("reused_from_index", 0), packs.get("total", 0))
+    return out
+
+
+def _report_code_counts(report: Dict[str, Any]) -> Dict[Tuple[str, str], int]:
+    """{(level, code): count}, including findings dropped by --max-findings-per-code."""
+    counts: Dict[Tuple[str, str], int] = {}
+    for f in report.get("findings") or []:
+        key = (str(f.get("level")), str(f.get("code")))
+        counts[key] = counts.get(key, 0) + 1
+    for code, info in (report.get("findings_truncated") or {}).items():
+        key = (str(info.get("level", "fail")), str(code))
+        counts[key] = counts.get(key, 0) + info["total"] - info["limit"]
+    return counts
+
+
+def _report_replayed_commits(report: Dict[str, Any]) -> int:
+    if report.get("audit_rollup"):
+        return int(report["audit_rollup"].get("commits", 0))
+    return len(report.get("ci_commits") or [])
+
+
+def render_metrics(metrics: RunMetrics, previous: Dict[str, float]) -> str:
+    """
+    Prometheus text exposition format, as node-exporter's textfile collector
+    reads it (not OpenMetrics: counter families keep their _total name and
+    there is no `# EOF`). Counters and histograms continue from `previous`
+    (the samples of the file being replaced), so they accumulate across runs;
+    gauges describe the last run.
+    """
+    lines: List[str] = []
+    now = time.time()
+
+    def family(name: str, kind: str, help_text: str, samples: List[Tuple[str, Dict[str, Any], float]]) -> None:
+        full = f"{_METRICS_PREFIX}_{name}"
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} {kind}")
+        for suffix, labels, value in samples:
+            key = f"{full}{suffix}{_metric_labels(labels)}"
+            if kind in ("counter", "histogram"):
+                value += previous.pop(key, 0.0)
+            lines.append(f"{key} {value:.10g}")
+        if kind in ("counter", "histogram"):
+            # Series from earlier runs that this run did not touch (other
+            # stages, codes or caches) must not disappear, or rates would reset.
+            names = {full} if kind == "counter" else {f"{full}_bucket", f"{full}_sum", f"{full}_count"}
+            carried = [k for k in previous if k.split("{", 1)[0] in names]
+            for key in sorted(carried, key=_metric_sample_order):
+                lines.append(f"{key} {previous.pop(key):.10g}")
+
+    runs: List[Tuple[str, Dict[str, Any], float]] = []
+    durations: List[Tuple[str, Dict[str, Any], float]] = []
+    findings: List[Tuple[str, Dict[str, Any], float]] = []
+    replayed: List[Tuple[str, Dict[str, Any], float]] = []
+    changed: List[Tuple[str, Dict[str, Any], float]] = []
+    last_run: List[Tuple[str, Dict[str, Any], float]] = []
+    for stage, ok, seconds, report in metrics.stages:
+        runs.append(("", {"stage": stage, "result": "pass" if ok else "fail"}, 1))
+        for le in _STAGE_DURATION_BUCKETS:
+            durations.append(("_bucket", {"stage": stage, "le": f"{le:g}"}, 1 if seconds <= le else 0))
+        durations.append(("_bucket", {"stage": stage, "le": "+Inf"}, 1))
+        durations.append(("_sum", {"stage": stage}, seconds))
+        durations.append(("_count", {"stage": stage}, 1))
+        for (level, code), n in sorted(_report_code_counts(report).items()):
+            findings.append(("", {"stage": stage, "level": level, "code": code}, n))
+        if stage in ("ci", "audit", "pre-receive"):
+            replayed.append(("", {"stage": stage}, _report_replayed_commits(report)))
+        changed.append(("", {"stage": stage}, len(report.get("changed_files") or [])))
+        last_run.append(("", {"stage": stage}, now))
+
+    cache_counts = _report_cache_counts(metrics.stages[-1][3]) if metrics.stages else {}
+
+    family("runs_total", "counter", "Validation runs by stage and result.", runs)
+    family("stage_duration_seconds", "histogram", "Wall time of one stage.", durations)
+    family(
+        "git_processes_total",
+        "counter",
+        "git subprocesses spawned, by kind.",
+        [("", {"kind": k}, float(v)) for k, v in sorted(metrics.git_processes.items())],
+    )
+    family(
+        "git_process_seconds_total",
+        "counter",
+        "Wall time spent in git subprocesses, by kind.",
+        [("", {"kind": k}, v) for k, v in sorted(metrics.git_seconds.items())],
+    )
+    family("findings_total", "counter", "Findings by stage, level and code.", findings)
+    family("replayed_commits_total", "counter", "Commits replayed by ci, audit and pre-receive.", replayed)
+    family(
+        "cache_hits_total", "counter", "Cache hits, by cache.", [("", {"cache": k}, float(h)) for k, (h, _n) in sorted(cache_counts.items())]
+    )
+    family(
+        "cache_lookups_total",
+        "counter",
+        "Cache lookups, by cache.",
+        [("", {"cache": k}, float(n)) for k, (_h, n) in sorted(cache_counts.items())],
+    )
+    family(
+        "cache_hit_ratio",
+        "gauge",
+        "Cache hit ratio of the last run, by cache.",
+        [("", {"cache": k}, h / n) for k, (h, n) in sorted(cache_counts.items()) if n],
+    )
+    family("changed_files", "gauge", "Changed files seen by the last run, by stage.", changed)
+    family("last_run_timestamp_seconds", "gauge", "Unix time of the last run, by stage.", last_run)
+
+    return "\n".join(lines) + "\n"
+
+
+def _read_metric_samples(path: Path) -> Dict[str, float]:
+    """Counter and histogram samples of an existing metrics file (gauges are dropped)."""
+    samples: Dict[str, float] = {}
+    cumulative: set = set()
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError:
+        return samples
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            parts = line.split()
+            if len(parts) == 4 and parts[3] in ("counter", "histogram"):
+                cumulative.add(parts[2])
+            continue
+        if not line or line.startswith("#"):
+            continue
+        key, _, value = line.rpartition(" ")
+        name = key.split("{", 1)[0]
+        if name not in cumulative and re.sub(r"_(bucket|sum|count)$", "", name) not in cumulative:
+            continue
+        try:
+            samples[key] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+
+def write_metrics_file(path: Path, metrics: RunMetrics) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _ReportDirLock(path.parent):
+        text = render_metrics(metrics, _read_metric_samples(path))
+        replace_file_atomically(path, text, prefix=f".{path.name}.", suffix=".tmp")
+    debug("wrote metrics: %s", path)
+
+
+# ----------------------------
+# Trace spans (--trace)
+# ----------------------------
+
+
+class SpanRecorder:
+    """
+    Collects complete ("X") events in Chrome Trace Event format, viewable in
+    Perfetto or chrome://tracing. Prefetched git processes overlap each other
+    and the main thread, so each is an async ("b"/"e") slice with its own id
+    and the viewer lays them out on separate tracks.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._threads: Dict[int, str] = {}
+        self.events: List[Dict[str, Any]] = []
+        self._phase: Optional[Tuple[str, float]] = None
+        self._async_ids = 0
+
+    def complete(self, name: str, cat: str, started: float, ended: Optional[float] = None, **args: Any) -> None:
+        if ended is None:
+            ended = time.perf_counter()
+        thread = threading.current_thread()
+        # dur from the rounded end, so back-to-back spans share one boundary.
+        ts = round((started - self._origin) * 1e6, 1)
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": ts,
+            "dur": round(round((ended - self._origin) * 1e6, 1) - ts, 1),
+            "pid": self._pid,
+            "tid": thread.ident,
+            "args": args,
+        }
+        with self._lock:
+            self._threads.setdefault(thread.ident or 0, thread.name)
+            self.events.append(event)
+
+    def overlapping(self, name: str, cat: str, started: float, **args: Any) -> None:
+        """Record a span that may overlap others on this thread as an async slice."""
+        ended = time.perf_counter()
+        with self._lock:
+            self._async_ids += 1
+            base = {"name": name, "cat": cat, "id": self._async_ids, "pid": self._pid, "tid": threading.get_ident()}
+            self.events.append(dict(base, ph="b", ts=round((started - self._origin) * 1e6, 1), args=args))
+            self.events.append(dict(base, ph="e", ts=round((ended - self._origin) * 1e6, 1)))
+
+    def phase(self, name: Optional[str]) -> None:
+        """End the current stage phase (if any) and start `name` (None: just end it)."""
+        now = time.perf_counter()
+        if self._phase is not None:
+            # Ends exactly where the next phase starts, so phases tile the stage.
+            self.complete(self._phase[0], "phase", self._phase[1], ended=now)
+        self._phase = (name, now) if name else None
+
+    def write(self, path: Path) -> None:
+        meta = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+            for tid, name in sorted(self._threads.items())
+        ]
+        payload = {"traceEvents": meta + sorted(self.events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        replace_file_atomically(path, json.dumps(payload, separators=(",", ":")) + "\n", prefix=f".{path.name}.", suffix=".tmp")
+        debug("wrote trace: %s (%s event(s))", path, len(self.events))
+
+
+_SPANS: Optional[SpanRecorder] = None
+
+
+def trace_phase(name: str) -> None:
+    if _SPANS is not None:
+        _SPANS.phase(name)
+
+
+# ----------------------------
+# Pack lint and pack status index
+# ----------------------------
+
+_PACK_INDEX_SCHEMA = "1.0"
+_PACK_REQUIRED_KEYS = ("schema_version", "intent_id", "goal", "status", "scope", "operations", "acceptance_criteria")
+
+
+def git_blob_hash(data: bytes) -> str:
+    # Same id `git hash-object` gives the file, so entries can be compared with the index/trees.
+    import hashlib
+
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def pack_index_path(repo_root: Path) -> Path:
+    return intentops_cache_dir(repo_root) / "pack-index.json"
+
+
+def load_pack_index(repo_root: Path, packs_root_rel: str) -> Dict[str, Dict[str, Any]]:
+    """Entries of the pack status index keyed by pack folder name ({} if absent or stale)."""
+    try:
+        data = json.loads(pack_index_path(repo_root).read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    if not isinstance(data, dict) or data.get("schema_version") != _PACK_INDEX_SCHEMA or data.get("packs_root") != packs_root_rel:
+        return {}
+    packs = data.get("packs")
+    return packs if isinstance(packs, dict) else {}
+
+
+def write_pack_index(repo_root: Path, packs_root_rel: str, entries: Dict[str, Dict[str, Any]]) -> Path:
+    path = pack_index_path(repo_root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"schema_version": _PACK_INDEX_SCHEMA, "packs_root": packs_root_rel, "packs": entries}
+    # Hooks read the index concurrently (ClosedPackLookup); concurrent `--stage packs` runs each use their own temp file.
+    replace_file_atomically(path, json.dumps(payload, sort_keys=True, separators=(",", ":")) + "\n", prefix=".pack-index.", suffix=".tmp")
+    return path
+
+
+def lint_pack(
+    repo_root: Path, packs_root_rel: str, name: str, cached: Optional[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], List[Finding], bool]:
+    """
+    Validate one pack's intent.json. Returns (index entry, findings, reused).
+
+    An index entry whose size and mtime still match is reused without reading
+    the file; one whose blob hash still matches is reused without parsing it.
+    """
+    pack_rel = normalize_repo_rel_path(f"{packs_root_rel}/{name}")
+    ipath = repo_root / pack_rel / "intent.json"
+    try:
+        st = ipath.stat()
+    except OSError:
+        entry = {"id": None, "status": None, "blob": None, "size": None, "mtime_ns": None, "findings": []}
+        f = Finding("fail", "PACK_INTENT_MISSING", f"Pack {name} has no intent.json.", pack_rel)
+        entry["findings"] = [[f.level, f.code, f.message]]
+        return entry, [f], False
+
+    if cached is not None and cached.get("size") == st.st_size and cached.get("mtime_ns") == st.st_mtime_ns:
+        return cached, [Finding(lvl, code, msg, f"{pack_rel}/intent.json") for lvl, code, msg in cached.get("findings") or []], True
+
+    data = ipath.read_bytes()
+    blob = git_blob_hash(data)
+    if cached is not None and cached.get("blob") == blob:
+        entry = dict(cached, size=st.st_size, mtime_ns=st.st_mtime_ns)
+        return entry, [Finding(lvl, code, msg, f"{pack_rel}/intent.json") for lvl, code, msg in entry.get("findings") or []], True
+
+    found: List[Tuple[str, str, str]] = []
+    intent_id: Optional[str] = None
+    status: Optional[str] = None
+    try:
+        intent = json.loads(data.decode("utf-8"))
+        if not isinstance(intent, dict):
+            raise ValueError("top-level value is not an object")
+    except Exception as e:
+        found.append(("fail", "PACK_INTENT_INVALID_JSON", f"intent.json is not a JSON object: {e}"))
+    else:
+        missing = [k for k in _PACK_REQUIRED_KEYS if k not in intent]
+        if missing:
+            found.append(("fail", "PACK_SCHEMA_MINIMAL", f"intent.json missing required key(s): {', '.join(missing)}"))
+        raw_id = intent.get("intent_id")
+        intent_id = raw_id if isinstance(raw_id, str) else None
+        if intent_id != name:
+            found.append(("fail", "PACK_ID_MISMATCH", f"intent_id {raw_id!r} does not match the pack folder name {name!r}."))
+        status, status_warn = normalize_intent_status(intent.get("status"))
+        if status is None:
+            found.append(("fail", "PACK_STATUS_INVALID", "intent.status must be either 'open' or 'closed'."))
+        elif status_warn == "INTENT_STATUS_DEFAULTED":
+            found.append(("warn", "PACK_STATUS_DEFAULTED", "intent.status missing/empty; defaulting to 'open'."))
+        elif status_warn == "INTENT_STATUS_LEGACY_MAPPED":
+            found.append(("warn", "PACK_STATUS_LEGACY_MAPPED", "intent.status legacy value mapped to 'open'."))
+
+    entry = {
+        "id": intent_id,
+        "status": status,
+        "blob": blob,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "findings": [list(x) for x in found],
+    }
+    return entry, [Finding(lvl, code, msg, f"{pack_rel}/intent.json") for lvl, code, msg in found], False
+
+
+def scan_packs(repo_root: Path, packs_root_rel: str) -> Tuple[Dict[str, Dict[str, Any]], List[Finding], Dict[str, int]]:
+    """
+    Lint every pack under packs_root in parallel and refresh the pack index.
+
+    Returns (index entries by folder name, findings, counters).
+    """
+    packs_root_abs = repo_root / packs_root_rel
+    names: List[str] = []
+    findings: List[Finding] = []
+    try:
+        with os.scandir(packs_root_abs) as it:
+            for entry in it:
+                if entry.is_symlink():
+                    rel = normalize_repo_rel_path(f"{packs_root_rel}/{entry.name}")
+                    findings.append(Finding("fail", "SYMLINK_FORBIDDEN", "Symlinks are forbidden under governed roots.", rel))
+                elif entry.is_dir():
+                    names.append(entry.name)
+    except FileNotFoundError:
+        pass
+    names.sort()
+
+    previous = load_pack_index(repo_root, packs_root_rel)
+    entries: Dict[str, Dict[str, Any]] = {}
+    reused = 0
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor() as pool:
+        results = list(pool.map(lambda n: lint_pack(repo_root, packs_root_rel, n, previous.get(n)), names))
+    for name, (entry, pack_findings, was_reused) in zip(names, results):
+        entries[name] = entry
+        findings.extend(pack_findings)
+        reused += 1 if was_reused else 0
+
+    if entries != previous:
+        try:
+            write_pack_index(repo_root, packs_root_rel, entries)
+        except OSError as e:
+            debug("scan_packs: could not write pack index: %r", e)
+
+    counts = {
+        "total": len(entries),
+        "open": sum(1 for e in entries.values() if e.get("status") == "open"),
+        "closed": sum(1 for e in entries.values() if e.get("status") == "closed"),
+        "invalid": sum(1 for e in entries.values() if any(f[0] == "fail" for f in e.get("findings") or [])),
+        "reused_from_index": reused,
+    }
+    return entries, findings, counts
+
+
+class ClosedPackTrie:
+    """
+    Path-component trie of closed pack directories: match() answers "which
+    closed pack contains this path?" in O(path depth), however many packs exist.
+    """
+
+    _PACK = "\0pack"
+
+    def __init__(self) -> None:
+        self._root: Dict[str, Any] = {}
+        self.size = 0
+
+    def add(self, pack_rel: str) -> None:
+        node = self._root
+        for part in normalize_repo_rel_path(pack_rel).split("/"):
+            node = node.setdefault(part, {})
+        if self._PACK not in node:
+            node[self._PACK] = normalize_repo_rel_path(pack_rel)
+            self.size += 1
+
+    def remove(self, pack_rel: str) -> None:
+        node = self._root
+        for part in normalize_repo_rel_path(pack_rel).split("/"):
+            node = node.get(part)
+            if node is None:
+                return
+        if node.pop(self._PACK, None) is not None:
+            self.size -= 1
+
+    def match(self, path: str) -> Optional[str]:
+        node = self._root
+        parts = normalize_repo_rel_path(path).split("/")
+        for part in parts[:-1]:
+            node = node.get(part)
+            if node is None:
+                return None
+            if self._PACK in node:
+                return node[self._PACK]
+        return None
+
+
+class ClosedPackLookup:
+    """
+    Closed packs besides the active one, for the working tree stages.
+
+    match() only looks at the pack a path falls in, so a run stats the
+    intent.json of the packs it touches rather than of every pack. A status is
+    taken from the pack status index while that pack's size/mtime or blob hash
+    still matches; the index is only read here (--stage packs refreshes it).
+    Packs whose intent.json is itself changed are judged by their HEAD status,
+    since the working copy may be the edit under test.
+    """
+
+    def __init__(self, repo_root: Path, packs_root_rel: str, active_pack_rel: str, changed_paths: Any) -> None:
+        self.repo_root = repo_root
+        self.packs_root_rel = normalize_repo_rel_path(packs_root_rel)
+        self._prefix = self.packs_root_rel.rstrip("/") + "/"
+        self.active_pack_rel = active_pack_rel
+        self.changed_paths = changed_paths
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._status: Dict[str, Optional[str]] = {}
+
+    def match(self, path: str) -> Optional[str]:
+        if not path.startswith(self._prefix):
+            return None
+        name, sep, _rest = path[len(self._prefix) :].partition("/")
+        pack_rel = self._prefix + name
+        if not sep or pack_rel == self.active_pack_rel:
+            return None
+        if name not in self._status:
+            try:
+                self._status[name] = self._lookup(name, pack_rel)
+            except Exception as e:
+                debug("closed pack lookup failed for %s: %r", pack_rel, e)
+                self._status[name] = None
+        return pack_rel if self._status[name] == "closed" else None
+
+    def _lookup(self, name: str, pack_rel: str) -> Optional[str]:
+        if f"{pack_rel}/intent.json" in self.changed_paths:
+            head_intent = load_json_from_git_show(f"{pack_rel}/intent.json", ref="HEAD")
+            return normalize_intent_status((head_intent or {}).get("status"))[0] if head_intent else None
+        pack_dir = self.repo_root / pack_rel
+        if pack_dir.is_symlink() or not pack_dir.is_dir():
+            # Not a pack scan_packs() would index; the symlink ban reports it.
+            return None
+        if self._index is None:
+            self._index = load_pack_index(self.repo_root, self.packs_root_rel)
+        entry, _findings, _reused = lint_pack(self.repo_root, self.packs_root_rel, name, self._index.get(name))
+        return entry.get("status")
+
+    def stats(self) -> Dict[str, int]:
+        return {"checked": len(self._status), "closed": sum(1 for v in self._status.values() if v == "closed")}
+
+
+class ClosedPackTracker:
+    """
+    Closed-pack trie as of one commit, for CI replay.
+
+    Built once from the tree (ls-tree of packs_root plus one persistent
+    cat-file --batch for the intent.json blobs) and then advanced commit by
+    commit: when a replayed commit's parent is the tracked commit, only the
+    intent.json files that commit touched are re-read. Any other parent
+    (merge, gap left by trusted-ref exclusion, shard start) triggers a rebuild.
+    """
+
+    def __init__(self, packs_root_rel: str, blob_status: Optional[Dict[str, Optional[str]]] = None) -> None:
+        self.packs_root = normalize_repo_rel_path(packs_root_rel)
+        self.commit: Optional[str] = None
+        self.trie = ClosedPackTrie()
+        # Blob oid -> normalised status; seeded from the pack index.
+        self._blob_status: Dict[str, Optional[str]] = dict(blob_status or {})
+        self._batch: Optional[GitCatFileBatch] = None
+        self.rebuilds = 0
+        self.updates = 0
+
+    def _status_at(self, rev: str) -> Optional[str]:
+        if self._batch is None:
+            self._batch = GitCatFileBatch()
+        obj = self._batch.read(rev)
+        if obj is None or obj[1] != "blob":
+            return None
+        oid, _type, content = obj
+        if oid not in self._blob_status:
+            try:
+                data = json.loads(content.decode("utf-8"))
+                self._blob_status[oid] = normalize_intent_status(data.get("status"))[0] if isinstance(data, dict) else None
+            except Exception:
+                self._blob_status[oid] = None
+        return self._blob_status[oid]
+
+    def _pack_of_intent_json(self, path: str) -> Optional[str]:
+        prefix = self.packs_root + "/"
+        if not path.startswith(prefix) or not path.endswith("/intent.json"):
+            return None
+        name = path[len(prefix):-len("/intent.json")]
+        return None if (not name or "/" in name) else name
+
+    def at(self, commit: str) -> ClosedPackTrie:
+        if commit != self.commit:
+            self.rebuilds += 1
+            self.trie = ClosedPackTrie()
+            try:
+                out = run_git(["ls-tree", "--name-only", commit, "--", self.packs_root + "/"])
+            except Exception as e:
+                debug("ClosedPackTracker: ls-tree failed at %s: %r", commit, e)
+                out = ""
+            for line in out.splitlines():
+                pack_rel = normalize_repo_rel_path(line.strip())
+                if pack_rel and self._status_at(f"{commit}:{pack_rel}/intent.json") == "closed":
+                    self.trie.add(pack_rel)
+            self.commit = commit
+        return self.trie
+
+    def advance(self, commit: str, parent: Optional[str], changed: List[ChangedFile]) -> None:
+        if parent is None or parent != self.commit:
+            self.commit = None
+            return
+        for c in changed:
+            name = self._pack_of_intent_json(c.path)
+            if name is None:
+                continue
+            self.updates += 1
+            pack_rel = f"{self.packs_root}/{name}"
+            status = None if str(c.status).startswith("D") else self._status_at(f"{commit}:{c.path}")
+            if status == "closed":
+                self.trie.add(pack_rel)
+            else:
+                self.trie.remove(pack_rel)
+        self.commit = commit
+
+    def stats(self) -> Dict[str, int]:
+        return {"rebuilds": self.rebuilds, "incremental_updates": self.updates, "closed_packs": self.trie.size}
+
+    def close(self) -> None:
+        if self._batch is not None:
+            self._batch.close()
+            self._batch = None
+
+
+# ----------------------------
+# Compiled policy (--stage compile)
+# ----------------------------
 
-    working_status = status
+# Bump when the artifact layout or the glob translation changes.
+_POLICY_ARTIFACT_SCHEMA = 1
+_POLICY_SOURCE_KINDS = {"yaml": load_yaml_subset, "json": _load_json_file}
 
-    if head_status == "closed" and working_status == "open":
-        add_fail(
-            summary,
-            findings,
-            "CLOSED_TO_OPEN_FORBIDDEN",
-            "Closed intents may not be reopened (closed -> open is forbidden).",
-            active_intent_json_rel,
-        )
 
-    close_transition = head_status == "open" and working_status == "closed"
+def policy_artifact_path(repo_root: Path) -> Path:
+    return intentops_cache_dir(repo_root) / "policy.marshal"
 
-    # Closed means immutable (based on HEAD)
-    if head_status == "closed":
-        for c in changed:
-            if is_under_repo_prefix(c.path, active_pack_repo_prefix):
-                add_fail(
-                    summary,
-                    findings,
-                    "CLOSED_INTENT_IMMUTABLE",
-                    "Active intent is closed in HEAD; files under the pack are immutable.",
-                    c.path,
-                )
 
-    # Switch transaction detection (current-intent.json modified)
-    if current_intent_file_touched and stage == "coding":
-        add_fail(
-            summary,
-            findings,
-            "CURRENT_INTENT_CHANGED_IN_CODING",
-            "current-intent.json may not be changed in coding stage.",
-            current_intent_rel_norm,
-        )
+_SOURCE_FINGERPRINT: Optional[str] = None
 
-    if switch_detected:
-        if stage == "coding":
-            add_fail(
-                summary,
-                findings,
-                "CURRENT_INTENT_CHANGED_IN_CODING",
-                "current-intent.json may not be changed in coding stage.",
-                current_intent_rel_norm,
-            )
-        # Strict switch transaction allowed change set
-        for c in changed:
-            if c.path == current_intent_rel_norm:
-                continue
-            if is_under_repo_prefix(c.path, active_pack_repo_prefix):
-                continue
-            add_fail(
-                summary,
-                findings,
-                "SWITCH_TRANSACTION_MIXED_CHANGES",
-                "When current-intent.json changes, only the new active pack and current-intent.json may change.",
-                c.path,
-            )
 
-        # Target pack must be open
-        if working_status == "closed":
-            add_fail(
-                summary,
-                findings,
-                "CLOSED_INTENT_NOT_ACTIVATABLE",
-                "Cannot switch to an intent pack whose status is 'closed'.",
-                active_intent_json_rel,
-            )
+def validator_source_fingerprint() -> str:
+    """
+    size:crc32 of this module's source (read through its loader, so the
+    zipapp works too), or "" if it cannot be read. Computed once per run.
+    """
+    global _SOURCE_FINGERPRINT
+    if _SOURCE_FINGERPRINT is None:
+        try:
+            import zlib
 
-        # Switch and close cannot be combined
-        if isinstance(head_current_intent, dict):
-            prev_pack_rel = head_current_intent.get("active_pack_path")
-            if isinstance(prev_pack_rel, str) and prev_pack_rel.strip():
-                prev_pack_abs = (intents_root / normalize_repo_rel_path(prev_pack_rel)).resolve()
-                prev_pack_repo_rel = normalize_repo_rel_path(os.path.relpath(prev_pack_abs, repo_root_resolved))
-                prev_intent_json_rel = normalize_repo_rel_path(f"{prev_pack_repo_rel.rstrip('/')}/intent.json")
-                if any(c.path == prev_intent_json_rel for c in changed):
-                    prev_head_intent = load_json_from_git_show(prev_intent_json_rel, ref="HEAD")
-                    prev_working_intent: Optional[Dict[str, Any]] = None
-                    try:
-                        prev_working_intent = json.loads((repo_root_resolved / prev_intent_json_rel).read_text(encoding="utf-8"))
-                    except Exception:
-                        prev_working_intent = None
-                    prev_head_status_norm, _ = normalize_intent_status((prev_head_intent or {}).get("status"))
-                    prev_working_status_norm, _ = normalize_intent_status((prev_working_intent or {}).get("status"))
-                    prev_head_status = prev_head_status_norm or "open"
-                    prev_working_status = prev_working_status_norm or "open"
-                    if prev_head_status == "open" and prev_working_status == "closed":
-                        add_fail(
-                            summary,
-                            findings,
-                            "SWITCH_AND_CLOSE_COMBINED",
-                            "Switching active intent and closing the previous intent cannot be combined in one run.",
-                            prev_intent_json_rel,
-                        )
+            data = __loader__.get_data(__file__)
+            _SOURCE_FINGERPRINT = f"{len(data)}:{zlib.crc32(data):08x}"
+        except Exception as e:
+            debug("validator source unreadable: %r", e)
+            _SOURCE_FINGERPRINT = ""
+    return _SOURCE_FINGERPRINT
+
+
+def _policy_artifact_header() -> Tuple[Any, ...]:
+    # marshal data is only portable between identical interpreter versions, and
+    # the parsed documents and regex sources only between identical validators.
+    return (
+        "intentops.policy",
+        _POLICY_ARTIFACT_SCHEMA,
+        sys.implementation.cache_tag,
+        marshal.version,
+        validator_source_fingerprint(),
+    )
 
-    # Close transaction strictness
-    if close_transition:
-        if switch_detected:
-            add_fail(
-                summary,
-                findings,
-                "SWITCH_AND_CLOSE_COMBINED",
-                "Switching active intent and closing an intent cannot be combined in one run.",
-                active_intent_json_rel,
-            )
 
-        if stage not in ("verification", "ci"):
-            add_fail(
-                summary,
-                findings,
-                "CLOSE_FORBIDDEN_STAGE",
-                "Closing an intent (open -> closed) is only permitted in verification or ci stage.",
-                active_intent_json_rel,
+class PolicyArtifact:
+    """
+    Parsed kernel files (framework.yml, zones.yml, current-intent.json, the
+    active intent.json) and the regex sources of their glob lists, written by
+    --stage compile and read back with a single marshal load.
+
+    A kernel file is served from the artifact while its size and mtime match
+    and that mtime is older than the artifact itself, or else while its git
+    blob hash does; a changed file is parsed as usual. As with git's racy
+    index entries, a file modified no earlier than the artifact was written
+    may have been edited after it was recorded without its stat changing,
+    so its contents are hashed. The validation rules still run on every
+    served document.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        sources: Optional[Dict[str, Tuple[str, int, int, str, Any]]] = None,
+        tables: Optional[Dict[Tuple[str, ...], str]] = None,
+        written_ns: Optional[int] = None,
+    ) -> None:
+        self.path = path
+        # mtime of the artifact file (None: not written yet, so stat never suffices)
+        self.written_ns = written_ns
+        # str(path) -> (kind, size, mtime_ns, blob, parsed document)
+        self.sources = sources or {}
+        # glob pattern list -> alternation regex source (see matches_any_glob)
+        self.tables = tables or {}
+        self.hits = 0
+        self.stale: List[str] = []
+
+    def record(self, kind: str, path: Path) -> Any:
+        # stat before reading: a file edited in between only ever looks stale later.
+        st = path.stat()
+        blob = git_blob_hash(path.read_bytes())
+        document = _POLICY_SOURCE_KINDS[kind](path)
+        self.sources[str(path)] = (kind, st.st_size, st.st_mtime_ns, blob, document)
+        return document
+
+    def load(self, kind: str, path: Path, loader: Any) -> Any:
+        entry = self.sources.get(str(path))
+        if entry is None or entry[0] != kind:
+            return loader()
+        try:
+            st = path.stat()
+            stat_clean = (
+                (st.st_size, st.st_mtime_ns) == (entry[1], entry[2]) and self.written_ns is not None and entry[2] < self.written_ns
             )
+            fresh = stat_clean or git_blob_hash(path.read_bytes()) == entry[3]
+        except OSError:
+            fresh = False
+        if not fresh:
+            self.stale.append(str(path))
+            return loader()
+        self.hits += 1
+        return entry[4]
 
-        for c in changed:
-            if c.path != active_intent_json_rel:
-                add_fail(
-                    summary,
-                    findings,
-                    "CLOSE_TRANSACTION_MIXED_CHANGES",
-                    "When closing an intent, only the intent.json status flip is permitted (plus ignored generated outputs).",
-                    c.path,
-                )
+    def dumps(self) -> bytes:
+        return marshal.dumps((_policy_artifact_header(), self.sources, self.tables))
 
-    # Apply rules
-    for c in changed:
-        p = normalize_repo_rel_path(c.path)
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "sources": len(self.sources),
+            "tables": len(self.tables),
+            "hits": self.hits,
+            "stale": sorted(set(self.stale)),
+        }
 
-        if is_ignored_generated(p):
-            continue
 
-        # Patch 05: Symlink ban under governed roots
-        # - deterministic: only checks the working tree path
-        # - skip deletions and missing files
-        if not str(c.status).startswith("D") and (p.startswith(".intent-ops/") or p.startswith(".github/agents/")):
-            fs_path = repo_root_resolved / p
-            if fs_path.exists():
-                try:
-                    if os.path.islink(fs_path):
-                        add_fail(
-                            summary,
-                            findings,
-                            "SYMLINK_FORBIDDEN",
-                            "Symlinks are forbidden under governed roots (.intent-ops/** and .github/agents/**).",
-                            p,
-                        )
-                except Exception:
-                    # If the filesystem check fails, be conservative and let other checks run.
-                    pass
+_POLICY: Optional[PolicyArtifact] = None
 
-        # Treat current-intent.json as a control file (not orange)
-        if p == current_intent_rel_norm:
-            if stage == "coding":
-                add_fail(
-                    summary,
-                    findings,
-                    "CURRENT_INTENT_CHANGED_IN_CODING",
-                    "current-intent.json may not be changed in coding stage.",
-                    p,
-                )
+
+def read_policy_artifact(path: Path) -> Optional[PolicyArtifact]:
+    try:
+        with open(path, "rb") as fh:
+            written_ns = os.fstat(fh.fileno()).st_mtime_ns
+            data = marshal.load(fh)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        debug("policy artifact unreadable: %s: %r", path, e)
+        return None
+    header = _policy_artifact_header()
+    if not isinstance(data, tuple) or len(data) != 3 or data[0] != header or not header[-1]:
+        debug("policy artifact ignored (other schema, interpreter or validator): %s", path)
+        return None
+    _header, sources, tables = data
+    if not isinstance(sources, dict) or not isinstance(tables, dict):
+        return None
+    return PolicyArtifact(path, sources, tables, written_ns)
+
+
+def use_policy_artifact(repo_root: Path) -> None:
+    """Load <git-dir>/intentops/policy.marshal once per process, if --stage compile wrote one."""
+    global _POLICY
+    if _POLICY is not None:
+        return
+    try:
+        path = policy_artifact_path(repo_root)
+    except Exception as e:
+        debug("policy artifact unavailable: %r", e)
+        return
+    _POLICY = read_policy_artifact(path)
+    if _POLICY is not None:
+        _GLOB_SET_SOURCES.update(_POLICY.tables)
+        debug("policy artifact: %s (%s sources, %s tables)", path, len(_POLICY.sources), len(_POLICY.tables))
+
+
+def policy_glob_lists(zones: Dict[str, Any], intent: Dict[str, Any]) -> List[List[str]]:
+    """Every pattern list the path rules build from zones.yml and intent.json, raw and normalised."""
+    zones_obj = zones.get("zones", {}) if isinstance(zones.get("zones", {}), dict) else {}
+    scope = intent.get("scope", {}) if isinstance(intent.get("scope", {}), dict) else {}
+    kernel_upgrade = intent.get("kernel_upgrade", {}) if isinstance(intent.get("kernel_upgrade", {}), dict) else {}
+    raw_lists = [
+        (zones_obj.get("purple", {}) or {}).get("paths"),
+        (zones_obj.get("orange", {}) or {}).get("paths"),
+        kernel_upgrade.get("allow_purple_paths"),
+        scope.get("allowed_paths"),
+        scope.get("forbidden_paths"),
+    ]
+    out: List[List[str]] = [list(_GENERATED_OUTPUT_GLOBS)]
+    for raw in raw_lists:
+        if not isinstance(raw, list):
             continue
+        strings = [x for x in raw if isinstance(x, str)]
+        if len(strings) == len(raw):
+            out.append(strings)
+        out.append([x for x in strings if x.strip()])
+        out.append([normalize_repo_rel_path(x) for x in strings])
+        out.append([normalize_repo_rel_path(x) for x in strings if x.strip()])
+    return out
 
-        if matches_any_glob(p, purple_paths):
-            if allow_purple_paths:
-                if stage not in ("verification", "ci"):
-                    add_fail(
-                        summary,
-                        findings,
-                        "KERNEL_UPGRADE_FORBIDDEN_STAGE",
-                        "Kernel upgrade allowlist for purple paths is only permitted in verification or ci stage.",
-                        p,
-                    )
+
+def compile_policy(repo_root: Path, fw_paths: Dict[str, str]) -> Tuple[PolicyArtifact, Path]:
+    """
+    Parse the kernel files from the working tree and write the policy artifact.
+    Returns (artifact, active pack).
+    """
+    artifact = PolicyArtifact(policy_artifact_path(repo_root))
+    artifact.record("yaml", framework_config_path(repo_root))
+    current_intent = artifact.record("json", repo_root / fw_paths["current_intent_file"])
+    active_pack = resolve_active_pack(repo_root.resolve() / fw_paths["intents_root"], current_intent)
+    zones = artifact.record("yaml", zones_config_path(repo_root, fw_paths["framework_root"]))
+    intent = artifact.record("json", active_pack / "intent.json")
+    if not isinstance(zones, dict) or not isinstance(intent, dict):
+        raise ValueError("zones.yml and intent.json must be mappings")
+    for patterns in policy_glob_lists(zones, intent):
+        artifact.tables[tuple(patterns)] = glob_set_source(patterns)
+
+    artifact.path.parent.mkdir(parents=True, exist_ok=True)
+    replace_file_atomically(artifact.path, artifact.dumps(), prefix=".policy.", suffix=".tmp")
+    artifact.written_ns = artifact.path.stat().st_mtime_ns
+    return artifact, active_pack
+
+
+# ----------------------------
+# Watch mode (coding stage)
+# ----------------------------
+
+# Above this many touched paths a full rerun is cheaper than a pathspec query.
+_WATCH_MAX_INCREMENTAL_PATHS = 500
+
+
+def snapshot_worktree(repo_root: Path) -> Dict[str, Tuple[int, int]]:
+    """Repo-relative path -> (mtime_ns, size) for every non-directory entry, skipping .git."""
+    snap: Dict[str, Tuple[int, int]] = {}
+    stack: List[Tuple[str, str]] = [("", str(repo_root))]
+    while stack:
+        rel, abs_dir = stack.pop()
+        try:
+            it = os.scandir(abs_dir)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.name == ".git":
                     continue
-                if matches_any_glob(p, allow_purple_paths):
+                rel_path = rel + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((rel_path + "/", entry.path))
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
                     continue
-                add_fail(
-                    summary,
-                    findings,
-                    "PURPLE_TOUCHED_NOT_ALLOWLISTED",
-                    "Purple zone file modified but not in kernel_upgrade.allow_purple_paths allowlist.",
-                    p,
-                )
-                continue
+                snap[rel_path] = (st.st_mtime_ns, st.st_size)
+    return snap
 
-            add_fail(summary, findings, "PURPLE_TOUCHED", "Framework (purple zone) must never be modified.", p)
-            continue
 
-        if matches_any_glob(p, orange_paths) and not is_under_active_pack(p):
-            add_fail(
-                summary,
-                findings,
-                "ORANGE_OUTSIDE_ACTIVE_PACK",
-                "Only the active intent pack may be modified under intents (orange zone).",
-                p,
-            )
-            continue
+def git_state_signature(repo_root: Path) -> Tuple[Any, ...]:
+    # Staging, committing, checkout and reset all show up here even when no
+    # working tree file changes.
+    git_dir = git_dir_for_repo(repo_root)
+    sig: List[Any] = []
+    for name in ("index", "HEAD", "logs/HEAD", "packed-refs"):
+        try:
+            st = os.stat(git_dir / name)
+            sig.append((name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append((name, None, None))
+    return tuple(sig)
 
-        if forbidden_paths and matches_any_glob(p, forbidden_paths):
-            add_fail(
-                summary,
-                findings,
-                "SCOPE_VIOLATION_FORBIDDEN",
-                "Changed file matches scope.forbidden_paths (deny-wins).",
-                p,
-            )
+
+def coding_changes_for_paths(repo_root: Path, paths: List[str]) -> Dict[str, ChangedFile]:
+    """
+    Coding-stage change status (staged, unstaged or untracked) of just these
+    paths; paths that are unchanged relative to HEAD are absent.
+    """
+    out = run_git(
+        ["-C", str(repo_root), "--no-optional-locks", "--literal-pathspecs", "status", "--porcelain", "-z", "--no-renames", "--untracked-files=all", "--"]
+        + paths
+    )
+    changes: Dict[str, ChangedFile] = {}
+    for entry in out.split("\0"):
+        if len(entry) < 4:
             continue
+        xy, path = entry[:2], normalize_repo_rel_path(entry[3:])
+        if xy == "??":
+            status = "U"
+        else:
+            # Same precedence as list_changed_files: unstaged over staged.
+            status = xy[1] if xy[1] != " " else xy[0]
+        changes[path] = ChangedFile(path=path, status=status)
+    return changes
 
-        if allowed_paths and not matches_any_glob(p, allowed_paths):
-            add_fail(
-                summary,
-                findings,
-                "SCOPE_VIOLATION_NOT_ALLOWED",
-                "Changed file is outside scope.allowed_paths for this intent.",
-                p,
+
+def _finding_key(f: Finding) -> Tuple[str, str, str, str]:
+    return (f.level, f.code, f.path or "", f.message)
+
+
+class CodingWatcher:
+    """
+    Keeps coding-stage state between edits.
+
+    A full validate() establishes the policy and the changed-file set. After
+    that each poll diffs os.scandir mtime snapshots, asks git for the status of
+    only the touched paths and re-evaluates the per-path rules for them. Control
+    files, git state changes (staging, commits, checkout) and lifecycle
+    transactions fall back to a full run. New and resolved findings are
+    streamed as "+"/"-" lines and the coding report is rewritten after each
+    update.
+    """
+
+    def __init__(self, options: RunOptions, out: Any = None) -> None:
+        self.options = options
+        self.out = out or sys.stdout
+        self.policy: Optional[PathPolicy] = None
+        self.summary: Dict[str, Any] = {}
+        self.active_pack: Optional[Path] = None
+        self.repo_root: Optional[Path] = None
+        self.changed: Dict[str, ChangedFile] = {}
+        self.path_findings: Dict[str, List[Finding]] = {}
+        self.global_findings: List[Finding] = []
+        self.published: Dict[Tuple[str, str, str, str], Finding] = {}
+        self.snapshot: Dict[str, Tuple[int, int]] = {}
+        self.git_state: Tuple[Any, ...] = ()
+        self.full_runs = 0
+        self.incremental_runs = 0
+
+    def full_run(self) -> None:
+        if _GIT_PREFETCH is not None:
+            _GIT_PREFETCH.reset()
+        sink: List[PathPolicy] = []
+        _ok, findings, summary, self.active_pack, self.repo_root = validate("coding", self.options.replace(policy_sink=sink))
+        self.full_runs += 1
+        self.summary = summary
+        self.policy = sink[-1] if sink else None
+        self.changed = {c["path"]: ChangedFile(path=c["path"], status=c["status"]) for c in summary.get("changed_files") or []}
+        self.path_findings = {}
+        remaining = list(findings)
+        if self.policy is not None:
+            symlinked = find_symlinked_paths(self.repo_root.resolve(), governed_symlink_candidates(list(self.changed.values())))
+            for path in self.changed:
+                self.path_findings[path] = path_rule_findings(self.policy, path, path in symlinked)
+                for f in self.path_findings[path]:
+                    for i, g in enumerate(remaining):
+                        if _finding_key(g) == _finding_key(f):
+                            del remaining[i]
+                            break
+        self.global_findings = remaining
+        if self.repo_root is not None:
+            self.snapshot = snapshot_worktree(self.repo_root)
+            self.git_state = git_state_signature(self.repo_root)
+        self.publish()
+
+    def incremental_run(self, touched: List[str]) -> None:
+        assert self.policy is not None and self.repo_root is not None
+        self.incremental_runs += 1
+        status = coding_changes_for_paths(self.repo_root, touched)
+        for path in touched:
+            c = status.get(path)
+            if c is None:
+                self.changed.pop(path, None)
+                self.path_findings.pop(path, None)
+            else:
+                self.changed[path] = c
+        fresh = [self.changed[p] for p in touched if p in self.changed]
+        symlinked = find_symlinked_paths(self.repo_root.resolve(), governed_symlink_candidates(fresh))
+        for c in fresh:
+            self.path_findings[c.path] = path_rule_findings(self.policy, c.path, c.path in symlinked)
+        self.summary["changed_files"] = [{"path": c.path, "status": c.status} for c in sorted(self.changed.values(), key=lambda x: x.path)]
+        self.publish()
+
+    def poll(self) -> None:
+        assert self.repo_root is not None
+        snap = snapshot_worktree(self.repo_root)
+        git_state = git_state_signature(self.repo_root)
+        touched = sorted(p for p in set(snap) | set(self.snapshot) if snap.get(p) != self.snapshot.get(p))
+        self.snapshot = snap
+        touched = [p for p in touched if not is_ignored_generated(p)]
+        if git_state == self.git_state and not touched:
+            return
+        needs_full = (
+            git_state != self.git_state
+            or self.policy is None
+            or not self.policy.lifecycle_quiet
+            or len(touched) > _WATCH_MAX_INCREMENTAL_PATHS
+            or any(
+                p in self.policy.control_paths or p.endswith("/intent.json") or p == ".gitignore" or p.endswith("/.gitignore")
+                for p in touched
             )
-            continue
+        )
+        debug("watch: %s touched path(s), %s run", len(touched), "full" if needs_full else "incremental")
+        if needs_full:
+            self.full_run()
+        else:
+            self.incremental_run(touched)
+            self.git_state = git_state_signature(self.repo_root)
+
+    def publish(self) -> None:
+        current: List[Finding] = list(self.global_findings)
+        for path in sorted(self.path_findings):
+            current.extend(self.path_findings[path])
+        keyed = {_finding_key(f): f for f in current}
+        for key in sorted(set(self.published) - set(keyed)):
+            self._emit("-", self.published[key])
+        for key in sorted(set(keyed) - set(self.published)):
+            self._emit("+", keyed[key])
+        self.published = keyed
+
+        self.summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in current]
+        self.summary["pass"] = not any(f.level == "fail" for f in current)
+        self.summary["timestamp"] = now_iso()
+        write_report("coding", self.summary, self.active_pack, self.repo_root)
+        self.out.write(f"= {'PASS' if self.summary['pass'] else 'FAIL'} ({len(self.changed)} changed file(s))\n")
+        self.out.flush()
+
+    def _emit(self, sign: str, f: Finding) -> None:
+        where = f" {f.path}" if f.path else ""
+        self.out.write(f"{sign} {f.level.upper()} {f.code}{where}: {f.message}\n")
+
+    def run(self, interval: float) -> bool:
+        self.full_run()
+        try:
+            while True:
+                time.sleep(interval)
+                if self.repo_root is None:
+                    self.full_run()
+                else:
+                    self.poll()
+        except KeyboardInterrupt:
+            pass
+        debug("watch: %s full and %s incremental run(s)", self.full_runs, self.incremental_runs)
+        return self.summary.get("pass") is True
 
-    summary["findings"] = [{"level": f.level, "code": f.code, "message": f.message, "path": f.path} for f in findings]
-    ok = summary["pass"] is True
-    return ok, findings, summary, active_pack, repo_root
 
+def merge_reports_main(argv: List[str]) -> int:
+    import argparse
 
-def write_report_to_pack(active_pack: Path, stage: str, report: Dict[str, Any]) -> Path:
-    out = active_pack / "evidence" / "logs"
-    out.mkdir(parents=True, exist_ok=True)
-    path = out / f"validator-report.{stage}.json"
-    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
-    return path
+    global _COMPACT_REPORTS
 
+    parser = argparse.ArgumentParser(
+        prog="validate.py merge-reports",
+        description="Merge --shard i/N ci reports into the standard validator-report.ci.json.",
+    )
+    parser.add_argument("reports", nargs="+", help="Shard report files (validator-report.ci.shard-*.json).")
+    parser.add_argument("--out", help="Output path (default: the active pack's evidence/logs/validator-report.ci.json).")
+    add_logging_arguments(parser)
+    parser.add_argument("--compact-report", action="store_true", help="Write the merged report without indentation.")
+    args = parser.parse_args(argv)
 
-def write_report_fallback(repo_root: Path, stage: str, report: Dict[str, Any]) -> Path:
-    # If we can't resolve the active pack, still write somewhere deterministic.
-    out = repo_root / ".intent-ops" / "intents"
-    out.mkdir(parents=True, exist_ok=True)
-    path = out / f"validator-report.{stage}.json"
-    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
-    return path
+    configure_logging(resolve_log_level(args), args.log_file)
+    _COMPACT_REPORTS = bool(args.compact_report)
 
+    reports: List[Dict[str, Any]] = []
+    for path in args.reports:
+        try:
+            reports.append(json.loads(Path(path).read_text(encoding="utf-8")))
+        except Exception as e:
+            debug("merge-reports: failed to read %s: %r", path, e)
+            reports.append({})
 
-def main() -> int:
-    global _DEBUG
+    merged = merge_ci_shard_reports(reports)
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--stage", required=True, choices=["coding", "verification", "ci"])
-    parser.add_argument("--debug", action="store_true", help="Enable debug logging to stderr and include debug fields in report.")
-    args = parser.parse_args()
+    if args.out:
+        out = Path(args.out)
+        write_report_file(out, "ci", merged)
+        debug("wrote merged report: %s", out)
+    else:
+        active_pack, repo_root = locate_report_targets()
+        write_report("ci", merged, active_pack, repo_root)
 
-    _DEBUG = bool(args.debug)
-    debug(f"started: stage={args.stage} debug={_DEBUG}")
+    return 0 if merged["pass"] is True else 2
 
-    ok, _findings, report, active_pack, repo_root = validate(args.stage)
 
-    # Write report
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    global _GIT_MEMO, _GIT_PREFETCH, _GIT_BATCH, _SESSION, _COMPACT_REPORTS, _METRICS, _SPANS, _REPORT_DEBUG
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "merge-reports":
+        return merge_reports_main(argv[1:])
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--stage",
+        required=True,
+        type=parse_stages,
+        help="coding, verification, ci, audit, pre-receive, packs or compile; several comma-separated stages share one run, e.g. coding,verification.",
+    )
+    add_logging_arguments(parser)
+    parser.add_argument(
+        "--dirty-count-limit",
+        type=int,
+        default=1,
+        help="Dirty worktree gates stop at the first offending path; with N > 1 they report a count bounded by N.",
+    )
+    parser.add_argument(
+        "--git-cache-size",
+        type=int,
+        default=4096,
+        help="Max entries of the per-run memo for SHA-addressed git queries (0 disables).",
+    )
+    parser.add_argument(
+        "--compact-report",
+        action="store_true",
+        help="Write reports without indentation (smaller and faster for large reports).",
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="PATH",
+        help="Write Chrome Trace Event JSON spans (stages, phases, replayed commits, git processes) to PATH.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        metavar="PATH",
+        help="Write run metrics in the Prometheus text format to PATH (e.g. for node-exporter's textfile collector).",
+    )
+    parser.add_argument(
+        "--max-findings-per-code",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Keep at most N detailed findings per code; the rest are counted in findings_truncated (verdict unchanged).",
+    )
+    parser.add_argument(
+        "--git-batch",
+        action="store_true",
+        help="Serve commit-scoped reads from one git cat-file --batch and list replay changes with one git log.",
+    )
+    parser.add_argument(
+        "--git-budget",
+        type=parse_git_budget,
+        default=None,
+        metavar="SPEC",
+        help='Fail a stage that spawns more git processes than allowed: "N" or "total=N,show=M,...".',
+    )
+    parser.add_argument(
+        "--serial-git",
+        action="store_true",
+        help="Run git queries one at a time instead of prefetching independent ones concurrently.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="coding only: keep running, re-evaluate changed paths incrementally and stream new/resolved findings.",
+    )
+    parser.add_argument("--watch-interval", type=float, default=1.0, metavar="SECONDS", help="Polling interval for --watch.")
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="i/N",
+        help="ci only: replay the i-th of N contiguous slices of the commit range (merge with merge-reports).",
+    )
+    parser.add_argument(
+        "--trusted-ref",
+        action="append",
+        default=None,
+        metavar="GLOB",
+        help="ci only (repeatable): skip replaying commits reachable from refs matching GLOB, e.g. 'origin/release/*'.",
+    )
+    parser.add_argument("--fail-fast", action="store_true", help="ci only: stop replay at the first failing commit.")
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="ci only: stop replay cleanly after SECONDS and write a checkpoint for --resume.",
+    )
+    parser.add_argument("--resume", action="store_true", help="ci only: continue replay from the checkpoint of a previous run.")
+    parser.add_argument(
+        "--first-bad",
+        action="store_true",
+        help="ci only: report just the earliest failing commit (bisects when the range allows it).",
+    )
+    parser.add_argument("--checkpoint", default=None, metavar="PATH", help="ci only: checkpoint file (default: <git-dir>/intentops/).")
+    parser.add_argument(
+        "--rev-range",
+        default=None,
+        help="audit only: rev-list range to walk, e.g. 'v1.0..HEAD' (default: all of HEAD's history).",
+    )
+    args = parser.parse_args(argv)
+    stages: List[str] = args.stage
+    if args.shard is not None and "ci" not in stages:
+        parser.error("--shard is only supported with --stage ci")
+    if args.rev_range is not None and "audit" not in stages:
+        parser.error("--rev-range is only supported with --stage audit")
+    if args.trusted_ref and "ci" not in stages:
+        parser.error("--trusted-ref is only supported with --stage ci")
+    if (args.fail_fast or args.time_budget is not None or args.resume or args.checkpoint) and "ci" not in stages:
+        parser.error("--fail-fast, --time-budget, --resume and --checkpoint are only supported with --stage ci")
+    if args.watch and (args.metrics_file or args.trace):
+        parser.error("--metrics-file and --trace cannot be combined with --watch")
+    if args.watch and stages != ["coding"]:
+        parser.error("--watch is only supported with --stage coding")
+    if args.first_bad and "ci" not in stages:
+        parser.error("--first-bad is only supported with --stage ci")
+    if args.first_bad and (args.shard or args.time_budget is not None or args.resume):
+        parser.error("--first-bad cannot be combined with --shard, --time-budget or --resume")
+    if "pre-receive" in stages and len(stages) > 1:
+        parser.error("--stage pre-receive cannot be combined with other stages")
+    if args.max_findings_per_code is not None and args.max_findings_per_code < 1:
+        parser.error("--max-findings-per-code must be at least 1")
+
+    configure_logging(resolve_log_level(args), args.log_file)
+    _REPORT_DEBUG = bool(args.debug)
+    _COMPACT_REPORTS = bool(args.compact_report)
+    debug("started: stage=%s debug=%s", lambda: ",".join(stages), _DEBUG)
+
+    _METRICS = RunMetrics() if args.metrics_file else None
+    _SPANS = SpanRecorder() if args.trace else None
+    _GIT_MEMO = GitQueryMemo(args.git_cache_size) if args.git_cache_size > 0 else None
+    _SESSION = SessionSnapshot() if len(stages) > 1 else None
+
+    ref_updates: Optional[List[Tuple[str, str, str]]] = None
+    if stages == ["pre-receive"]:
+        try:
+            ref_updates = parse_ref_updates(sys.stdin.read())
+        except ValueError as e:
+            sys.stderr.write(f"intentops: {e}\n")
+            return 2
+
+    options = RunOptions(
+        dirty_count_limit=max(1, args.dirty_count_limit),
+        shard=args.shard,
+        rev_range=args.rev_range,
+        ref_updates=ref_updates,
+        trusted_ref_globs=args.trusted_ref,
+        fail_fast=bool(args.fail_fast),
+        time_budget=args.time_budget,
+        resume=bool(args.resume),
+        checkpoint_path=Path(args.checkpoint) if args.checkpoint else None,
+        first_bad=bool(args.first_bad),
+        max_findings_per_code=args.max_findings_per_code,
+    )
+    if not args.serial_git and stages != ["pre-receive"]:
+        _GIT_PREFETCH = GitPrefetcher()
+    results: List[Tuple[str, bool, Dict[str, Any], Optional[Path], Optional[Path]]] = []
     try:
-        if active_pack is not None and active_pack.exists():
-            p = write_report_to_pack(active_pack, args.stage, report)
-            debug(f"wrote report to pack: {p}")
-        elif repo_root is not None and repo_root.exists():
-            p = write_report_fallback(repo_root, args.stage, report)
-            debug(f"wrote fallback report: {p}")
+        if args.watch:
+            return 0 if CodingWatcher(options).run(max(0.05, args.watch_interval)) else 2
+        if args.git_batch:
+            _GIT_BATCH = GitCatFileBatch()
+        for stage in stages:
+            started = time.perf_counter()
+            spawns_before = git_spawns_snapshot()
+            ok, _findings, report, active_pack, repo_root = validate(stage, options)
+            report["git_spawns"] = git_spawns_since(spawns_before)
+            if args.git_budget is not None and not check_git_budget(report, report["git_spawns"], args.git_budget):
+                ok = False
+            if _METRICS is not None:
+                _METRICS.stage(stage, ok, time.perf_counter() - started, report)
+            log_stage_result(stage, ok, report, time.perf_counter() - started)
+            results.append((stage, ok, report, active_pack, repo_root))
+    finally:
+        if _GIT_BATCH is not None:
+            _GIT_BATCH.close()
+            _GIT_BATCH = None
+        if _GIT_PREFETCH is not None:
+            _GIT_PREFETCH.close()
+
+    # Reports are written after the last stage so every stage sees the same tree.
+    for stage, ok, report, active_pack, repo_root in results:
+        if _GIT_MEMO is not None:
+            report["git_cache"] = _GIT_MEMO.stats()
+        if _GIT_PREFETCH is not None:
+            report["git_prefetch"] = _GIT_PREFETCH.stats()
+        if _SESSION is not None:
+            report["session_cache"] = _SESSION.stats()
+        if _POLICY is not None:
+            report["policy_artifact"] = _POLICY.stats()
+
+        report_name = stage
+        if stage == "ci" and args.shard is not None:
+            report_name = f"{stage}.shard-{args.shard[0]}-of-{args.shard[1]}"
+        if stage == "pre-receive":
+            # Hook output is relayed to the pusher; there is no worktree to write into.
+            sys.stderr.write(format_pre_receive_rejection(report))
         else:
-            debug("report not written: no active_pack and no repo_root")
-    except Exception as e:
-        debug(f"failed to write report: {e!r}")
+            write_report(report_name, report, active_pack, repo_root)
+
+    if _METRICS is not None:
+        try:
+            write_metrics_file(Path(args.metrics_file), _METRICS)
+        except OSError as e:
+            log(LOG_WARN, "metrics not written: %s: %r", args.metrics_file, e)
+    if _SPANS is not None:
+        try:
+            _SPANS.write(Path(args.trace))
+        except OSError as e:
+            log(LOG_WARN, "trace not written: %s: %r", args.trace, e)
 
-    return 0 if ok else 2
+    return 0 if all(ok for _stage, ok, _report, _pack, _root in results) else 2
 
 
 if __name__ == "__main__":